@@ -1,25 +1,31 @@
 
 import os
-import requests
 from dotenv import load_dotenv
 from db import get_connection
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 from utils.filters import is_bullish 
 from utils.logger import setup_logger
-from utils.ratelimiter import RateLimiter
+from utils.ratelimiter import RateGovernor
+from api.http_client import http_get
+from config.settings import (
+    QUOTE_BATCH_SIZE, PROFILE_BATCH_SIZE, INDICATOR_LOOKBACK_DAYS,
+    FMP_REQUESTS_PER_MINUTE, FMP_RATE_BURST, RATE_LIMIT_BACKEND, RATE_LIMIT_STATE_FILE,
+)
+from utils.indicators import compute_indicators, build_state, advance_state, state_to_indicators, BAR_COLUMNS
 from utils.retry import retry_with_backoff, retry_on_429
 
-# 5 requests per second
-screener_limiter = RateLimiter(4, 1)
-historical_limiter = RateLimiter(4, 1)
-tech_limiter = RateLimiter(4, 1)
-fund_limiter = RateLimiter(4, 1)
-premarket_limiter = RateLimiter(4, 1)
-vwap_limiter = RateLimiter(4, 1)
-
 logger = setup_logger()
 
+# One budget for every endpoint, sized to the plan and adapted on 429s.
+# Live scans use it at "live" priority; backtests switch to "background".
+governor = RateGovernor(
+    FMP_REQUESTS_PER_MINUTE,
+    burst=FMP_RATE_BURST,
+    backend=RATE_LIMIT_BACKEND,
+    state_path=RATE_LIMIT_STATE_FILE,
+)
+
 # Load environment variables from .env
 load_dotenv()
 FMP_API_KEY = os.getenv("FMP_API_KEY")
@@ -27,25 +33,36 @@ FMP_API_KEY = os.getenv("FMP_API_KEY")
 BASE_URL = "https://financialmodelingprep.com/api/v3"
 
 @retry_with_backoff(logger=logger)
-@retry_on_429(logger=logger) 
-def fetch_historical_prices(symbol: str, interval: str = "1day", limit: int = 100):
-    historical_limiter.wait()
-    url = f"{BASE_URL}/historical-price-full/{symbol}?apikey={FMP_API_KEY}&serietype=line"
-    response = requests.get(url)
-    if response.ok:
-        data = response.json().get("historical", [])[:limit]
-        return pd.DataFrame(data).sort_values("date")
-    return None
+@retry_on_429(logger=logger, on_throttle=governor.on_throttle, on_success=governor.on_success)
+def fetch_historical_prices(symbol: str, interval: str = "1day", limit: int = 100, from_date=None, to_date=None):
+    """
+    Daily OHLCV bars, oldest first. With from_date/to_date the whole range is
+    returned; otherwise the latest `limit` days.
+    """
+    governor.wait()
+    url = f"{BASE_URL}/historical-price-full/{symbol}"
+    params = {"apikey": FMP_API_KEY}
+    if from_date or to_date:
+        if from_date:
+            params["from"] = str(from_date)
+        if to_date:
+            params["to"] = str(to_date)
+    else:
+        params["timeseries"] = limit
+    response = http_get(url, params=params, endpoint="historical-price-full")
+    response.raise_for_status()
+    data = response.json().get("historical", [])
+    if not data:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+    prices = pd.DataFrame(data)
+    prices = prices[[col for col in BAR_COLUMNS if col in prices.columns]]
+    prices["date"] = pd.to_datetime(prices["date"])
+    return prices.sort_values("date").reset_index(drop=True)
 
-@retry_with_backoff(logger=logger)
-@retry_on_429(logger=logger) 
 def fetch_fundamentals(symbol):
-    fund_limiter.wait()
     try:
-        url = f"{BASE_URL}/profile/{symbol}?apikey={FMP_API_KEY}"
-        response = requests.get(url)
-        data = response.json()
-        if isinstance(data, list) and data:
+        data = _fetch_profile_chunk([symbol])
+        if data and isinstance(data[0], dict):
             item = data[0]
             return {
                 "beta": item.get("beta"),
@@ -56,24 +73,90 @@ def fetch_fundamentals(symbol):
     return {}
 
 @retry_with_backoff(logger=logger)
-@retry_on_429(logger=logger) 
+@retry_on_429(logger=logger, on_throttle=governor.on_throttle, on_success=governor.on_success)
+def _fetch_profile_chunk(symbols):
+    governor.wait()
+    url = f"{BASE_URL}/profile/{','.join(symbols)}?apikey={FMP_API_KEY}"
+    response = http_get(url, endpoint="profile")
+    response.raise_for_status()
+    data = response.json()
+    return data if isinstance(data, list) else []
+
+def fetch_profiles_batch(symbols, chunk_size=PROFILE_BATCH_SIZE, failed=None) -> dict:
+    """
+    Fetch beta/market cap for many symbols using comma-separated /profile requests.
+
+    Returns a symbol -> {"beta", "market_cap"} map in the same shape as
+    fetch_fundamentals(); symbols missing from the response are absent. The
+    symbols of chunks whose request failed are also appended to `failed`, if
+    given, so callers can tell "no profile" from "not fetched".
+    """
+    fundamentals = {}
+    symbols = list(dict.fromkeys(symbols))
+    for i in range(0, len(symbols), chunk_size):
+        chunk = symbols[i:i + chunk_size]
+        try:
+            for item in _fetch_profile_chunk(chunk):
+                if isinstance(item, dict) and item.get("symbol"):
+                    fundamentals[item["symbol"]] = {
+                        "beta": item.get("beta"),
+                        "market_cap": item.get("mktCap"),
+                    }
+        except Exception as e:
+            print(f"Error fetching profiles for {len(chunk)} symbols: {e}")
+            logger.error(f"Error fetching profiles for {chunk[0]}..{chunk[-1]}: {e}")
+            if failed is not None:
+                failed.extend(chunk)
+    return fundamentals
+
 def fetch_pre_market_change(symbol):
-    premarket_limiter.wait()
     try:
-        url = f"{BASE_URL}/quote/{symbol}?apikey={FMP_API_KEY}"
-        response = requests.get(url)
-        data = response.json()
-        if isinstance(data, list) and data:
-            item = data[0]
-            return item.get("changesPercentage")
+        data = _fetch_quote_chunk([symbol])
+        if data and isinstance(data[0], dict):
+            return data[0].get("changesPercentage")
     except Exception as e:
         print(f"Error fetching pre-market change for {symbol}: {e}")
     return None
 
 @retry_with_backoff(logger=logger)
-@retry_on_429(logger=logger) 
+@retry_on_429(logger=logger, on_throttle=governor.on_throttle, on_success=governor.on_success)
+def _fetch_quote_chunk(symbols):
+    governor.wait()
+    url = f"{BASE_URL}/quote/{','.join(symbols)}?apikey={FMP_API_KEY}"
+    response = http_get(url, endpoint="quote")
+    response.raise_for_status()
+    data = response.json()
+    return data if isinstance(data, list) else []
+
+def fetch_quotes_batch(symbols, chunk_size=QUOTE_BATCH_SIZE) -> dict:
+    """
+    Fetch quotes for many symbols using comma-separated /quote requests.
+
+    Returns a symbol -> quote dict map; symbols missing from the response
+    (or from a failed chunk) are simply absent.
+    """
+    quotes = {}
+    symbols = list(dict.fromkeys(symbols))
+    for i in range(0, len(symbols), chunk_size):
+        chunk = symbols[i:i + chunk_size]
+        try:
+            for item in _fetch_quote_chunk(chunk):
+                if isinstance(item, dict) and item.get("symbol"):
+                    quotes[item["symbol"]] = item
+        except Exception as e:
+            print(f"Error fetching quotes for {len(chunk)} symbols: {e}")
+            logger.error(f"Error fetching quotes for {chunk[0]}..{chunk[-1]}: {e}")
+    return quotes
+
+@retry_with_backoff(logger=logger)
+@retry_on_429(logger=logger, on_throttle=governor.on_throttle, on_success=governor.on_success)
+def _fetch_screener(url, params):
+    governor.wait()
+    response = http_get(url, params=params, endpoint="stock-screener")
+    response.raise_for_status()
+    return response.json()
+
 def fetch_core_screener(limit=500, mode="default"):
-    screener_limiter.wait()
     base_url = f"{BASE_URL}/stock-screener"
 
     # Default base params
@@ -100,33 +183,32 @@ def fetch_core_screener(limit=500, mode="default"):
     elif mode == "debug":
         params["limit"] = 5  # quick testing
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return _fetch_screener(base_url, params)
     except Exception as e:
         print(f"Screener API Error: {e}")
         logger.error(f"Screener API Error: {e}")
         return []
 
 @retry_with_backoff(logger=logger)
-@retry_on_429(logger=logger) 
-def fetch_technicals(symbol: str) -> dict | None:
-    tech_limiter.wait()
+@retry_on_429(logger=logger, on_throttle=governor.on_throttle, on_success=governor.on_success)
+def _fetch_indicator(symbol, indicator, period_length=None, timeframe="15min"):
+    governor.wait()
+    url = f"https://financialmodelingprep.com/stable/technical-indicators/{indicator}"
+    params = {
+        "apikey": FMP_API_KEY,
+        "symbol": symbol,
+        "timeframe": timeframe
+    }
+    if period_length:
+        params["periodLength"] = period_length
+    r = http_get(url, params=params, endpoint=f"technical-indicators/{indicator}")
+    r.raise_for_status()
+    return r.json()
 
+def fetch_technicals(symbol: str) -> dict | None:
     def get_tech(indicator: str, period_length=None, timeframe="15min"):
-        url = f"https://financialmodelingprep.com/stable/technical-indicators/{indicator}"
-        params = {
-            "apikey": FMP_API_KEY,
-            "symbol": symbol,
-            "timeframe": timeframe
-        }
-        if period_length:
-            params["periodLength"] = period_length
-
         try:
-            r = requests.get(url, params=params)
-            r.raise_for_status()
-            data = r.json()
+            data = _fetch_indicator(symbol, indicator, period_length, timeframe)
             if isinstance(data, list) and data:
                 return float(data[0].get(indicator))
             print(f"No data for {symbol} {indicator}")
@@ -147,19 +229,21 @@ def fetch_technicals(symbol: str) -> dict | None:
     return None if all(v is None for v in indicators.values()) else indicators
 
 @retry_with_backoff(logger=logger)
-@retry_on_429(logger=logger) 
-def fetch_vwap_from_eod(symbol: str) -> float | None:
-    vwap_limiter.wait()
+@retry_on_429(logger=logger, on_throttle=governor.on_throttle, on_success=governor.on_success)
+def _fetch_eod(symbol):
+    governor.wait()
     url = "https://financialmodelingprep.com/stable/historical-price-eod/full"
     params = {
         "symbol": symbol,
         "apikey": FMP_API_KEY
     }
+    r = http_get(url, params=params, endpoint="historical-price-eod")
+    r.raise_for_status()
+    return r.json()
 
+def fetch_vwap_from_eod(symbol: str) -> float | None:
     try:
-        r = requests.get(url, params=params)
-        r.raise_for_status()
-        data = r.json()
+        data = _fetch_eod(symbol)
 
         historical = data.get("historical", []) if isinstance(data, dict) else data
         if historical and isinstance(historical[0], dict) and "vwap" in historical[0]:
@@ -173,3 +257,82 @@ def fetch_vwap_from_eod(symbol: str) -> float | None:
         print(f"Error fetching EOD VWAP for {symbol}: {e}")
         logger.error(f"Error fetching EOD VWAP for {symbol}: {e}")
         return None
+
+@retry_with_backoff(logger=logger)
+@retry_on_429(logger=logger, on_throttle=governor.on_throttle, on_success=governor.on_success)
+def fetch_intraday_bars(symbol: str, interval: str = "15min", from_date=None, to_date=None) -> pd.DataFrame | None:
+    governor.wait()
+    url = f"{BASE_URL}/historical-chart/{interval}/{symbol}"
+    params = {"apikey": FMP_API_KEY}
+    if from_date:
+        params["from"] = str(from_date)
+    if to_date:
+        params["to"] = str(to_date)
+
+    r = http_get(url, params=params, endpoint=f"historical-chart/{interval}")
+    r.raise_for_status()
+    data = r.json()
+    if not isinstance(data, list) or not data:
+        return None
+
+    bars = pd.DataFrame(data)
+    if not set(BAR_COLUMNS).issubset(bars.columns):
+        logger.warning(f"Unexpected {interval} bar payload for {symbol}")
+        return None
+    bars = bars[BAR_COLUMNS]
+    bars["date"] = pd.to_datetime(bars["date"])
+    return bars.sort_values("date").reset_index(drop=True)
+
+def _closed_bars(bars, interval_minutes=15):
+    # FMP bar timestamps are bar starts in US/Eastern; drop the bar still forming
+    cutoff = pd.Timestamp.now(tz="US/Eastern").tz_localize(None) - pd.Timedelta(minutes=interval_minutes)
+    return bars[bars["date"] <= cutoff]
+
+def fetch_technicals_local(symbol: str) -> dict | None:
+    """
+    Same result shape as fetch_technicals(), computed from a single 15-min bar
+    download. Like the incremental path, only closed bars are used.
+    """
+    try:
+        from_date = (datetime.now() - timedelta(days=INDICATOR_LOOKBACK_DAYS)).date()
+        bars = fetch_intraday_bars(symbol, from_date=from_date)
+    except Exception as e:
+        print(f"Error fetching 15min bars for {symbol}: {e}")
+        logger.error(f"Error fetching 15min bars for {symbol}: {e}")
+        return None
+
+    if bars is None:
+        logger.warning(f"No 15min bars for {symbol}")
+        return None
+    return compute_indicators(_closed_bars(bars))
+
+def fetch_technicals_incremental(symbol: str, state: dict | None):
+    """
+    Indicators from persisted per-symbol state plus only the closed 15-min
+    bars since state["last_bar_ts"]. Without a usable state the lookback
+    window is downloaded once and a fresh state is built.
+
+    Returns:
+        (indicators, state): indicators in fetch_technicals() shape, or None
+        when no bars could be fetched, and the updated state to persist (or None).
+    """
+    lookback_start = (datetime.now() - timedelta(days=INDICATOR_LOOKBACK_DAYS)).date()
+    if state is not None and state["last_bar_ts"].date() < lookback_start:
+        state = None
+
+    try:
+        from_date = state["last_bar_ts"].date() if state else lookback_start
+        bars = fetch_intraday_bars(symbol, from_date=from_date)
+    except Exception as e:
+        print(f"Error fetching 15min bars for {symbol}: {e}")
+        logger.error(f"Error fetching 15min bars for {symbol}: {e}")
+        return None, state
+
+    # The stored state may be days old (and carry an earlier session's VWAP);
+    # without fresh bars the symbol fails rather than scoring stale indicators
+    if bars is None:
+        logger.warning(f"No 15min bars for {symbol}")
+        return None, state
+    bars = _closed_bars(bars)
+    state = advance_state(state, bars) if state else build_state(bars)
+    return state_to_indicators(state), state
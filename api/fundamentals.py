@@ -0,0 +1,105 @@
+# api/fundamentals.py
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pytz import timezone as pytz_timezone
+
+from api.fmp_client import fetch_profiles_batch
+from config.settings import FUNDAMENTALS_LRU_SIZE
+from db.cache import load_fundamentals_cache, upsert_fundamentals_cache
+from utils.logger import setup_logger
+
+ET = pytz_timezone("US/Eastern")
+logger = setup_logger()
+
+# Cached for symbols /profile returned nothing for
+EMPTY_FUNDAMENTALS = {"beta": None, "market_cap": None}
+
+# (symbol, trading_day) -> {"beta", "market_cap"}; entries expire naturally with the day key
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+def trading_day_et():
+    return datetime.now(ET).date()
+
+
+def _remember(symbol, trading_day, fundamentals):
+    with _lru_lock:
+        _lru[(symbol, trading_day)] = fundamentals
+        _lru.move_to_end((symbol, trading_day))
+        while len(_lru) > FUNDAMENTALS_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def clear_fundamentals_lru():
+    with _lru_lock:
+        _lru.clear()
+
+
+def fundamentals_from_screener(stocks):
+    """{symbol: {"beta", "market_cap"}} for /stock-screener rows that carry both."""
+    return {
+        stock["symbol"]: {"beta": stock["beta"], "market_cap": stock["marketCap"]}
+        for stock in stocks
+        if stock.get("symbol") and stock.get("beta") is not None and stock.get("marketCap") is not None
+    }
+
+
+def seed_fundamentals(fundamentals, trading_day=None):
+    """
+    Store fundamentals obtained elsewhere (e.g. the screener payload) in both
+    caches, so get_fundamentals_batch() does not re-fetch them from /profile.
+    """
+    if not fundamentals:
+        return
+    trading_day = trading_day or trading_day_et()
+    for symbol, values in fundamentals.items():
+        _remember(symbol, trading_day, values)
+    upsert_fundamentals_cache(fundamentals, trading_day)
+
+
+def get_fundamentals_batch(symbols, trading_day=None) -> dict:
+    """
+    Beta/market cap for many symbols, looked up in order: in-process LRU,
+    Postgres fundamentals_cache for the trading day, then batched /profile
+    requests for whatever is still missing (written back to both caches,
+    EMPTY_FUNDAMENTALS for symbols the response left out).
+    """
+    trading_day = trading_day or trading_day_et()
+    result = {}
+    missing = []
+
+    with _lru_lock:
+        for symbol in dict.fromkeys(symbols):
+            key = (symbol, trading_day)
+            if key in _lru:
+                _lru.move_to_end(key)
+                result[symbol] = _lru[key]
+            else:
+                missing.append(symbol)
+
+    if missing:
+        cached = load_fundamentals_cache(missing, trading_day)
+        for symbol, fundamentals in cached.items():
+            _remember(symbol, trading_day, fundamentals)
+        result.update(cached)
+        missing = [s for s in missing if s not in cached]
+
+    if missing:
+        failed = []
+        fetched = fetch_profiles_batch(missing, failed=failed)
+        # Symbols /profile does not know are cached empty for the day, so rescans
+        # do not ask again; those in failed requests are retried next time
+        failed = set(failed)
+        unknown = [s for s in missing if s not in fetched and s not in failed]
+        profiles = len(fetched)
+        fetched.update({symbol: dict(EMPTY_FUNDAMENTALS) for symbol in unknown})
+        upsert_fundamentals_cache(fetched, trading_day)
+        for symbol, fundamentals in fetched.items():
+            _remember(symbol, trading_day, fundamentals)
+        result.update(fetched)
+        logger.info(f"Fundamentals: {profiles}/{len(missing)} fetched from /profile ({len(unknown)} without a profile, "
+                    f"{len(failed)} failed), {len(result) - len(fetched)} from cache")
+
+    return result
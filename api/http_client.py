@@ -0,0 +1,105 @@
+# api/http_client.py
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# One adapter (and therefore one urllib3 connection pool) is shared by every
+# thread. Each thread gets its own Session mounted on that adapter, so sessions
+# never share mutable state while TCP/TLS connections are still reused.
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=HTTP_POOL_SIZE,
+    pool_block=True,
+)
+_local = threading.local()
+
+_stats = defaultdict(lambda: {"requests": 0, "errors": 0, "throttled": 0, "seconds": 0.0})
+_stats_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.mount("https://", _adapter)
+        session.mount("http://", _adapter)
+        _local.session = session
+    return session
+
+
+def _record(endpoint, elapsed, status_code=None, error=False):
+    with _stats_lock:
+        entry = _stats[endpoint or "other"]
+        entry["requests"] += 1
+        entry["seconds"] += elapsed
+        if error or (status_code is not None and status_code >= 400):
+            entry["errors"] += 1
+        if status_code == 429:
+            entry["throttled"] += 1
+
+
+def http_get(url, params=None, endpoint=None, timeout=None):
+    """
+    GET through the shared connection pool.
+
+    Args:
+        url (str): Full request URL.
+        params (dict): Optional query parameters.
+        endpoint (str): Label used to group connection stats (e.g. "quote").
+        timeout (float | tuple): Overrides the configured (connect, read) timeouts.
+    """
+    session = get_session()
+    start = time.perf_counter()
+    try:
+        response = session.get(
+            url,
+            params=params,
+            timeout=timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+        )
+    except requests.exceptions.RequestException:
+        _record(endpoint, time.perf_counter() - start, error=True)
+        raise
+    _record(endpoint, time.perf_counter() - start, status_code=response.status_code)
+    return response
+
+
+def get_pool_stats() -> dict:
+    """Connections opened vs. requests served across all pooled hosts."""
+    connections, requests_served = 0, 0
+    for key in list(_adapter.poolmanager.pools.keys()):
+        pool = _adapter.poolmanager.pools.get(key)
+        if pool is None:
+            continue
+        connections += pool.num_connections
+        requests_served += pool.num_requests
+    return {"connections_opened": connections, "requests": requests_served}
+
+
+def get_http_stats() -> dict:
+    with _stats_lock:
+        return {endpoint: dict(entry) for endpoint, entry in _stats.items()}
+
+
+def reset_http_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def log_http_stats(log=None):
+    log = log or logger
+    for endpoint, entry in sorted(get_http_stats().items()):
+        avg_ms = entry["seconds"] / entry["requests"] * 1000 if entry["requests"] else 0.0
+        log.info(
+            f"HTTP {endpoint}: {entry['requests']} requests, {entry['errors']} errors, "
+            f"{entry['throttled']} throttled, avg {avg_ms:.0f} ms"
+        )
+    pool = get_pool_stats()
+    log.info(f"HTTP pool: {pool['connections_opened']} connections opened for {pool['requests']} requests")
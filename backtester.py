@@ -1,15 +1,44 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from db import get_connection
+from db import connection, log_pool_metrics
+from db.bulk import copy_rows
+from db.reader import SIGNAL_DEDUP_MODES, bullish_signals_sql
+from db.price_store import load_price_history
 from utils.logger import setup_logger
-from api.fmp_client import fetch_historical_prices
-from utils.exporter import export_backtest_results_to_excel
+from api.fmp_client import governor
+from utils.exporter import export_backtest_result_chunks, export_sweep_results
+from utils.backtest_engine import (
+    build_price_matrix, build_bar_matrices, cooldown_mask, simulate_trades_parallel, simulate_bars_parallel, sweep,
+)
+from config.settings import (
+    BACKTEST_WORKERS, BACKTEST_SIGNAL_CHUNK_ROWS, BACKTEST_SIGNAL_DEDUP, BACKTEST_SIGNAL_COOLDOWN_MINUTES,
+    BACKTEST_INTRADAY_HOLD_BARS,
+)
 import argparse
 from collections import Counter
+from itertools import product
+from pytz import timezone as pytz_timezone
 
 logger = setup_logger("backtester")
 
-def simulate_trade(prices, buy_price, target_pct, stop_loss_pct):
+BACKTEST_RESULT_COLUMNS = [
+    "symbol", "signal_date", "buy_price", "sell_price",
+    "sell_date", "gain_pct", "holding_days", "result", "company_name",
+]
+
+# Calendar days loaded past the last signal to cover hold_days trading days
+CALENDAR_BUFFER_DAYS = 7
+# 15-minute bars in a regular 09:30-16:00 session
+INTRADAY_BARS_PER_DAY = 26
+
+ET = pytz_timezone("US/Eastern")
+
+# Backtests share the FMP budget with live scans but yield to them (see run_backtest/run_sweep)
+BACKTEST_PRIORITY = "background"
+
+def simulate_trade(prices, buy_price, target_pct=0.05, stop_loss_pct=-0.03):
+    """Reference per-signal simulation; run_backtest uses utils.backtest_engine."""
     for i, row in prices.iterrows():
         change = (row['close'] - buy_price) / buy_price
         if change >= target_pct:
@@ -21,56 +50,200 @@ def simulate_trade(prices, buy_price, target_pct, stop_loss_pct):
     change = (last['close'] - buy_price) / buy_price
     return last['close'], last['date'], change, (last['date'] - prices.iloc[0]['date']).days, 'neutral'
 
-def run_backtest(hold_days=10, target_pct=0.05, stop_loss_pct=-0.03, history_days=None):
-    conn = get_connection()
-    cur = conn.cursor()
+def apply_cooldown(rows, cooldown_minutes=BACKTEST_SIGNAL_COOLDOWN_MINUTES):
+    """Signal rows minus those within cooldown_minutes of the symbol's previous kept signal."""
+    if not rows:
+        return rows
+    keep = cooldown_mask([row[0] for row in rows], [row[4] for row in rows], np.timedelta64(cooldown_minutes, "m"))
+    return [row for row, kept in zip(rows, keep) if kept]
+
+def load_signals(history_days=None, dedup=BACKTEST_SIGNAL_DEDUP, with_rsi=False):
+    """
+    Bullish signals oldest first: (symbol, company_name, signal_date, buy_price,
+    signal_time[, rsi14]), consolidated per symbol by `dedup`.
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(bullish_signals_sql(dedup, history_days, with_rsi) + " ORDER BY timestamp")
+        rows = cur.fetchall()
+    return apply_cooldown(rows) if dedup == "cooldown" else rows
+
+def load_signal_paths(rows, hold_days, sync=False, interval="1day"):
+    """
+    Stored bars after each signal (db/price_store.py), up to hold_days bars per signal.
+    Daily paths start the day after the signal date; 15min paths start with the
+    first bar opening at or after the signal's scan time (the bar in progress
+    then traded partly before the signal). Runs offline; with sync=True the
+    missing bars are downloaded first.
 
-    query = """
-        SELECT symbol, company_name, timestamp::date AS signal_date, price AS buy_price
-        FROM day_trading_screener.screener_cache
-        WHERE is_bullish = true
+    Returns:
+        (rows, paths): The signals that have stored bars, and one date/OHLCV frame per signal.
     """
-    if history_days:
-        query += f" AND timestamp >= CURRENT_DATE - INTERVAL '{history_days} days'"
-    query += " ORDER BY timestamp"
+    if not rows:
+        return [], []
 
-    cur.execute(query)
-    rows = cur.fetchall()
+    if sync:
+        from db.price_history_import import sync_price_history
+        start_dates = {}
+        for row in rows:
+            start_dates[row[0]] = min(start_dates.get(row[0], row[2]), row[2])
+        sync_price_history(start_dates, interval=interval)
 
-    logger.info(f"Running backtest on {len(rows)} signals")
-    results = []
+    if interval == "1day":
+        starts = [pd.Timestamp(row[2]) + pd.Timedelta(days=1) for row in rows]
+        span = timedelta(days=hold_days * 2 + CALENDAR_BUFFER_DAYS)
+    else:
+        starts = [pd.to_datetime(row[4], utc=True).ceil("15min") for row in rows]
+        span = timedelta(days=(hold_days // INTRADAY_BARS_PER_DAY + 1) * 2 + CALENDAR_BUFFER_DAYS)
+    first, last = min(starts), max(starts) + span
+    if interval == "1day":
+        first, last = first.date(), last.date()
+    history = load_price_history(sorted({row[0] for row in rows}), first, last, interval)
 
-    for symbol, company_name, signal_date, buy_price in rows:
-        prices = fetch_historical_prices(symbol, start_date=signal_date + timedelta(days=1), days=hold_days)
+    kept, paths, missing = [], [], 0
+    for row, start in zip(rows, starts):
+        bars = history.get(row[0])
+        prices = None if bars is None else bars[bars["date"] >= start].head(hold_days)
         if prices is None or prices.empty:
-            logger.warning(f"No historical data for {symbol} from {signal_date}")
+            missing += 1
             continue
+        kept.append(row)
+        paths.append(prices)
 
-        sell_price, sell_date, gain_pct, hold_days_actual, result = simulate_trade(
-            prices, buy_price, target_pct, stop_loss_pct
-        )
+    if missing:
+        logger.warning(f"{missing} signals have no stored {interval} prices; "
+                       f"run python -m db.price_history_import --interval {interval} (or --sync)")
+    return kept, paths
+
+def stream_signals(history_days=None, chunk_rows=BACKTEST_SIGNAL_CHUNK_ROWS, dedup=BACKTEST_SIGNAL_DEDUP):
+    """
+    Bullish signals in chunks from a server-side (named) cursor, ordered by
+    symbol so that all of a symbol's signals land in the same chunk and share
+    one price load (and a whole-symbol cooldown). Only about one chunk is held
+    in memory at a time.
+    """
+    consolidate = apply_cooldown if dedup == "cooldown" else list
+    with connection() as conn, conn.cursor(name="backtest_signals") as cur:
+        cur.itersize = chunk_rows
+        cur.execute(bullish_signals_sql(dedup, history_days) + " ORDER BY symbol, timestamp")
+        pending = []
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            pending.extend(rows)
+            # Hold back the last symbol; the next fetch may continue it
+            split = len(pending)
+            while split and pending[split - 1][0] == pending[-1][0]:
+                split -= 1
+            if split:
+                yield consolidate(pending[:split])
+                pending = pending[split:]
+        if pending:
+            yield consolidate(pending)
 
-        results.append((
-            symbol, signal_date, buy_price, sell_price,
-            sell_date, gain_pct, hold_days_actual, result, company_name
-        ))
+def backtest_chunks(chunks, hold_days, target_pct, stop_loss_pct, workers, sync=False, mode="daily"):
+    """
+    Simulate and store each chunk of signals; yields each chunk's result tuples.
+    mode="intraday" holds up to hold_days 15-minute bars and checks their highs
+    and lows (utils.backtest_engine.simulate_bars).
+    """
+    interval = "1day" if mode == "daily" else "15min"
+    for rows in chunks:
+        rows, paths = load_signal_paths(rows, hold_days, sync, interval)
+        if not rows:
+            continue
+        signals = [(symbol, company_name, signal_date, float(buy_price)) for symbol, company_name, signal_date, buy_price, *_ in rows]
+        buy_prices = np.array([signal[3] for signal in signals], dtype="float64")
 
-    for row in results:
-        cur.execute("""
-            INSERT INTO day_trading_screener.backtest_results (
-                symbol, signal_date, buy_price, sell_price,
-                sell_date, gain_pct, holding_days, result, company_name
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, row)
+        # All signals at once: one row per signal, one column per bar held
+        if mode == "daily":
+            closes, dates = build_price_matrix(paths, hold_days)
+            sim = simulate_trades_parallel(closes, buy_prices, target_pct, stop_loss_pct, dates, workers=workers)
+            sell_dates = [pd.Timestamp(value).date() for value in sim["sell_date"]]
+            holding_days = [int(value) for value in sim["holding_days"]]
+        else:
+            bars = build_bar_matrices(paths, hold_days)
+            sim = simulate_bars_parallel(bars, buy_prices, target_pct, stop_loss_pct, workers=workers)
+            sell_dates = [pd.Timestamp(value, tz="UTC").tz_convert(ET).date() for value in sim["sell_time"]]
+            holding_days = [(sell_date - signal[2]).days for sell_date, signal in zip(sell_dates, signals)]
 
-    conn.commit()
-    conn.close()
-    logger.info(f"Backtest complete. Inserted {len(results)} results.")
+        results = [
+            (
+                symbol, signal_date, buy_price, float(sim["sell_price"][i]),
+                sell_dates[i], float(sim["gain_pct"][i]),
+                holding_days[i], sim["result"][i], company_name
+            )
+            for i, (symbol, company_name, signal_date, buy_price) in enumerate(signals)
+        ]
 
-    summary = Counter(r[7] for r in results)
+        with connection() as conn, conn.cursor() as cur:
+            copy_rows(cur, "day_trading_screener.backtest_results", BACKTEST_RESULT_COLUMNS, results)
+        yield results
+
+@governor.priority(BACKTEST_PRIORITY)
+def run_backtest(hold_days=10, target_pct=0.05, stop_loss_pct=-0.03, history_days=None, workers=BACKTEST_WORKERS, sync=False, stream=False, dedup=BACKTEST_SIGNAL_DEDUP, mode="daily"):
+    """
+    Simulate every bullish signal on the stored bars; no HTTP unless sync=True.
+    With stream=True signals are read, simulated, stored and exported chunk by
+    chunk (stream_signals), so memory does not grow with the history length.
+    `dedup` is one of db.reader.SIGNAL_DEDUP_MODES. mode="intraday" replays
+    stored 15-minute bars from the first one after the scan, hold_days counting bars.
+    """
+    if stream:
+        chunks = stream_signals(history_days, dedup=dedup)
+        logger.info(f"Running {mode} backtest on streamed signals (dedup: {dedup})")
+    else:
+        rows = load_signals(history_days, dedup)
+        chunks = [rows]
+        logger.info(f"Running {mode} backtest on {len(rows)} signals (dedup: {dedup})")
+
+    summary = Counter()
+
+    def counted(results_chunks):
+        for results in results_chunks:
+            summary.update(r[7] for r in results)
+            logger.info(f"Backtest: {sum(summary.values())} results inserted so far")
+            yield results
+
+    results = counted(backtest_chunks(chunks, hold_days, target_pct, stop_loss_pct, workers, sync, mode))
+    inserted = export_backtest_result_chunks(results, datetime.now())
+
+    logger.info(f"Backtest complete. Inserted {inserted} results.")
     logger.info(f"Result summary: {dict(summary)}")
+    log_pool_metrics(logger)
 
-    export_backtest_results_to_excel(results, datetime.now())
+def sweep_grid(hold_days, targets, stops, rsi_mins=(None,), rsi_maxs=(None,)):
+    """Every combination of the given values, skipping empty RSI bands."""
+    return [
+        {"hold_days": h, "target_pct": t, "stop_loss_pct": s, "rsi_min": lo, "rsi_max": hi}
+        for h, t, s, lo, hi in product(hold_days, targets, stops, rsi_mins, rsi_maxs)
+        if lo is None or hi is None or lo < hi
+    ]
+
+@governor.priority(BACKTEST_PRIORITY)
+def run_sweep(grid, history_days=None, workers=BACKTEST_WORKERS, sync=False, top=10, dedup=BACKTEST_SIGNAL_DEDUP):
+    """
+    Backtest every combination in `grid` (see sweep_grid) on signals and prices
+    loaded once, and export the table ranked by expectancy.
+
+    Returns:
+        pd.DataFrame: The ranked table (utils.backtest_engine.SWEEP_COLUMNS).
+    """
+    rows = load_signals(history_days, dedup, with_rsi=True)
+    max_hold = max(combo["hold_days"] for combo in grid)
+    rows, paths = load_signal_paths(rows, max_hold, sync)
+    logger.info(f"Sweeping {len(grid)} combinations over {len(rows)} signals")
+    if not rows:
+        return None
+
+    closes, _ = build_price_matrix(paths, max_hold)
+    buy_prices = np.array([float(row[3]) for row in rows], dtype="float64")
+    rsi = np.array([np.nan if row[5] is None else row[5] for row in rows], dtype="float64")
+    table = sweep(closes, buy_prices, grid, rsi, workers=workers)
+
+    logger.info(f"Top {top} by expectancy:\n{table.head(top).to_string(index=False)}")
+    export_sweep_results(table, datetime.now())
+    return table
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run backtest simulation on bullish signals")
@@ -78,15 +251,49 @@ if __name__ == "__main__":
     parser.add_argument("--target", type=float, default=0.05, help="Target gain percentage (default: 0.05 = 5%)")
     parser.add_argument("--stop", type=float, default=-0.03, help="Stop loss percentage (default: -0.03 = -3%)")
     parser.add_argument("--history", type=int, help="Limit signals to the last N days")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS, help="Processes for large signal sets (default: CPU count)")
+    parser.add_argument("--sync", action="store_true", help="Download missing bars before running")
+    parser.add_argument("--mode", choices=["daily", "intraday"], default="daily", help="daily closes, or 15-minute bars with high/low exits")
+    parser.add_argument("--hold_bars", type=int, default=BACKTEST_INTRADAY_HOLD_BARS,
+                        help=f"Intraday mode: 15-minute bars to hold (default: {BACKTEST_INTRADAY_HOLD_BARS})")
+    parser.add_argument("--dedup", choices=SIGNAL_DEDUP_MODES, default=BACKTEST_SIGNAL_DEDUP,
+                        help=f"Consolidate repeated signals per symbol (default: {BACKTEST_SIGNAL_DEDUP})")
+    parser.add_argument("--stream", action="store_true", help="Read, simulate and export signals in chunks (flat memory)")
+    parser.add_argument("--sweep", action="store_true", help="Grid-search the values given below instead of one run")
+    parser.add_argument("--hold_grid", type=int, nargs="+", help="Sweep: holding days to try (default: --hold_days)")
+    parser.add_argument("--target_grid", type=float, nargs="+", help="Sweep: targets to try (default: --target)")
+    parser.add_argument("--stop_grid", type=float, nargs="+", help="Sweep: stops to try (default: --stop)")
+    parser.add_argument("--rsi_min_grid", type=float, nargs="+", help="Sweep: minimum signal RSI values to try")
+    parser.add_argument("--rsi_max_grid", type=float, nargs="+", help="Sweep: maximum signal RSI values to try")
 
     args = parser.parse_args()
 
-    run_backtest(
-        hold_days=args.hold_days,
-        target_pct=args.target,
-        stop_loss_pct=args.stop,
-        history_days=args.history
-    )
+    if args.sweep:
+        run_sweep(
+            sweep_grid(
+                args.hold_grid or [args.hold_days],
+                args.target_grid or [args.target],
+                args.stop_grid or [args.stop],
+                args.rsi_min_grid or [None],
+                args.rsi_max_grid or [None],
+            ),
+            history_days=args.history,
+            workers=args.workers,
+            sync=args.sync,
+            dedup=args.dedup
+        )
+    else:
+        run_backtest(
+            hold_days=args.hold_bars if args.mode == "intraday" else args.hold_days,
+            target_pct=args.target,
+            stop_loss_pct=args.stop,
+            history_days=args.history,
+            workers=args.workers,
+            sync=args.sync,
+            stream=args.stream,
+            dedup=args.dedup,
+            mode=args.mode
+        )
 
 
 # how to run
@@ -94,4 +301,15 @@ if __name__ == "__main__":
 # target - profit percentage to exit trade
 # stop - loss percentage to exit trade
 # history - limit signals to the last N days (optional)
+# sync - download missing bars first; without it the backtest makes no HTTP requests
+# dedup - day: first signal per symbol per day; episode: first scan of each bullish run;
+#         cooldown: at most one signal per symbol every BACKTEST_SIGNAL_COOLDOWN_MINUTES; all: every scan
+# stream - server-side cursor, results written and exported per chunk; for months of signals
+#
+# python backtester.py --mode intraday --hold_bars 26 --target 0.02 --stop -0.01 --history 30
+# replays stored 15-minute bars (python -m db.price_history_import --interval 15min) opening after each scan;
+# a bar whose high reaches the target exits there, whose low reaches the stop exits there (stop first if both)
+#
+# python backtester.py --sweep --hold_grid 3 5 10 --target_grid 0.03 0.05 --stop_grid -0.02 -0.03 --rsi_max_grid 60 65 70
+# loads signals and prices once, runs every combination in parallel and exports the table ranked by expectancy
 
@@ -14,10 +14,80 @@ DB_SETTINGS = {
 
 FMP_API_KEY = os.getenv("FMP_API_KEY")
 
-# Batch execution for FMP Starter plan to eliminate 429 errors
+# Shared FMP request budget (Starter plan: 300/min); all endpoints draw from it
+FMP_REQUESTS_PER_MINUTE = 300
+FMP_RATE_BURST = 5
+# "host" shares the budget across processes on this machine (scheduler, manual scans,
+# backtests) through a lock-protected state file; "process" keeps it per process
+RATE_LIMIT_BACKEND = "host"
+RATE_LIMIT_STATE_FILE = os.getenv("RATE_LIMIT_STATE_FILE")  # defaults to a file in the temp dir
+
+# Symbols per batch in "threads" mode (quotes/fundamentals are fetched per batch)
 BATCH_SIZE = 30  
-COOLDOWN_SECONDS  = 30  
 
+# run_screener execution: "threads" (batched ThreadPoolExecutor) or "async"
+# (all symbols in flight at once, paced only by the shared rate limiters)
+EXECUTION_MODE = "threads"
+MAX_WORKERS = 8                # worker threads in "threads" mode
+ASYNC_MAX_IN_FLIGHT = 32       # concurrent symbols in "async" mode
+
+# HTTP client (pooled keep-alive connections to FMP), sized to the larger of the two modes
+HTTP_POOL_SIZE = max(MAX_WORKERS, ASYNC_MAX_IN_FLIGHT)
+HTTP_CONNECT_TIMEOUT = 5       # seconds
+HTTP_READ_TIMEOUT = 20         # seconds
+
+# Postgres connection pool (db.connection()); sized for the busiest execution mode
+DB_POOL_MIN_SIZE = 1
+DB_POOL_MAX_SIZE = HTTP_POOL_SIZE
+DB_POOL_TIMEOUT = 30              # seconds to wait for a free connection
+DB_POOL_HEALTHCHECK_IDLE = 60     # run SELECT 1 on checkout if idle longer than this (seconds)
+
+# Write-behind buffer for screener_cache/premarket_cache: flush every N rows or T seconds
+WRITE_BUFFER_SIZE = 250
+WRITE_BUFFER_INTERVAL = 5         # seconds
+
+# Bulk loads (db/bulk.py): COPY FROM STDIN at or above this many rows, execute_values below
+BULK_COPY_MIN_ROWS = 500
+BULK_COPY_CHUNK_ROWS = 50_000     # rows per COPY statement, bounds the in-memory CSV buffer
+
+# Range partitions (db/partitions.py): created this many days ahead; retention drops whole partitions
+PARTITION_PREMAKE_DAYS = 7
+SCREENER_CACHE_RETENTION_DAYS = 14
+QUOTE_CACHE_RETENTION_DAYS = 30
+
+# Symbols per comma-separated /quote request
+QUOTE_BATCH_SIZE = 100
+
+# Symbols per comma-separated /profile request, and in-process fundamentals LRU size
+PROFILE_BATCH_SIZE = 100
+FUNDAMENTALS_LRU_SIZE = 5000
+
+# Technical indicators: "local" computes RSI/EMA/VWAP from one 15-min bar download,
+# "api" uses FMP's technical-indicators endpoints (4 requests per symbol)
+INDICATOR_SOURCE = "local"
+INDICATOR_LOOKBACK_DAYS = 10   # calendar days of 15-min bars; enough for EMA50 to settle
+INCREMENTAL_INDICATORS = True  # keep per-symbol indicator state and ingest only new bars on rescans
+
+
+# Screening rules (utils/rules.py): JSON file with a list of rule dicts; unset = built-in defaults
+SCREENING_RULES_FILE = os.getenv("SCREENING_RULES_FILE")
+# Rule stage order: "learned" weighs each data source's cost by the share of symbols
+# reaching its stage that it rejected in the last RULE_STATS_DAYS of runs; "cost" uses cost alone
+RULE_ORDER = "learned"
+RULE_STATS_DAYS = 7
+
+# Backtests (utils/backtest_engine.py): processes used once a run exceeds one chunk of signals
+BACKTEST_WORKERS = os.cpu_count() or 1
+BACKTEST_CHUNK_ROWS = 20_000
+# Signals per server-side cursor fetch in backtester.py --stream
+BACKTEST_SIGNAL_CHUNK_ROWS = 5_000
+# Signal consolidation (db/reader.SIGNAL_DEDUP_MODES) and the gap "cooldown" enforces per symbol
+BACKTEST_SIGNAL_DEDUP = "day"
+BACKTEST_SIGNAL_COOLDOWN_MINUTES = 240
+# Intraday backtests (backtester.py --mode intraday): 15-minute bars held per signal (26 = one session)
+BACKTEST_INTRADAY_HOLD_BARS = 26
+# Days of 15-minute bars requested per call when filling the local store
+INTRADAY_FETCH_DAYS = 30
 
 # Scan limits
 FULL_SCAN_LIMIT = 2500         # 🧠 Morning and final full scans
@@ -25,4 +95,4 @@ WATCHLIST_SCAN_LIMIT = 500     # ⏱️ Watchlist scans throughout the day
 DEBUG_SCAN_LIMIT = 50          # 🐞 For manual tests and dev runs
 
 #
-TIGHTEN=True  # 🛠️ Use optional filters in scans
\ No newline at end of file
+TIGHTEN=True  # 🛠️ Use optional filters in scans
@@ -1,14 +1,154 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from dotenv import load_dotenv
 
+from config.settings import (
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT, DB_POOL_HEALTHCHECK_IDLE,
+)
+
 load_dotenv()
 
-def get_connection():
-    return psycopg2.connect(
+def _connect_kwargs():
+    return dict(
         host=os.getenv("PG_HOST"),
         port=os.getenv("PG_PORT"),
         database=os.getenv("PG_DB"),
         user=os.getenv("PG_USER"),
         password=os.getenv("PG_PASSWORD")
     )
+
+def get_connection():
+    """A new, unpooled connection. Prefer `with connection() as conn:`."""
+    return psycopg2.connect(**_connect_kwargs())
+
+
+class ConnectionPool:
+    """
+    Thread-safe, blocking wrapper around psycopg2's ThreadedConnectionPool.
+
+    Callers wait up to `timeout` seconds for a free connection instead of
+    getting PoolError, connections idle longer than `healthcheck_idle` are
+    checked with SELECT 1 before being handed out, and basic usage metrics
+    are kept for logging at the end of a run.
+    """
+    def __init__(self, minconn, maxconn, timeout=DB_POOL_TIMEOUT, healthcheck_idle=DB_POOL_HEALTHCHECK_IDLE, **conn_kwargs):
+        self._pool = ThreadedConnectionPool(minconn, maxconn, **conn_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self.metrics = {
+            "checkouts": 0, "waits": 0, "wait_seconds": 0.0,
+            "in_use": 0, "max_in_use": 0, "discarded": 0,
+        }
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.healthcheck_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        waited = not self._slots.acquire(blocking=False)
+        if waited and not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"No database connection available within {self.timeout}s")
+        try:
+            conn = self._pool.getconn()
+            while not self._healthy(conn):
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                with self._lock:
+                    self.metrics["discarded"] += 1
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.metrics["checkouts"] += 1
+            self.metrics["in_use"] += 1
+            self.metrics["max_in_use"] = max(self.metrics["max_in_use"], self.metrics["in_use"])
+            if waited:
+                self.metrics["waits"] += 1
+                self.metrics["wait_seconds"] += time.monotonic() - start
+        return conn
+
+    def putconn(self, conn, close=False):
+        try:
+            if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close or conn.closed)
+        finally:
+            with self._lock:
+                self.metrics["in_use"] -= 1
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, **_connect_kwargs())
+    return _pool
+
+@contextmanager
+def connection():
+    """
+    Borrow a pooled connection; commits on success, rolls back on error
+    and always returns the connection to the pool.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+def pool_metrics():
+    return dict(_pool.metrics) if _pool is not None else {}
+
+def log_pool_metrics(logger):
+    metrics = pool_metrics()
+    if not metrics:
+        return
+    logger.info(
+        f"DB pool: {metrics['checkouts']} checkouts, max {metrics['max_in_use']}/{_pool.maxconn} in use, "
+        f"{metrics['waits']} waits ({metrics['wait_seconds']:.2f}s), {metrics['discarded']} unhealthy discarded"
+    )
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,87 @@
+# db/bulk.py
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+
+from psycopg2.extras import execute_values
+
+from config.settings import BULK_COPY_MIN_ROWS, BULK_COPY_CHUNK_ROWS
+
+NULL = r"\N"
+
+
+def _csv_value(value):
+    if value is None:
+        return NULL
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, float) and value != value:  # NaN
+        return NULL
+    return value
+
+
+def _csv_buffer(rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row])
+    buf.seek(0)
+    return buf
+
+
+def copy_rows(cur, table, columns, rows, min_copy_rows=BULK_COPY_MIN_ROWS, chunk_rows=BULK_COPY_CHUNK_ROWS):
+    """
+    Bulk-insert tuples into `table` on an open cursor.
+
+    Uses COPY ... FROM STDIN (CSV streamed from an in-memory buffer, one
+    statement per `chunk_rows`) and falls back to execute_values for batches
+    smaller than `min_copy_rows`, where COPY's setup cost does not pay off.
+
+    Args:
+        cur: psycopg2 cursor; the caller owns the transaction.
+        table (str): Schema-qualified table name.
+        columns (list[str]): Column names matching each tuple's order.
+        rows (iterable[tuple]): Rows to insert. May be a generator.
+
+    Returns:
+        int: Number of rows written.
+    """
+    column_list = ", ".join(columns)
+    rows = iter(rows)
+    first = list(islice(rows, min_copy_rows))
+    if len(first) < min_copy_rows:
+        if first:
+            execute_values(cur, f"INSERT INTO {table} ({column_list}) VALUES %s", first, page_size=1000)
+        return len(first)
+
+    sql = f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+    total = 0
+    chunk = first + list(islice(rows, max(0, chunk_rows - len(first))))
+    while chunk:
+        cur.copy_expert(sql, _csv_buffer(chunk))
+        total += len(chunk)
+        chunk = list(islice(rows, chunk_rows))
+    return total
+
+
+def merge_symbols(cur, symbols, table="day_trading_screener.ticker_rotation"):
+    """
+    Set-based symbol import: COPY `symbols` into a temp table, then add the
+    new ones to `table` with a single INSERT ... SELECT DISTINCT ... ON CONFLICT.
+
+    Returns:
+        (inserted, skipped): skipped counts duplicates within the input as
+        well as symbols already present, like the row-by-row importers.
+    """
+    cur.execute("CREATE TEMP TABLE tmp_symbol_import (symbol TEXT) ON COMMIT DROP")
+    staged = copy_rows(cur, "tmp_symbol_import", ["symbol"], ((s,) for s in symbols), min_copy_rows=0)
+    cur.execute(f"""
+        INSERT INTO {table} (symbol)
+        SELECT DISTINCT symbol FROM tmp_symbol_import
+        ON CONFLICT (symbol) DO NOTHING
+    """)
+    inserted = max(cur.rowcount, 0)
+    return inserted, staged - inserted
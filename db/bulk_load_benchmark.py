@@ -0,0 +1,50 @@
+# db/bulk_load_benchmark.py
+# Measures rows/second for COPY vs execute_values into a temp copy of stock_result.
+#   python -m db.bulk_load_benchmark --sizes 2500 50000 500000
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+from db import get_connection
+from db.bulk import copy_rows
+from db.writer import STOCK_RESULT_COLUMNS
+
+
+def synthetic_rows(n):
+    now = datetime.now(timezone.utc)
+    for i in range(n):
+        yield (
+            1, f"SYM{i % 5000}", f"Company {i % 5000}", round(random.uniform(1, 500), 2),
+            random.random() > 0.5, random.random() > 0.5, random.random() > 0.5,
+            1.0 if random.random() > 0.9 else 0.0, now,
+        )
+
+
+def run_benchmark(sizes):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE bench_stock_result
+                (LIKE day_trading_screener.stock_result INCLUDING DEFAULTS)
+            """)
+            print(f"{'rows':>10} {'method':>15} {'seconds':>9} {'rows/s':>12}")
+            for n in sizes:
+                for method, min_copy_rows in (("copy", 0), ("execute_values", n + 1)):
+                    rows = list(synthetic_rows(n))
+                    cur.execute("TRUNCATE bench_stock_result")
+                    start = time.perf_counter()
+                    copy_rows(cur, "bench_stock_result", STOCK_RESULT_COLUMNS, rows, min_copy_rows=min_copy_rows)
+                    elapsed = time.perf_counter() - start
+                    print(f"{n:>10} {method:>15} {elapsed:>9.3f} {n / elapsed:>12,.0f}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk loading into stock_result")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2_500, 50_000, 500_000])
+    args = parser.parse_args()
+    run_benchmark(args.sizes)
@@ -1,12 +1,12 @@
-from db import get_connection
+from db import connection
+from psycopg2.extras import execute_values
 from utils.logger import setup_logger
 
 logger = setup_logger()
 
 def upsert_screener_cache(data):
     try:
-        conn = get_connection()
-        with conn.cursor() as cur:
+        with connection() as conn, conn.cursor() as cur:
             cur.execute("""
                 INSERT INTO day_trading_screener.screener_cache (
                     symbol, company_name, price, rsi14, ema20, ema50, vwap,
@@ -27,17 +27,12 @@ def upsert_screener_cache(data):
                     failure_reason = EXCLUDED.failure_reason,
                     timestamp = EXCLUDED.timestamp
             """, data)
-        conn.commit()
     except Exception as e:
         logger.error(f"Error in upsert_screener_cache: {e}")
-    finally:
-        if conn:
-            conn.close()
 
 def upsert_premarket_cache(symbol, change_pct):
     try:
-        conn = get_connection()
-        with conn.cursor() as cur:
+        with connection() as conn, conn.cursor() as cur:
             cur.execute("""
                 INSERT INTO day_trading_screener.premarket_cache (symbol, pre_market_change_pct, timestamp)
                 VALUES (%s, %s, CURRENT_TIMESTAMP)
@@ -45,9 +40,116 @@ def upsert_premarket_cache(symbol, change_pct):
                     pre_market_change_pct = EXCLUDED.pre_market_change_pct,
                     timestamp = EXCLUDED.timestamp
             """, (symbol, change_pct))
-        conn.commit()
     except Exception as e:
         logger.error(f"Error in upsert_premarket_cache: {e}")
-    finally:
-        if conn:
-            conn.close()
+
+SCREENER_CACHE_COLUMNS = [
+    "symbol", "company_name", "price", "rsi14", "ema20", "ema50", "vwap",
+    "is_bullish", "failure_reason", "timestamp",
+]
+
+def bulk_upsert_screener_cache(rows):
+    """Upsert many screener_cache rows in one statement; rows must be unique on (symbol, timestamp)."""
+    if not rows:
+        return
+    values = [tuple(row.get(col) for col in SCREENER_CACHE_COLUMNS) for row in rows]
+    with connection() as conn, conn.cursor() as cur:
+        execute_values(cur, f"""
+            INSERT INTO day_trading_screener.screener_cache ({", ".join(SCREENER_CACHE_COLUMNS)})
+            VALUES %s
+            ON CONFLICT (symbol,timestamp) DO UPDATE SET
+                {", ".join(f"{col} = EXCLUDED.{col}" for col in SCREENER_CACHE_COLUMNS[1:-1])}
+        """, values, page_size=1000)
+
+def bulk_upsert_premarket_cache(changes):
+    """Upsert symbol -> pre-market change % pairs in one statement."""
+    if not changes:
+        return
+    with connection() as conn, conn.cursor() as cur:
+        execute_values(cur, """
+            INSERT INTO day_trading_screener.premarket_cache (symbol, pre_market_change_pct, timestamp)
+            VALUES %s
+            ON CONFLICT (symbol) DO UPDATE SET
+                pre_market_change_pct = EXCLUDED.pre_market_change_pct,
+                timestamp = EXCLUDED.timestamp
+        """, list(changes.items()), template="(%s, %s, CURRENT_TIMESTAMP)", page_size=1000)
+
+def load_fundamentals_cache(symbols, trading_day):
+    if not symbols:
+        return {}
+    try:
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT symbol, beta, market_cap
+                FROM day_trading_screener.fundamentals_cache
+                WHERE trading_day = %s AND symbol = ANY(%s)
+            """, (trading_day, list(symbols)))
+            return {
+                row[0]: {
+                    "beta": float(row[1]) if row[1] is not None else None,
+                    "market_cap": int(row[2]) if row[2] is not None else None,
+                }
+                for row in cur.fetchall()
+            }
+    except Exception as e:
+        logger.error(f"Error in load_fundamentals_cache: {e}")
+        return {}
+
+def upsert_fundamentals_cache(fundamentals, trading_day):
+    if not fundamentals:
+        return
+    rows = [
+        (symbol, trading_day, item.get("beta"), item.get("market_cap"))
+        for symbol, item in fundamentals.items()
+    ]
+    try:
+        with connection() as conn, conn.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO day_trading_screener.fundamentals_cache (symbol, trading_day, beta, market_cap)
+                VALUES %s
+                ON CONFLICT (symbol, trading_day) DO UPDATE SET
+                    beta = EXCLUDED.beta,
+                    market_cap = EXCLUDED.market_cap,
+                    fetched_at = CURRENT_TIMESTAMP
+            """, rows)
+    except Exception as e:
+        logger.error(f"Error in upsert_fundamentals_cache: {e}")
+
+INDICATOR_STATE_COLUMNS = [
+    "ema20", "ema50", "avg_gain", "avg_loss", "last_close", "session_date",
+    "cum_pv", "cum_volume", "last_bar_ts", "bar_count",
+]
+
+def load_indicator_states(symbols):
+    if not symbols:
+        return {}
+    try:
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT symbol, {", ".join(INDICATOR_STATE_COLUMNS)}
+                FROM day_trading_screener.indicator_state
+                WHERE symbol = ANY(%s)
+            """, (list(symbols),))
+            return {row[0]: dict(zip(INDICATOR_STATE_COLUMNS, row[1:])) for row in cur.fetchall()}
+    except Exception as e:
+        logger.error(f"Error in load_indicator_states: {e}")
+        return {}
+
+def upsert_indicator_states(states):
+    if not states:
+        return
+    rows = [
+        (symbol, *(state[col] for col in INDICATOR_STATE_COLUMNS))
+        for symbol, state in states.items()
+    ]
+    try:
+        with connection() as conn, conn.cursor() as cur:
+            execute_values(cur, f"""
+                INSERT INTO day_trading_screener.indicator_state (symbol, {", ".join(INDICATOR_STATE_COLUMNS)})
+                VALUES %s
+                ON CONFLICT (symbol) DO UPDATE SET
+                    {", ".join(f"{col} = EXCLUDED.{col}" for col in INDICATOR_STATE_COLUMNS)},
+                    updated_at = CURRENT_TIMESTAMP
+            """, rows)
+    except Exception as e:
+        logger.error(f"Error in upsert_indicator_states: {e}")
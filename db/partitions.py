@@ -0,0 +1,158 @@
+"""
+Range partitions for the time-series tables.
+
+screener_cache and quote_cache are partitioned by day, stock_result by month.
+Partitions are named <table>_pYYYYMMDD / <table>_pYYYYMM (bounds are UTC) and
+created PARTITION_PREMAKE_DAYS ahead, so inserts never wait on DDL. Each table
+also has a <table>_default partition that catches out-of-range rows.
+
+Retention detaches and drops whole partitions instead of DELETE-ing rows:
+constant time regardless of history, and no bloat left behind for VACUUM.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from db import connection
+from config.settings import PARTITION_PREMAKE_DAYS
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+SCHEMA = "day_trading_screener"
+
+# table -> (partition key column, "day" | "month")
+PARTITIONED_TABLES = {
+    "screener_cache": ("timestamp", "day"),
+    "stock_result": ("created_at", "month"),
+    "quote_cache": ("fetched_at", "day"),
+}
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date()
+
+def partition_start(day, interval):
+    return day.replace(day=1) if interval == "month" else day
+
+def next_start(start, interval):
+    if interval == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+def partition_name(table, start, interval):
+    return f"{table}_p{start:%Y%m}" if interval == "month" else f"{table}_p{start:%Y%m%d}"
+
+def partition_bounds(table, name):
+    """(start, end) dates of a partition from its name; None for the default partition."""
+    suffix = name[len(table) + 2:]
+    if not name.startswith(f"{table}_p") or not suffix.isdigit():
+        return None
+    if len(suffix) == 6:
+        start = date(int(suffix[:4]), int(suffix[4:]), 1)
+        return start, next_start(start, "month")
+    start = datetime.strptime(suffix, "%Y%m%d").date()
+    return start, next_start(start, "day")
+
+def partition_ranges(table, first_day, last_day):
+    """[(name, start, end)] of the partitions covering first_day..last_day inclusive."""
+    _, interval = PARTITIONED_TABLES[table]
+    ranges = []
+    start = partition_start(first_day, interval)
+    while start <= last_day:
+        end = next_start(start, interval)
+        ranges.append((partition_name(table, start, interval), start, end))
+        start = end
+    return ranges
+
+def existing_partitions(cur, table):
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (f"{SCHEMA}.{table}",))
+    return {row[0] for row in cur.fetchall()}
+
+
+def ensure_partitions(cur, table, first_day=None, ahead_days=PARTITION_PREMAKE_DAYS, today=None):
+    """
+    Create the missing partitions of `table` from `first_day` (default: today)
+    through today + ahead_days, plus the default partition.
+
+    Only missing partitions are created, so when nothing is due this is a
+    single catalog query and takes no lock on the parent table.
+
+    Returns:
+        list[str]: Names of the partitions created.
+    """
+    today = today or utc_today()
+    existing = existing_partitions(cur, table)
+    created = []
+
+    default = f"{table}_default"
+    if default not in existing:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {SCHEMA}.{default} PARTITION OF {SCHEMA}.{table} DEFAULT")
+        created.append(default)
+
+    for name, start, end in partition_ranges(table, first_day or today, today + timedelta(days=ahead_days)):
+        if name in existing:
+            continue
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SCHEMA}.{name} PARTITION OF {SCHEMA}.{table}
+            FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00')
+        """)
+        created.append(name)
+    return created
+
+
+def expired_partitions(table, names, cutoff):
+    """Partitions among `names` whose whole range lies before `cutoff`, oldest first."""
+    expired = []
+    for name in names:
+        bounds = partition_bounds(table, name)
+        if bounds and bounds[1] <= cutoff:
+            expired.append((bounds[0], name))
+    return [name for _, name in sorted(expired)]
+
+
+def drop_expired_partitions(cur, table, retention_days, today=None, drop=True):
+    """
+    Detach (and by default drop) the partitions of `table` older than
+    `retention_days`, and trim the few out-of-range rows in its default partition.
+
+    Args:
+        drop (bool): False keeps detached partitions as standalone tables for archiving.
+
+    Returns:
+        list[str]: Names of the partitions removed from `table`.
+    """
+    column, _ = PARTITIONED_TABLES[table]
+    cutoff = (today or utc_today()) - timedelta(days=retention_days)
+    expired = expired_partitions(table, existing_partitions(cur, table), cutoff)
+
+    for name in expired:
+        cur.execute(f"ALTER TABLE {SCHEMA}.{table} DETACH PARTITION {SCHEMA}.{name}")
+        if drop:
+            cur.execute(f"DROP TABLE {SCHEMA}.{name}")
+    cur.execute(
+        f"DELETE FROM {SCHEMA}.{table}_default WHERE {column} < %s",
+        (datetime.combine(cutoff, datetime.min.time(), tzinfo=timezone.utc),)
+    )
+    return expired
+
+
+def maintain_partitions(ahead_days=PARTITION_PREMAKE_DAYS, today=None):
+    """Create upcoming partitions for every partitioned table; never raises."""
+    created = {}
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                for table in PARTITIONED_TABLES:
+                    created[table] = ensure_partitions(cur, table, ahead_days=ahead_days, today=today)
+    except Exception as e:
+        logger.error(f"Error in maintain_partitions: {e}")
+        return created
+
+    made = sum(len(names) for names in created.values())
+    if made:
+        logger.info(f"Created {made} partitions ahead of time: {created}")
+    return created
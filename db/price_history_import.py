@@ -0,0 +1,163 @@
+"""
+Bulk downloader for the local price store (db/price_store.py): daily bars, or
+15-minute bars with --interval 15min.
+
+Each symbol is fetched once per run, and only for the dates not stored yet
+(before the first stored date, or from the last one on: that day may have been
+stored while still trading, so it is fetched again and overwritten), so
+re-running is cheap and a backtest afterwards needs no network at all.
+
+    python -m db.price_history_import --history 180     # every symbol with a bullish signal
+    python -m db.price_history_import --symbols AAPL MSFT --since 2024-01-01
+    python -m db.price_history_import --history 30 --interval 15min
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+from pytz import timezone as pytz_timezone
+
+from db import connection
+from db.price_store import stored_date_ranges, save_price_history
+from api.fmp_client import fetch_historical_prices, fetch_intraday_bars, governor
+from config.settings import MAX_WORKERS, INTRADAY_FETCH_DAYS
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# FMP intraday bar times are US/Eastern wall-clock times
+ET = pytz_timezone("US/Eastern")
+
+
+def signal_symbols(history_days=None):
+    """{symbol: first bullish signal date} from screener_cache."""
+    query = """
+        SELECT symbol, MIN(timestamp)::date
+        FROM day_trading_screener.screener_cache
+        WHERE is_bullish = true
+    """
+    if history_days:
+        query += f" AND timestamp >= CURRENT_DATE - INTERVAL '{int(history_days)} days'"
+    query += " GROUP BY symbol"
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(query)
+        return dict(cur.fetchall())
+
+
+def missing_ranges(start_date, end_date, stored):
+    """
+    Date ranges in [start_date, end_date] to fetch given the stored (first, last)
+    span: the days before it, and the days after it including `last` itself.
+    """
+    if stored is None:
+        return [(start_date, end_date)]
+    first, last = stored
+    ranges = []
+    if start_date < first:
+        ranges.append((start_date, first - timedelta(days=1)))
+    if last <= end_date:
+        ranges.append((max(start_date, last), end_date))
+    return [(a, b) for a, b in ranges if a <= b]
+
+
+def split_range(start_date, end_date, days):
+    """[start_date, end_date] as consecutive ranges of at most `days` days."""
+    ranges = []
+    while start_date <= end_date:
+        stop = min(end_date, start_date + timedelta(days=days - 1))
+        ranges.append((start_date, stop))
+        start_date = stop + timedelta(days=1)
+    return ranges
+
+
+def _bar_time(timestamp, interval):
+    if interval == "1day":
+        return timestamp.date()
+    return ET.localize(timestamp.to_pydatetime()).astimezone(timezone.utc)
+
+
+def _price_rows(symbol, prices, interval="1day"):
+    return [
+        (
+            symbol, _bar_time(row.date, interval),
+            None if row.open != row.open else float(row.open),
+            None if row.high != row.high else float(row.high),
+            None if row.low != row.low else float(row.low),
+            float(row.close),
+            None if row.volume != row.volume else int(row.volume),
+        )
+        for row in prices.reindex(columns=["date", "open", "high", "low", "close", "volume"]).itertuples(index=False)
+        if row.close == row.close
+    ]
+
+
+def _stored_days(stored, interval):
+    if stored is None or interval == "1day":
+        return stored
+    return tuple(value.astimezone(ET).date() for value in stored)
+
+
+def sync_price_history(start_dates, end_date=None, workers=MAX_WORKERS, interval="1day"):
+    """
+    Download the missing bars for every symbol and store them.
+
+    Args:
+        start_dates (dict): symbol -> first date needed.
+        end_date (date): Last date needed (default: today).
+        interval (str): "1day" or "15min" (see db.price_store.PRICE_TABLES).
+
+    Returns:
+        (symbols_fetched, rows_written)
+    """
+    end_date = end_date or date.today()
+    stored = stored_date_ranges(list(start_dates), interval)
+    jobs = [
+        (symbol, a, b)
+        for symbol, start in start_dates.items()
+        for a, b in missing_ranges(start, end_date, _stored_days(stored.get(symbol), interval))
+    ]
+    if interval != "1day":
+        # The intraday endpoint caps how much one request returns
+        jobs = [(symbol, x, y) for symbol, a, b in jobs for x, y in split_range(a, b, INTRADAY_FETCH_DAYS)]
+    logger.info(f"Price history: {len(jobs)} ranges to fetch for {len(start_dates)} symbols "
+                f"({len(start_dates) - len({job[0] for job in jobs})} already complete)")
+    if not jobs:
+        return 0, 0
+
+    def fetch(job):
+        symbol, a, b = job
+        try:
+            if interval == "1day":
+                prices = fetch_historical_prices(symbol, from_date=a, to_date=b)
+            else:
+                prices = fetch_intraday_bars(symbol, interval, from_date=a, to_date=b)
+        except Exception as e:
+            logger.warning(f"{symbol}: {interval} price history fetch failed: {e}")
+            return []
+        return _price_rows(symbol, prices, interval) if prices is not None else []
+
+    # Bulk downloads yield to live scans on the shared FMP budget
+    rows = []
+    with governor.priority("background"), ThreadPoolExecutor(max_workers=workers) as executor:
+        for symbol_rows in executor.map(fetch, jobs):
+            rows.extend(symbol_rows)
+
+    written = save_price_history(rows, interval) if rows else 0
+    return len({job[0] for job in jobs}), written
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Download missing bars into the local price store")
+    parser.add_argument("--symbols", nargs="+", help="Symbols to sync (default: all with bullish signals)")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="First date for --symbols (default: 1 year ago)")
+    parser.add_argument("--history", type=int, help="Only symbols with signals in the last N days")
+    parser.add_argument("--interval", choices=["1day", "15min"], default="1day", help="Bar size to download (default: 1day)")
+    args = parser.parse_args()
+
+    if args.symbols:
+        since = args.since or date.today() - timedelta(days=365)
+        start_dates = {symbol.upper(): since for symbol in args.symbols}
+    else:
+        start_dates = signal_symbols(args.history)
+    sync_price_history(start_dates, interval=args.interval)
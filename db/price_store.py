@@ -0,0 +1,101 @@
+"""
+Local OHLCV store, keyed by symbol and bar time:
+
+    1day  -> day_trading_screener.price_history (date)
+    15min -> day_trading_screener.intraday_bars (bar_time, UTC)
+
+Filled by db/price_history_import.py; the backtester reads only from here,
+so backtests run offline and re-runs make no HTTP requests.
+"""
+import pandas as pd
+
+from db import connection
+from db.bulk import copy_rows
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+PRICE_HISTORY_COLUMNS = ["symbol", "date", "open", "high", "low", "close", "volume"]
+
+# interval -> (table, time column)
+PRICE_TABLES = {
+    "1day": ("price_history", "date"),
+    "15min": ("intraday_bars", "bar_time"),
+}
+
+
+def _table(interval):
+    if interval not in PRICE_TABLES:
+        raise ValueError(f"No local price store for interval {interval!r}")
+    table, time_column = PRICE_TABLES[interval]
+    return f"day_trading_screener.{table}", time_column, ["symbol", time_column] + PRICE_HISTORY_COLUMNS[2:]
+
+
+def stored_date_ranges(symbols, interval="1day"):
+    """{symbol: (first, last)} bar time already stored (dates for 1day, timestamps for 15min)."""
+    if not symbols:
+        return {}
+    table, time_column, _ = _table(interval)
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT symbol, MIN({time_column}), MAX({time_column})
+            FROM {table}
+            WHERE symbol = ANY(%s)
+            GROUP BY symbol
+        """, (list(symbols),))
+        return {symbol: (first, last) for symbol, first, last in cur.fetchall()}
+
+
+def save_price_history(rows, interval="1day"):
+    """
+    Upsert (symbol, date or bar_time, open, high, low, close, volume) rows: a
+    stored bar is overwritten when its values changed (e.g. a day stored while
+    still trading). Returns the number of rows inserted or updated.
+    """
+    table, time_column, columns = _table(interval)
+    staging = f"tmp_{table.split('.')[1]}"
+    values = columns[2:]
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TEMP TABLE {staging}
+            (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP
+        """)
+        staged = copy_rows(cur, staging, columns, rows)
+        cur.execute(f"""
+            INSERT INTO {table} AS stored ({", ".join(columns)})
+            SELECT DISTINCT ON (symbol, {time_column}) {", ".join(columns)} FROM {staging}
+            ON CONFLICT (symbol, {time_column}) DO UPDATE
+            SET {", ".join(f"{c} = EXCLUDED.{c}" for c in values)}
+            WHERE ({", ".join(f"stored.{c}" for c in values)}) IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in values)})
+        """)
+        written = max(cur.rowcount, 0)
+    logger.info(f"{table.split('.')[1]}: {written} of {staged} rows inserted or updated")
+    return written
+
+
+def load_price_history(symbols, start, end, interval="1day"):
+    """
+    Stored bars for `symbols` between start and end (inclusive), one query for
+    all of them.
+
+    Returns:
+        dict: symbol -> DataFrame (date, open, high, low, close, volume), oldest
+        first. For 15min bars `date` is the bar's start time in UTC.
+    """
+    if not symbols:
+        return {}
+    table, time_column, columns = _table(interval)
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT {", ".join(columns)}
+            FROM {table}
+            WHERE symbol = ANY(%s) AND {time_column} BETWEEN %s AND %s
+            ORDER BY symbol, {time_column}
+        """, (list(symbols), start, end))
+        frame = pd.DataFrame(cur.fetchall(), columns=PRICE_HISTORY_COLUMNS)
+
+    frame["date"] = pd.to_datetime(frame["date"], utc=interval != "1day")
+    return {
+        symbol: group.drop(columns="symbol").reset_index(drop=True)
+        for symbol, group in frame.groupby("symbol", sort=False)
+    }
@@ -1,52 +1,113 @@
-from db import get_connection
+from db import connection
 
-def load_watchlist_symbols():
-    query = """
-        SELECT symbol
-        FROM day_trading_screener.watchlist_cache
-        ORDER BY updated_at DESC;
+# Hot-path queries; db/setup_schema.check_query_plans() EXPLAINs these
+WATCHLIST_SYMBOLS_SQL = """
+    SELECT symbol
+    FROM day_trading_screener.watchlist_cache
+    ORDER BY updated_at DESC;
+"""
+
+WATCHLIST_METADATA_SQL = """
+    SELECT symbol, company_name, price
+    FROM day_trading_screener.watchlist_cache
+    WHERE symbol = ANY(%s)
+"""
+
+LAST_RUN_ID_SQL = """
+    SELECT run_id
+    FROM day_trading_screener.screener_run
+    ORDER BY run_timestamp DESC
+    LIMIT 1
+"""
+
+SCREENER_RESULTS_SQL = """
+    SELECT ticker, company_name, price, created_at
+    FROM day_trading_screener.stock_result
+    WHERE run_id = %s AND signal_strength = 1.0
+"""
+
+# Bullish signals for the backtester; callers append date bounds and ORDER BY
+BULLISH_SIGNALS_SQL = """
+    SELECT symbol, company_name, timestamp::date AS signal_date, price AS buy_price, timestamp AS signal_time
+    FROM day_trading_screener.screener_cache
+    WHERE is_bullish = true
+"""
+
+# screener_cache has a row per symbol per scan, so a symbol that stays bullish
+# fires every 15 minutes. "day" keeps its first signal of each day, "episode"
+# the first scan of each unbroken bullish run; "cooldown" is applied after
+# loading (backtester.py), "all" keeps every row.
+SIGNAL_DEDUP_MODES = ("all", "day", "episode", "cooldown")
+
+def bullish_signals_sql(dedup="all", history_days=None, with_rsi=False):
+    """
+    Signal query (BULLISH_SIGNALS_SQL's columns, plus rsi14 with with_rsi),
+    consolidated per symbol with window functions. Callers append ORDER BY.
     """
-    with get_connection() as conn:
+    columns = "symbol, company_name, timestamp::date AS signal_date, price AS buy_price, timestamp AS signal_time"
+    if with_rsi:
+        columns += ", rsi14"
+    since = f"timestamp >= CURRENT_DATE - INTERVAL '{int(history_days)} days'" if history_days else "true"
+
+    if dedup == "day":
+        return f"""
+    SELECT {columns}
+    FROM (
+        SELECT *, row_number() OVER (PARTITION BY symbol, timestamp::date ORDER BY timestamp) AS nth_of_day
+        FROM day_trading_screener.screener_cache
+        WHERE is_bullish = true AND {since}
+    ) signals
+    WHERE nth_of_day = 1
+"""
+    if dedup == "episode":
+        # One extra day so the first scan in the window sees its predecessor
+        since_margin = f"timestamp >= CURRENT_DATE - INTERVAL '{int(history_days) + 1} days'" if history_days else "true"
+        return f"""
+    SELECT {columns}
+    FROM (
+        SELECT *, lag(is_bullish) OVER (PARTITION BY symbol ORDER BY timestamp) AS was_bullish
+        FROM day_trading_screener.screener_cache
+        WHERE {since_margin}
+    ) scans
+    WHERE is_bullish AND was_bullish IS DISTINCT FROM true AND {since}
+"""
+    return BULLISH_SIGNALS_SQL.rstrip() + f" AND {since}\n"
+
+# Symbols each rule stage saw and removed, summed over recent runs of one kind
+STAGE_STATS_SQL = """
+    SELECT source, SUM(checked), SUM(rejected)
+    FROM day_trading_screener.rule_stage_stats
+    WHERE run_kind = %s AND run_timestamp >= NOW() - make_interval(days => %s)
+    GROUP BY source
+"""
+
+def load_watchlist_symbols():
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(query)
+            cur.execute(WATCHLIST_SYMBOLS_SQL)
             return [row[0] for row in cur.fetchall()]
 
 def load_watchlist_metadata(symbol_list):
     if not symbol_list:
         return {}
 
-    query = """
-        SELECT symbol, company_name, price
-        FROM day_trading_screener.watchlist_cache
-        WHERE symbol = ANY(%s)
-    """
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(query, (symbol_list,))
+            cur.execute(WATCHLIST_METADATA_SQL, (symbol_list,))
             rows = cur.fetchall()
             return {row[0]: {"company_name": row[1], "price": row[2]} for row in rows}
 
 def get_last_run_id():
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT run_id
-                FROM day_trading_screener.screener_run
-                ORDER BY run_timestamp DESC
-                LIMIT 1
-            """)
+            cur.execute(LAST_RUN_ID_SQL)
             row = cur.fetchone()
             return row[0] if row else None
 
 def fetch_screener_results(run_id):
-    query = """
-        SELECT ticker, company_name, price, created_at
-        FROM day_trading_screener.stock_result
-        WHERE run_id = %s AND signal_strength = 1.0
-    """
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(query, (run_id,))
+            cur.execute(SCREENER_RESULTS_SQL, (run_id,))
             return [
                 {
                     "symbol": row[0],
@@ -55,4 +116,11 @@ def fetch_screener_results(run_id):
                     "timestamp": row[3],
                 }
                 for row in cur.fetchall()
-            ]
\ No newline at end of file
+            ]
+
+def load_stage_stats(days=7, run_kind="scan"):
+    """{source: {"checked": n, "rejected": m}} over the `run_kind` runs ("scan" or "watchlist") of the last `days`."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(STAGE_STATS_SQL, (run_kind, days))
+            return {source: {"checked": int(checked), "rejected": int(rejected)} for source, checked, rejected in cur.fetchall()}
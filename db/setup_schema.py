@@ -1,5 +1,431 @@
-from dotenv import load_dotenv
-import os
-import psycopg2
-from db import get_connection
+"""
+Versioned schema migrations for the day_trading_screener schema.
 
+Each migration runs once, in its own transaction, and is recorded in
+day_trading_screener.schema_migrations; every statement is written to be
+idempotent as well, so databases created by hand before this module
+existed can be brought under it safely.
+
+    python -m db.setup_schema           # apply pending migrations
+    python -m db.setup_schema --check   # EXPLAIN the hot queries, report seq scans
+"""
+import argparse
+import json
+
+from db import connection
+from db.partitions import PARTITIONED_TABLES, ensure_partitions
+from db.reader import (
+    WATCHLIST_SYMBOLS_SQL, WATCHLIST_METADATA_SQL, LAST_RUN_ID_SQL,
+    SCREENER_RESULTS_SQL, bullish_signals_sql,
+)
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+SCHEMA = "day_trading_screener"
+MIGRATION_LOCK_ID = 0x5C7EE4  # pg_advisory_xact_lock key; one migrator at a time
+
+MIGRATIONS_TABLE_DDL = """
+    CREATE SCHEMA IF NOT EXISTS day_trading_screener;
+    CREATE TABLE IF NOT EXISTS day_trading_screener.schema_migrations (
+        version     INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at  TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+BASE_TABLES_DDL = """
+    CREATE TABLE IF NOT EXISTS day_trading_screener.screener_run (
+        run_id        SERIAL PRIMARY KEY,
+        run_timestamp TIMESTAMPTZ NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS day_trading_screener.stock_result (
+        id              BIGSERIAL PRIMARY KEY,
+        run_id          INTEGER NOT NULL REFERENCES day_trading_screener.screener_run (run_id),
+        ticker          TEXT NOT NULL,
+        company_name    TEXT,
+        price           NUMERIC,
+        passed_vwap     BOOLEAN,
+        passed_ema      BOOLEAN,
+        passed_rsi      BOOLEAN,
+        signal_strength NUMERIC,
+        created_at      TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS day_trading_screener.screener_cache (
+        symbol         TEXT NOT NULL,
+        company_name   TEXT,
+        price          NUMERIC,
+        rsi14          DOUBLE PRECISION,
+        ema20          DOUBLE PRECISION,
+        ema50          DOUBLE PRECISION,
+        vwap           DOUBLE PRECISION,
+        is_bullish     BOOLEAN NOT NULL DEFAULT FALSE,
+        failure_reason TEXT,
+        timestamp      TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (symbol, timestamp)
+    );
+
+    CREATE TABLE IF NOT EXISTS day_trading_screener.premarket_cache (
+        symbol                TEXT PRIMARY KEY,
+        pre_market_change_pct NUMERIC,
+        timestamp             TIMESTAMPTZ,
+        fetched_at            TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS day_trading_screener.quote_cache (
+        symbol             TEXT PRIMARY KEY,
+        price              NUMERIC,
+        changes_percentage NUMERIC,
+        volume             BIGINT,
+        fetched_at         TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS day_trading_screener.watchlist_cache (
+        symbol       TEXT PRIMARY KEY,
+        company_name TEXT,
+        price        NUMERIC,
+        timestamp    TIMESTAMPTZ,
+        first_seen   TIMESTAMPTZ,
+        updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+
+    CREATE TABLE IF NOT EXISTS day_trading_screener.ticker_rotation (
+        symbol TEXT PRIMARY KEY
+    );
+
+    CREATE TABLE IF NOT EXISTS day_trading_screener.backtest_results (
+        id           BIGSERIAL PRIMARY KEY,
+        symbol       TEXT NOT NULL,
+        signal_date  DATE NOT NULL,
+        buy_price    NUMERIC,
+        sell_price   NUMERIC,
+        sell_date    DATE,
+        gain_pct     DOUBLE PRECISION,
+        holding_days INTEGER,
+        result       TEXT,
+        company_name TEXT
+    );
+"""
+
+FUNDAMENTALS_CACHE_DDL = """
+    CREATE TABLE IF NOT EXISTS day_trading_screener.fundamentals_cache (
+        symbol      TEXT NOT NULL,
+        trading_day DATE NOT NULL,
+        beta        NUMERIC,
+        market_cap  BIGINT,
+        fetched_at  TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (symbol, trading_day)
+    );
+"""
+
+INDICATOR_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS day_trading_screener.indicator_state (
+        symbol       TEXT PRIMARY KEY,
+        ema20        DOUBLE PRECISION,
+        ema50        DOUBLE PRECISION,
+        avg_gain     DOUBLE PRECISION,
+        avg_loss     DOUBLE PRECISION,
+        last_close   DOUBLE PRECISION,
+        session_date DATE,
+        cum_pv       DOUBLE PRECISION,
+        cum_volume   DOUBLE PRECISION,
+        last_bar_ts  TIMESTAMP,
+        bar_count    INTEGER,
+        updated_at   TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# One index per hot access path:
+#   backtester / bullish lookups: screener_cache WHERE is_bullish AND timestamp range
+#   fetch_screener_results:       stock_result WHERE run_id = ? AND signal_strength = 1.0
+#   get_last_run_id:              screener_run ORDER BY run_timestamp DESC LIMIT 1
+#   load_watchlist_symbols:       watchlist_cache ORDER BY updated_at DESC
+# watchlist_cache.symbol = ANY(...) is already served by its primary key.
+HOT_PATH_INDEXES_DDL = """
+    CREATE INDEX IF NOT EXISTS screener_cache_bullish_ts_idx
+        ON day_trading_screener.screener_cache (timestamp)
+        INCLUDE (symbol, company_name, price)
+        WHERE is_bullish;
+
+    CREATE INDEX IF NOT EXISTS stock_result_signals_idx
+        ON day_trading_screener.stock_result (run_id)
+        INCLUDE (ticker, company_name, price, created_at)
+        WHERE signal_strength = 1.0;
+
+    CREATE INDEX IF NOT EXISTS screener_run_ts_idx
+        ON day_trading_screener.screener_run (run_timestamp DESC)
+        INCLUDE (run_id);
+
+    CREATE INDEX IF NOT EXISTS watchlist_cache_updated_idx
+        ON day_trading_screener.watchlist_cache (updated_at DESC)
+        INCLUDE (symbol);
+"""
+
+# Partitioned replacements for the time-series tables (see db/partitions.py).
+# The partition key has to be part of every unique constraint, so quote_cache
+# becomes keyed on (symbol, fetched_at) and stock_result on (id, created_at).
+PARTITIONED_TABLES_DDL = {
+    "screener_cache": """
+        CREATE TABLE day_trading_screener.screener_cache (
+            symbol         TEXT NOT NULL,
+            company_name   TEXT,
+            price          NUMERIC,
+            rsi14          DOUBLE PRECISION,
+            ema20          DOUBLE PRECISION,
+            ema50          DOUBLE PRECISION,
+            vwap           DOUBLE PRECISION,
+            is_bullish     BOOLEAN NOT NULL DEFAULT FALSE,
+            failure_reason TEXT,
+            timestamp      TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (symbol, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+
+        CREATE INDEX IF NOT EXISTS screener_cache_bullish_ts_idx
+            ON day_trading_screener.screener_cache (timestamp)
+            INCLUDE (symbol, company_name, price)
+            WHERE is_bullish;
+    """,
+    "stock_result": """
+        CREATE SEQUENCE IF NOT EXISTS day_trading_screener.stock_result_id_seq;
+        CREATE TABLE day_trading_screener.stock_result (
+            id              BIGINT NOT NULL DEFAULT nextval('day_trading_screener.stock_result_id_seq'),
+            run_id          INTEGER NOT NULL REFERENCES day_trading_screener.screener_run (run_id),
+            ticker          TEXT NOT NULL,
+            company_name    TEXT,
+            price           NUMERIC,
+            passed_vwap     BOOLEAN,
+            passed_ema      BOOLEAN,
+            passed_rsi      BOOLEAN,
+            signal_strength NUMERIC,
+            created_at      TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+
+        CREATE INDEX IF NOT EXISTS stock_result_signals_idx
+            ON day_trading_screener.stock_result (run_id)
+            INCLUDE (ticker, company_name, price, created_at)
+            WHERE signal_strength = 1.0;
+    """,
+    "quote_cache": """
+        CREATE TABLE day_trading_screener.quote_cache (
+            symbol             TEXT NOT NULL,
+            price              NUMERIC,
+            changes_percentage NUMERIC,
+            volume             BIGINT,
+            fetched_at         TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (symbol, fetched_at)
+        ) PARTITION BY RANGE (fetched_at);
+    """,
+}
+
+def partition_time_series(cur):
+    """
+    Swap screener_cache, stock_result and quote_cache for range-partitioned
+    tables, copying existing rows into partitions created to cover them.
+    Tables that are already partitioned are left alone.
+    """
+    for table, ddl in PARTITIONED_TABLES_DDL.items():
+        cur.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", (f"{SCHEMA}.{table}",))
+        if cur.fetchone():
+            continue
+
+        legacy = f"{table}_legacy"
+        column, _ = PARTITIONED_TABLES[table]
+        cur.execute(f"ALTER TABLE {SCHEMA}.{table} RENAME TO {legacy}")
+        # Free the index/constraint names (e.g. <table>_pkey) for the new table
+        cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s AND tablename = %s", (SCHEMA, legacy))
+        for (index,) in cur.fetchall():
+            cur.execute(f"ALTER INDEX {SCHEMA}.{index} RENAME TO {index[:55]}_legacy")
+        if table == "stock_result":
+            cur.execute(f"ALTER SEQUENCE IF EXISTS {SCHEMA}.stock_result_id_seq OWNED BY NONE")
+
+        cur.execute(ddl)
+        cur.execute(f"SELECT MIN({column})::date FROM {SCHEMA}.{legacy}")
+        first_day = cur.fetchone()[0]
+        ensure_partitions(cur, table, first_day=first_day)
+
+        cur.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = %s AND table_name = %s
+            INTERSECT
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = %s AND table_name = %s
+        """, (SCHEMA, table, SCHEMA, legacy))
+        columns = ", ".join(sorted(row[0] for row in cur.fetchall()))
+        cur.execute(f"INSERT INTO {SCHEMA}.{table} ({columns}) SELECT {columns} FROM {SCHEMA}.{legacy}")
+        logger.info(f"{table}: moved {cur.rowcount} rows into partitions")
+        cur.execute(f"DROP TABLE {SCHEMA}.{legacy}")
+
+        if table == "stock_result":
+            cur.execute(f"""
+                ALTER SEQUENCE {SCHEMA}.stock_result_id_seq OWNED BY {SCHEMA}.stock_result.id;
+                SELECT setval('{SCHEMA}.stock_result_id_seq', COALESCE(MAX(id), 0) + 1, false)
+                FROM {SCHEMA}.stock_result;
+            """)
+
+# Local daily OHLCV store read by the backtester (db/price_store.py)
+PRICE_HISTORY_DDL = """
+    CREATE TABLE IF NOT EXISTS day_trading_screener.price_history (
+        symbol TEXT NOT NULL,
+        date   DATE NOT NULL,
+        open   DOUBLE PRECISION,
+        high   DOUBLE PRECISION,
+        low    DOUBLE PRECISION,
+        close  DOUBLE PRECISION NOT NULL,
+        volume BIGINT,
+        PRIMARY KEY (symbol, date)
+    );
+"""
+
+# 15-minute OHLCV bars for intraday backtests (db/price_store.py)
+INTRADAY_BARS_DDL = """
+    CREATE TABLE IF NOT EXISTS day_trading_screener.intraday_bars (
+        symbol   TEXT NOT NULL,
+        bar_time TIMESTAMPTZ NOT NULL,
+        open     DOUBLE PRECISION,
+        high     DOUBLE PRECISION,
+        low      DOUBLE PRECISION,
+        close    DOUBLE PRECISION NOT NULL,
+        volume   BIGINT,
+        PRIMARY KEY (symbol, bar_time)
+    );
+"""
+
+# Per-run rule stage counts; the screener learns its stage order from them
+RULE_STAGE_STATS_DDL = """
+    CREATE TABLE IF NOT EXISTS day_trading_screener.rule_stage_stats (
+        run_timestamp TIMESTAMPTZ NOT NULL,
+        source        TEXT NOT NULL,
+        checked       INTEGER NOT NULL,
+        rejected      INTEGER NOT NULL,
+        PRIMARY KEY (run_timestamp, source)
+    );
+"""
+
+# Scans and watchlist runs reach the rule stages with different candidates (only
+# scans pass the screener payload pre-filter), so their stage counts are kept apart
+RULE_STAGE_STATS_RUN_KIND_DDL = """
+    ALTER TABLE day_trading_screener.rule_stage_stats
+        ADD COLUMN IF NOT EXISTS run_kind TEXT NOT NULL DEFAULT 'scan';
+"""
+
+# (version, description, SQL or callable(cur)). Append only; never edit an applied migration.
+MIGRATIONS = [
+    (1, "base tables", BASE_TABLES_DDL),
+    (2, "fundamentals_cache", FUNDAMENTALS_CACHE_DDL),
+    (3, "indicator_state", INDICATOR_STATE_DDL),
+    (4, "hot-path indexes", HOT_PATH_INDEXES_DDL),
+    (5, "range-partition screener_cache, stock_result, quote_cache", partition_time_series),
+    (6, "price_history", PRICE_HISTORY_DDL),
+    (7, "intraday_bars", INTRADAY_BARS_DDL),
+    (8, "rule_stage_stats", RULE_STAGE_STATS_DDL),
+    (9, "rule_stage_stats.run_kind", RULE_STAGE_STATS_RUN_KIND_DDL),
+]
+
+
+def applied_versions(cur):
+    cur.execute(f"SELECT version FROM {SCHEMA}.schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def apply_migrations(migrations=MIGRATIONS):
+    """
+    Apply every migration not yet recorded in schema_migrations, in version order.
+
+    Returns:
+        list[int]: Versions applied by this call (empty when up to date).
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(MIGRATIONS_TABLE_DDL)
+
+    applied = []
+    for version, description, sql in sorted(migrations, key=lambda m: m[0]):
+        with connection() as conn:
+            with conn.cursor() as cur:
+                # Serialises concurrent migrators; released at commit/rollback
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+                if version in applied_versions(cur):
+                    continue
+                logger.info(f"Applying migration {version}: {description}")
+                if callable(sql):
+                    sql(cur)
+                else:
+                    cur.execute(sql)
+                cur.execute(
+                    f"INSERT INTO {SCHEMA}.schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+        applied.append(version)
+
+    if applied:
+        logger.info(f"Schema migrated: applied {applied}")
+    else:
+        logger.info("Schema is up to date.")
+    return applied
+
+
+# --- Query plan check ----------------------------------------------------------
+
+# (name, SQL, sample params) for the queries the scanner and backtester run most
+HOT_QUERIES = [
+    ("load_watchlist_symbols", WATCHLIST_SYMBOLS_SQL, None),
+    ("load_watchlist_metadata", WATCHLIST_METADATA_SQL, (["AAPL", "MSFT"],)),
+    ("get_last_run_id", LAST_RUN_ID_SQL, None),
+    ("fetch_screener_results", SCREENER_RESULTS_SQL, (1,)),
+    ("run_backtest", bullish_signals_sql("day", history_days=30) + " ORDER BY timestamp", None),
+]
+
+
+def seq_scans(plan):
+    """Relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan tree."""
+    found = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan":
+            found.append(node.get("Relation Name"))
+        stack.extend(node.get("Plans", []))
+    return found
+
+
+def check_query_plans(queries=HOT_QUERIES):
+    """
+    EXPLAIN each hot query and report the ones that still plan a sequential scan.
+
+    enable_seqscan is switched off for the check so the planner picks an index
+    whenever one can serve the query; a Seq Scan left in the plan means no
+    usable index exists, not merely that the table is small today.
+
+    Returns:
+        dict: query name -> list of tables scanned sequentially.
+    """
+    offenders = {}
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+            for name, sql, params in queries:
+                cur.execute("EXPLAIN (FORMAT JSON) " + sql.strip().rstrip(";"), params)
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                tables = seq_scans(plan[0]["Plan"])
+                if tables:
+                    offenders[name] = tables
+                    logger.warning(f"{name}: sequential scan on {', '.join(tables)}")
+                else:
+                    logger.info(f"{name}: index plan")
+            conn.rollback()
+    return offenders
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply schema migrations")
+    parser.add_argument("--check", action="store_true", help="EXPLAIN the hot queries and report sequential scans")
+    args = parser.parse_args()
+
+    apply_migrations()
+    if args.check and check_query_plans():
+        raise SystemExit(1)
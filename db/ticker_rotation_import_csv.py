@@ -1,10 +1,14 @@
 import csv
-from db import get_connection
+from db import get_connection, connection
+from db.bulk import merge_symbols
 from utils.logger import setup_logger
 
 logger = setup_logger()
 
-def import_tickers_from_csv(csv_path):
+def import_tickers_from_csv(csv_path, bulk=False):
+    if bulk:
+        return bulk_import_tickers_from_csv(csv_path)
+
     conn = get_connection()
     cursor = conn.cursor()
     inserted, skipped = 0, 0
@@ -30,6 +34,15 @@ def import_tickers_from_csv(csv_path):
     cursor.close()
     conn.close()
     logger.info(f"✅ Import complete: {inserted} inserted, {skipped} skipped")
+    return inserted, skipped
+
+def bulk_import_tickers_from_csv(csv_path):
+    # Streams the file through COPY into a temp table and merges it in one statement
+    with open(csv_path, newline='') as csvfile, connection() as conn, conn.cursor() as cursor:
+        symbols = (row["symbol"].strip().upper() for row in csv.DictReader(csvfile))
+        inserted, skipped = merge_symbols(cursor, (s for s in symbols if s))
+    logger.info(f"✅ Bulk import complete: {inserted} inserted, {skipped} skipped")
+    return inserted, skipped
 
 
 if __name__ == "__main__":
@@ -37,6 +50,7 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument("csv_path", help="Path to CSV file with 'symbol' column")
+    parser.add_argument("--bulk", action="store_true", help="COPY into a temp table and merge in one statement")
     args = parser.parse_args()
 
-    import_tickers_from_csv(args.csv_path)
+    import_tickers_from_csv(args.csv_path, bulk=args.bulk)
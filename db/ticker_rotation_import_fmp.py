@@ -1,11 +1,15 @@
-from db import get_connection
+from db import get_connection, connection
+from db.bulk import merge_symbols
 from utils.logger import setup_logger
 from api.fmp_client import fetch_core_screener
 
 logger = setup_logger()
 
-def import_tickers_from_fmp(limit=1000):
+def import_tickers_from_fmp(limit=1000, bulk=False):
     tickers = fetch_core_screener(limit)
+    if bulk:
+        return bulk_import_tickers(tickers)
+
     conn = get_connection()
     cursor = conn.cursor()
     inserted, skipped = 0, 0
@@ -30,12 +34,22 @@ def import_tickers_from_fmp(limit=1000):
     cursor.close()
     conn.close()
     logger.info(f"Imported from FMP: {inserted} inserted, {skipped} skipped")
+    return inserted, skipped
+
+def bulk_import_tickers(tickers):
+    # COPY the screener symbols into a temp table and merge them in one statement
+    symbols = (item.get("symbol", "").strip().upper() for item in tickers)
+    with connection() as conn, conn.cursor() as cursor:
+        inserted, skipped = merge_symbols(cursor, (s for s in symbols if s))
+    logger.info(f"Bulk imported from FMP: {inserted} inserted, {skipped} skipped")
+    return inserted, skipped
 
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int, default=1000, help="Max tickers to import from FMP")
+    parser.add_argument("--bulk", action="store_true", help="COPY into a temp table and merge in one statement")
     args = parser.parse_args()
 
-    import_tickers_from_fmp(limit=args.limit)
+    import_tickers_from_fmp(limit=args.limit, bulk=args.bulk)
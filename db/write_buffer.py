@@ -0,0 +1,92 @@
+# db/write_buffer.py
+import threading
+import time
+
+from config.settings import WRITE_BUFFER_SIZE, WRITE_BUFFER_INTERVAL
+from db.cache import bulk_upsert_screener_cache, bulk_upsert_premarket_cache
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+class WriteBehindBuffer:
+    """
+    Collects screener_cache and premarket_cache rows from worker threads and
+    writes them in bulk from a background thread, whenever `flush_size` rows
+    are pending or `flush_interval` seconds have passed. close() performs the
+    final flush and must run before the results are saved.
+
+    Rows are keyed like the tables' conflict targets, so a later row for the
+    same key replaces the pending one instead of failing the batch upsert.
+    """
+    def __init__(self, flush_size=WRITE_BUFFER_SIZE, flush_interval=WRITE_BUFFER_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._screener_rows = {}
+        self._premarket_changes = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"flushes": 0, "rows": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _pending(self):
+        return len(self._screener_rows) + len(self._premarket_changes)
+
+    def add_screener_result(self, row):
+        with self._cond:
+            self._screener_rows[(row["symbol"], row["timestamp"])] = row
+            if self._pending() >= self.flush_size:
+                self._cond.notify()
+
+    def add_premarket_change(self, symbol, change_pct):
+        with self._cond:
+            self._premarket_changes[symbol] = change_pct
+            if self._pending() >= self.flush_size:
+                self._cond.notify()
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self._cond:
+                while not self._closed and self._pending() < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+            deadline = time.monotonic() + self.flush_interval
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                rows = list(self._screener_rows.values())
+                changes = self._premarket_changes
+                self._screener_rows, self._premarket_changes = {}, {}
+            if not rows and not changes:
+                return
+            try:
+                bulk_upsert_screener_cache(rows)
+                bulk_upsert_premarket_cache(changes)
+                self.stats["flushes"] += 1
+                self.stats["rows"] += len(rows) + len(changes)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Write-behind flush of {len(rows) + len(changes)} rows failed: {e}")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        logger.info(f"Write-behind buffer: {self.stats['rows']} rows in {self.stats['flushes']} flushes, {self.stats['errors']} failed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
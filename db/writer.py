@@ -1,49 +1,48 @@
-from db import get_connection
+from db import connection
+from db.bulk import copy_rows
+from db.partitions import drop_expired_partitions
+from config.settings import SCREENER_CACHE_RETENTION_DAYS, QUOTE_CACHE_RETENTION_DAYS
 from utils.logger import setup_logger
+from utils.rules import get_ruleset
 from psycopg2.extras import execute_values
 from datetime import datetime
 
 logger = setup_logger()
 
+STOCK_RESULT_COLUMNS = [
+    "run_id", "ticker", "company_name", "price",
+    "passed_vwap", "passed_ema", "passed_rsi",
+    "signal_strength", "created_at",
+]
+
 def save_run_and_results(rows, run_timestamp): 
-    conn = get_connection()
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO day_trading_screener.screener_run (run_timestamp) VALUES (%s) RETURNING run_id",
-                    (run_timestamp,)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO day_trading_screener.screener_run (run_timestamp) VALUES (%s) RETURNING run_id",
+                (run_timestamp,)
+            )
+            run_id = cur.fetchone()[0]
+
+            # Same rules the screener used; None when an input is missing
+            rules = get_ruleset()
+            values = [
+                (
+                    run_id,
+                    row["symbol"],
+                    row["company_name"],
+                    row["price"],
+                    rules.check("price_above_vwap", row),
+                    rules.check("ema20_above_ema50", row),
+                    rules.check("rsi_in_range", row),
+                    1.0 if row["is_bullish"] else 0.0,
+                    row["timestamp"]
                 )
-                run_id = cur.fetchone()[0]
-
-                values = [
-                    (
-                        run_id,
-                        row["symbol"],
-                        row["company_name"],
-                        row["price"],
-                        # SAFE: price > vwap only if both are not None
-                        row["price"] > row["vwap"] if row["price"] is not None and row["vwap"] is not None else None,
-                        # SAFE: ema20 > ema50 only if both exist
-                        row["ema20"] > row["ema50"] if row.get("ema20") is not None and row.get("ema50") is not None else None,
-                        # SAFE: RSI in 50-70 range only if rsi14 exists
-                        50 <= row["rsi14"] <= 70 if row.get("rsi14") is not None else None,
-                        1.0 if row["is_bullish"] else 0.0,
-                        row["timestamp"]
-                    )
-                    for row in rows
-                ]
+                for row in rows
+            ]
 
-                execute_values(cur, """
-                    INSERT INTO day_trading_screener.stock_result (
-                        run_id, ticker, company_name, price,
-                        passed_vwap, passed_ema, passed_rsi,
-                        signal_strength, created_at
-                    ) VALUES %s
-                """, values)
-    finally:
-        conn.close()
-        logger.info(f"Saved {len(rows)} results for run {run_id} at {run_timestamp}")
+            copy_rows(cur, "day_trading_screener.stock_result", STOCK_RESULT_COLUMNS, values)
+    logger.info(f"Saved {len(rows)} results for run {run_id} at {run_timestamp}")
 
 
 def update_watchlist_cache(bullish_results: list):
@@ -85,7 +84,7 @@ def update_watchlist_cache(bullish_results: list):
         WHERE symbol NOT IN %s;
     """
 
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
             execute_values(cur, insert_query, rows)
             cur.execute(delete_query, (tuple(symbols_today),))
@@ -93,27 +92,41 @@ def update_watchlist_cache(bullish_results: list):
     logger.info(f"Watchlist cache updated: {len(rows)} bullish tickers kept or added. Others removed.")
 
 
-def cleanup_screener_cache(days=14):
-    with get_connection() as conn:
+def save_rule_stage_stats(run_timestamp, stage_stats, run_kind="scan"):
+    """Persist {source: {"checked", "rejected"}} for the stage order of the next `run_kind` runs."""
+    values = [(run_timestamp, run_kind, source, counts["checked"], counts["rejected"]) for source, counts in stage_stats.items()]
+    if not values:
+        return
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO day_trading_screener.rule_stage_stats (run_timestamp, run_kind, source, checked, rejected)
+                    VALUES %s
+                    ON CONFLICT (run_timestamp, source) DO UPDATE
+                    SET run_kind = EXCLUDED.run_kind, checked = EXCLUDED.checked, rejected = EXCLUDED.rejected
+                """, values)
+    except Exception as e:
+        logger.warning(f"Could not save rule stage stats: {e}")
+
+
+def cleanup_screener_cache(days=SCREENER_CACHE_RETENTION_DAYS):
+    # Retention drops whole daily partitions rather than deleting rows
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                DELETE FROM day_trading_screener.screener_cache
-                WHERE timestamp < NOW() - INTERVAL '%s days';
-            """, (days,))
-    logger.info(f"Screener cache cleanup complete — entries older than {days} days removed.")
+            dropped = drop_expired_partitions(cur, "screener_cache", days)
+    logger.info(f"Screener cache cleanup complete — {len(dropped)} partitions older than {days} days dropped.")
 
 def cleanup_premarket_cache():
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
                 DELETE FROM day_trading_screener.premarket_cache
                 WHERE DATE(fetched_at) < CURRENT_DATE;
             """)
 
-def cleanup_quote_cache(days=30):
-    with get_connection() as conn:
+def cleanup_quote_cache(days=QUOTE_CACHE_RETENTION_DAYS):
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                DELETE FROM day_trading_screener.quote_cache
-                WHERE fetched_at < NOW() - INTERVAL '%s days'
-            """, (days,))
\ No newline at end of file
+            dropped = drop_expired_partitions(cur, "quote_cache", days)
+    logger.info(f"Quote cache cleanup complete — {len(dropped)} partitions older than {days} days dropped.")
\ No newline at end of file
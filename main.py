@@ -2,6 +2,7 @@ import argparse
 import logging
 from runner.screener_runner import run_screener
 from utils.logger import setup_logger
+from config.settings import EXECUTION_MODE
 
 
 
@@ -11,6 +12,7 @@ def main():
     parser.add_argument("--limit", type=int, default=50)
     parser.add_argument("--tighten", action="store_true", help="Apply optional filters: beta > 1, market cap >= 2B, pre-market change > 1%")
     parser.add_argument("--test-mode", action="store_true", help="Run in test mode (no screener execution)")  
+    parser.add_argument("--execution", choices=["threads", "async"], default=EXECUTION_MODE, help="Fetch pipeline: batched threads or asyncio")
     args = parser.parse_args()
 
     # Set log level based on --debug
@@ -23,7 +25,8 @@ def main():
     run_screener(
         limit=args.limit,
         use_optional_filters=args.tighten,
-        log_level=log_level      
+        log_level=log_level,
+        execution=args.execution
     )
 
 if __name__ == "__main__":
@@ -1,15 +1,29 @@
-from api.fmp_client import fetch_core_screener, fetch_technicals, fetch_fundamentals, fetch_pre_market_change
-from utils.filters import is_bullish
-from db.writer import save_run_and_results
+from api.fmp_client import (
+    fetch_core_screener, fetch_technicals, fetch_technicals_local, fetch_technicals_incremental,
+    fetch_quotes_batch, governor,
+)
+from api.fundamentals import get_fundamentals_batch, fundamentals_from_screener, seed_fundamentals
+from utils.filters import scan_values, prefilter_screener_payload
+from utils.rules import compile_rules
+from db.writer import save_run_and_results, save_rule_stage_stats
 from utils.exporter import export_screener_results_to_excel
 from utils.logger import setup_logger
 import time
+import asyncio
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from db.cache import upsert_screener_cache, upsert_premarket_cache
+from db.cache import load_indicator_states, upsert_indicator_states
+from db.write_buffer import WriteBehindBuffer
+from db.reader import load_stage_stats
+from db.partitions import maintain_partitions
 import logging
 from datetime import datetime, timezone
 from pytz import timezone as pytz_timezone
-from config.settings import BATCH_SIZE, COOLDOWN_SECONDS
+from config.settings import (
+    BATCH_SIZE, MAX_WORKERS, INDICATOR_SOURCE, INCREMENTAL_INDICATORS,
+    EXECUTION_MODE, ASYNC_MAX_IN_FLIGHT, RULE_ORDER, RULE_STATS_DAYS,
+)
+from api.http_client import reset_http_stats, log_http_stats
+from db import log_pool_metrics
 
 ET = pytz_timezone("US/Eastern")
 
@@ -18,16 +32,21 @@ def now_et():
 
 logger = setup_logger()
 
-def run_screener(limit=50, use_optional_filters=False, log_level=logging.INFO, watchlist_symbols=None):
+# Rule sources fetched with one request per batch of symbols; the rest are per symbol
+BATCHED_SOURCES = {"quote", "fundamentals"}
+
+def run_screener(limit=50, use_optional_filters=False, log_level=logging.INFO, watchlist_symbols=None, execution=EXECUTION_MODE):
     def chunkify(lst, batch_size):
         for i in range(0, len(lst), batch_size):
             yield lst[i:i + batch_size]
 
     logger = setup_logger(level=log_level)
     run_timestamp = datetime.now(timezone.utc)
-    logger.info(f"Screener run started at {run_timestamp.strftime('%Y-%m-%d %H:%M:%S %Z')} (limit={limit})")
+    logger.info(f"Screener run started at {run_timestamp.strftime('%Y-%m-%d %H:%M:%S %Z')} (limit={limit}, execution={execution})")
 
     start_time = time.time()
+    reset_http_stats()
+    maintain_partitions()  # today's screener_cache/stock_result partitions must exist before writes
 
     if watchlist_symbols is None:
         results = fetch_core_screener(limit)
@@ -53,86 +72,217 @@ def run_screener(limit=50, use_optional_filters=False, log_level=logging.INFO, w
     all_results = []
     bullish_count = 0
     failed_count = 0
+    write_buffer = WriteBehindBuffer()
+
+    incremental = INDICATOR_SOURCE == "local" and INCREMENTAL_INDICATORS
+
+    def get_indicators(symbol, batch_data):
+        if incremental:
+            indicators, state = fetch_technicals_incremental(symbol, batch_data["indicator_states"].get(symbol))
+            if state is not None:
+                batch_data["updated_states"][symbol] = state
+            return indicators
+        if INDICATOR_SOURCE == "local":
+            return fetch_technicals_local(symbol)
+        return fetch_technicals(symbol)
+
+    # Rule stages run cheapest-per-rejection first; rejection rates come from the
+    # stage counts of recent runs of the same kind (saved below): only scans get the
+    # payload pre-filter, which takes most beta/market-cap rejections off fundamentals
+    run_kind = "scan" if watchlist_symbols is None else "watchlist"
+    stage_history = None
+    if RULE_ORDER == "learned":
+        try:
+            stage_history = load_stage_stats(RULE_STATS_DAYS, run_kind)
+        except Exception as e:
+            logger.warning(f"Could not load rule stage stats, ordering rules by cost only: {e}")
+    rules = compile_rules(use_optional_filters=use_optional_filters, stage_stats=stage_history)
+    stage_stats = {source: {"checked": 0, "rejected": 0} for source in rules.sources}
+    logger.info(f"Rule stages: {' -> '.join(rules.sources)}")
 
-    def analyze_stock(stock):
+    def new_ctx(stock, batch_data):
         symbol = stock["symbol"]
         name = stock.get("company_name", stock.get("companyName", ""))
-        price = stock.get("price")
+        quote = batch_data["quotes"].get(symbol, {})
+        price = quote.get("price") if quote.get("price") is not None else stock.get("price")
         logger.info(f"{symbol} - {name}")
+        return {
+            "stock": stock,
+            "symbol": symbol,
+            "name": name,
+            "values": scan_values(price, pre_market_change_pct=quote.get("changesPercentage")),
+            "indicators": None,
+            "reasons": [],
+            "status": None,  # None while passing, then "rejected" or "failed"
+        }
 
+    def load_batch(source, ctxs, batch_data):
+        # Batched sources: one request (or cache lookup) for every symbol still passing
+        if source == "fundamentals":
+            batch_data["fundamentals"] = get_fundamentals_batch([ctx["symbol"] for ctx in ctxs])
+
+    def run_stage(ctx, source, batch_data):
+        symbol = ctx["symbol"]
         try:
-            indicators = fetch_technicals(symbol)
-            if not indicators:
-                raise ValueError("No technical data")
-
-            fundamentals = fetch_fundamentals(symbol) if use_optional_filters else None
-            pre_market_change_pct = fetch_pre_market_change(symbol) if use_optional_filters else None
-
-            reasons = []
-            is_bullish_flag = is_bullish(
-                price,
-                indicators,
-                fundamentals,
-                pre_market_change_pct,
-                use_optional_filters,
-                logger,
-                symbol,
-                reasons
-            )
+            if source == "technicals":
+                indicators = get_indicators(symbol, batch_data)
+                if not indicators:
+                    raise ValueError("No technical data")
+                ctx["indicators"] = indicators
+                ctx["values"].update(indicators)
+            elif source == "fundamentals":
+                fundamentals = batch_data["fundamentals"].get(symbol, {})
+                ctx["values"].update(beta=fundamentals.get("beta"), market_cap=fundamentals.get("market_cap"))
 
-            if is_bullish_flag:
-                logger.info(f"Bullish signal for {symbol}!")
-            else:
-                for reason in reasons:
-                    logger.debug(f"{symbol}: {reason}")
+            if not rules.evaluate(ctx["values"], sources={source}, symbol=symbol, reasons=ctx["reasons"], logger=logger):
+                ctx["status"] = "rejected"
+        except Exception as e:
+            logger.warning(f"{symbol} - error: {e}")
+            ctx["status"] = "failed"
+        return ctx
 
-            result = {
-                "symbol": symbol,
-                "company_name": name,
-                "price": price,
-                **indicators,
-                "is_bullish": is_bullish_flag,
-                "timestamp": run_timestamp,
-                "first_seen": stock.get("first_seen"),
-                "failure_reason": "; ".join(reasons) if reasons else ""
+    def stage_done(source, alive):
+        stage_stats[source]["checked"] += len(alive)
+        stage_stats[source]["rejected"] += sum(ctx["status"] is not None for ctx in alive)
+
+    def finish(ctx):
+        if ctx["status"] == "failed":
+            return {"failed": True}
+        symbol, reasons = ctx["symbol"], ctx["reasons"]
+        is_bullish_flag = ctx["status"] is None
+        if is_bullish_flag:
+            logger.info(f"Bullish signal for {symbol}!")
+        else:
+            for reason in reasons:
+                logger.debug(f"{symbol}: {reason}")
+
+        indicators = ctx["indicators"] or dict.fromkeys(("rsi14", "ema20", "ema50", "vwap"))
+        result = {
+            "symbol": symbol,
+            "company_name": ctx["name"],
+            "price": ctx["values"]["price"],
+            **indicators,
+            "is_bullish": is_bullish_flag,
+            "timestamp": run_timestamp,
+            "first_seen": ctx["stock"].get("first_seen"),
+            "failure_reason": "; ".join(reasons) if reasons else ""
+        }
+
+        write_buffer.add_screener_result(result)
+        pre_market_change_pct = ctx["values"]["pre_market_change_pct"]
+        if use_optional_filters and pre_market_change_pct is not None:
+            write_buffer.add_premarket_change(symbol, pre_market_change_pct)
+
+        return {"failed": False, "bullish": is_bullish_flag, "result": result}
+
+    def collect(data):
+        nonlocal bullish_count, failed_count
+        if data.get("failed"):
+            failed_count += 1
+            return
+        all_results.append(data["result"])
+        if data.get("bullish"):
+            bullish_count += 1
+
+    def run_threaded():
+        batch_size = BATCH_SIZE
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for i, batch in enumerate(chunkify(results, batch_size), start=1):
+                logger.info(f"Processing batch {i} with {len(batch)} stocks...")
+                batch_symbols = [stock["symbol"] for stock in batch]
+                batch_data = {
+                    "quotes": fetch_quotes_batch(batch_symbols),
+                    "indicator_states": load_indicator_states(batch_symbols) if incremental else {},
+                    "updated_states": {},
+                }
+                ctxs = [new_ctx(stock, batch_data) for stock in batch]
+
+                # Each stage only sees the symbols every earlier stage passed
+                for source in rules.sources:
+                    alive = [ctx for ctx in ctxs if ctx["status"] is None]
+                    if not alive:
+                        break
+                    if source in BATCHED_SOURCES:
+                        load_batch(source, alive, batch_data)
+                        for ctx in alive:
+                            run_stage(ctx, source, batch_data)
+                    else:
+                        for future in as_completed([executor.submit(run_stage, ctx, source, batch_data) for ctx in alive]):
+                            future.result()
+                    stage_done(source, alive)
+
+                for ctx in ctxs:
+                    collect(finish(ctx))
+                upsert_indicator_states(batch_data["updated_states"])
+
+    async def run_async():
+        # Blocking fetchers run on a thread pool; every symbol in a per-symbol stage
+        # is in flight at once (capped by ASYNC_MAX_IN_FLIGHT) and the shared rate
+        # limiters pace the requests.
+        loop = asyncio.get_running_loop()
+        symbols = [stock["symbol"] for stock in results]
+        with ThreadPoolExecutor(max_workers=ASYNC_MAX_IN_FLIGHT) as executor:
+            def in_thread(func, *args):
+                return loop.run_in_executor(executor, func, *args)
+
+            async def nothing():
+                return {}
+
+            quotes, indicator_states = await asyncio.gather(
+                in_thread(fetch_quotes_batch, symbols),
+                in_thread(load_indicator_states, symbols) if incremental else nothing(),
+            )
+            batch_data = {
+                "quotes": quotes,
+                "indicator_states": indicator_states,
+                "updated_states": {},
             }
+            ctxs = [new_ctx(stock, batch_data) for stock in results]
+            semaphore = asyncio.Semaphore(ASYNC_MAX_IN_FLIGHT)
 
-            upsert_screener_cache(result)
-            if use_optional_filters and pre_market_change_pct is not None:
-                upsert_premarket_cache(symbol, pre_market_change_pct)
+            async def run_one(ctx, source):
+                async with semaphore:
+                    await in_thread(run_stage, ctx, source, batch_data)
 
-            return {"failed": False, "bullish": is_bullish_flag, "result": result}
+            logger.info(f"Analyzing {len(results)} stocks concurrently (max {ASYNC_MAX_IN_FLIGHT} in flight)...")
+            for source in rules.sources:
+                alive = [ctx for ctx in ctxs if ctx["status"] is None]
+                if not alive:
+                    break
+                if source in BATCHED_SOURCES:
+                    await in_thread(load_batch, source, alive, batch_data)
+                    for ctx in alive:
+                        run_stage(ctx, source, batch_data)
+                else:
+                    await asyncio.gather(*(run_one(ctx, source) for ctx in alive))
+                stage_done(source, alive)
 
-        except Exception as e:
-            logger.warning(f"{symbol} - error: {e}")
-            return {"failed": True}
+            for ctx in ctxs:
+                collect(finish(ctx))
+            await in_thread(upsert_indicator_states, batch_data["updated_states"])
+
+    # Candidates from /stock-screener already carry price, beta and market cap: use them
+    # as fundamentals and reject on them in one vectorized pass before any enrichment
+    if watchlist_symbols is None and results:
+        if "fundamentals" in rules.sources:
+            seed_fundamentals(fundamentals_from_screener(results))
+        checked = len(results)
+        results, rejected = prefilter_screener_payload(results, rules)
+        stage_stats["screener payload"] = {"checked": checked, "rejected": len(rejected)}
+        for stock, reasons in rejected:
+            ctx = new_ctx(stock, {"quotes": {}})
+            ctx["status"], ctx["reasons"] = "rejected", reasons
+            collect(finish(ctx))
+        if rejected:
+            logger.info(f"Pre-filter rejected {len(rejected)}/{checked} candidates from the screener payload")
 
-    batch_size = BATCH_SIZE    
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        for i, batch in enumerate(chunkify(results, batch_size), start=1):
-            logger.info(f"Processing batch {i} with {len(batch)} stocks...")
-            futures = [executor.submit(analyze_stock, stock) for stock in batch]
-
-            for future in as_completed(futures):
-                try:
-                    data = future.result()
-                except Exception as e:
-                    logger.warning(f"Unhandled error in future: {e}")
-                    failed_count += 1
-                    continue
-
-                if data.get("failed"):
-                    failed_count += 1
-                    continue
-
-                result = data["result"]
-                all_results.append(result)
-                if data.get("bullish"):
-                    bullish_count += 1
-
-            if i * batch_size < limit:
-                logger.info(f"Cooldown for {COOLDOWN_SECONDS} seconds before next batch...")
-                time.sleep(COOLDOWN_SECONDS)
+    try:
+        if execution == "async":
+            asyncio.run(run_async())
+        else:
+            run_threaded()
+    finally:
+        write_buffer.close()  # final flush before the run is saved
 
     for row in all_results:
         if row.get("first_seen"):
@@ -141,6 +291,7 @@ def run_screener(limit=50, use_optional_filters=False, log_level=logging.INFO, w
             row["bullish_duration"] = 0
 
     save_run_and_results(all_results, run_timestamp)
+    save_rule_stage_stats(run_timestamp, stage_stats, run_kind)
     export_screener_results_to_excel(all_results, run_timestamp)
 
     elapsed = time.time() - start_time
@@ -148,3 +299,8 @@ def run_screener(limit=50, use_optional_filters=False, log_level=logging.INFO, w
     logger.info(f"Bullish matches: {bullish_count}")
     logger.info(f"Failed (errors or missing data): {failed_count}")
     logger.info(f"Run duration: {elapsed:.2f} seconds")
+    for source, counts in stage_stats.items():
+        logger.info(f"Rule stage {source}: {counts['checked']} checked, {counts['rejected']} rejected")
+    log_http_stats(logger)
+    log_pool_metrics(logger)
+    logger.info(f"Rate governor: {governor.requests_per_minute:.0f} req/min, {governor.throttled} throttled responses so far")
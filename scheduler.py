@@ -7,6 +7,7 @@ from runner.screener_runner import run_screener
 from watchlist_scan import run_watchlist_scan
 from db.reader import get_last_run_time
 from emailer.notify import send_email_notification
+from config.settings import EXECUTION_MODE
 
 ET = pytz.timezone("US/Eastern")
 
@@ -56,14 +57,14 @@ def scheduler_loop():
         try:
             if should_run_once(full_scan_done, dtime(9, 30), dtime(10, 30)):
                 logger.info("Running full scan (morning)")
-                run_screener(limit=2500, use_optional_filters=True)
+                run_screener(limit=2500, use_optional_filters=True, execution=EXECUTION_MODE)
                 last_known_run = now_et()
                 full_scan_done = now_et()
 
             elif dtime(10, 30) <= current_time < dtime(12, 0):
                 if should_run_every(last_watchlist_scan, 15):
                     logger.info("Running 15-min watchlist scan")
-                    run_watchlist_scan(tighten=True, cooldown=30)
+                    run_watchlist_scan(tighten=True, execution=EXECUTION_MODE)
                     last_known_run = now_et()
                     last_watchlist_scan = now_et()
 
@@ -73,7 +74,7 @@ def scheduler_loop():
                     lunch_mode = True
                 if should_run_every(last_watchlist_scan, 60):
                     logger.info("Running hourly watchlist scan")
-                    run_watchlist_scan(tighten=True, cooldown=30)
+                    run_watchlist_scan(tighten=True, execution=EXECUTION_MODE)
                     last_known_run = now_et()
                     last_watchlist_scan = now_et()
 
@@ -83,13 +84,13 @@ def scheduler_loop():
                     lunch_mode = False
                 if should_run_every(last_watchlist_scan, 15):
                     logger.info("Running 15-min watchlist scan")
-                    run_watchlist_scan(tighten=True, cooldown=30)
+                    run_watchlist_scan(tighten=True, execution=EXECUTION_MODE)
                     last_known_run = now_et()
                     last_watchlist_scan = now_et()
 
             elif should_run_once(final_scan_done, dtime(15, 0), dtime(15, 45)):
                 logger.info("Running final full scan (mode=final)")
-                run_screener(limit=500, use_optional_filters=True, mode="final")
+                run_screener(limit=500, use_optional_filters=True, mode="final", execution=EXECUTION_MODE)
                 last_known_run = now_et()
                 final_scan_done = now_et()
 
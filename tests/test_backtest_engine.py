@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtester import simulate_trade
+from utils.backtest_engine import (
+    build_price_matrix, build_bar_matrices, simulate_bars, simulate_bars_parallel, simulate_trades, simulate_trades_parallel, sweep,
+)
+
+
+def random_paths(n, seed=3):
+    rng = np.random.default_rng(seed)
+    paths, buys = [], []
+    for _ in range(n):
+        bars = int(rng.integers(1, 12))
+        closes = 100 * np.cumprod(1 + rng.normal(0, 0.02, bars))
+        paths.append(pd.DataFrame({"date": pd.date_range("2024-03-01", periods=bars, freq="B"), "close": closes}))
+        buys.append(100.0)
+    return paths, np.array(buys)
+
+
+def test_engine_matches_simulate_trade():
+    paths, buys = random_paths(500)
+    closes, dates = build_price_matrix(paths, 10)
+
+    sim = simulate_trades(closes, buys, 0.04, -0.02, dates)
+
+    for i, path in enumerate(paths):
+        sell_price, sell_date, gain_pct, holding_days, result = simulate_trade(path.head(10), buys[i], 0.04, -0.02)
+        assert sim["result"][i] == result
+        assert sim["sell_price"][i] == pytest.approx(sell_price)
+        assert sim["gain_pct"][i] == pytest.approx(gain_pct)
+        assert pd.Timestamp(sim["sell_date"][i]) == sell_date
+        assert sim["holding_days"][i] == holding_days
+
+
+def test_engine_handles_padding_and_empty_paths():
+    closes = np.array([[101.0, 106.0, np.nan], [99.0, 96.0, 90.0], [np.nan, np.nan, np.nan]])
+    sim = simulate_trades(closes, np.array([100.0, 100.0, 100.0]), 0.05, -0.03)
+
+    assert sim["result"].tolist() == ["win", "loss", "neutral"]
+    assert sim["exit_index"].tolist() == [1, 1, -1]
+    assert np.isnan(sim["gain_pct"][2])
+
+
+def test_parallel_matches_single_process():
+    paths, buys = random_paths(300)
+    closes, dates = build_price_matrix(paths, 10)
+
+    single = simulate_trades(closes, buys, 0.03, -0.03, dates)
+    parallel = simulate_trades_parallel(closes, buys, 0.03, -0.03, dates, workers=2, chunk_rows=100)
+
+    for key in single:
+        assert np.array_equal(single[key], parallel[key], equal_nan=key in ("sell_price", "gain_pct"))
+
+
+def test_sweep_matches_single_runs_and_ranks_by_expectancy():
+    paths, buys = random_paths(300)
+    closes, _ = build_price_matrix(paths, 10)
+    rsi = np.linspace(50, 70, len(buys))
+    combos = [
+        {"hold_days": h, "target_pct": t, "stop_loss_pct": -0.02, "rsi_min": None, "rsi_max": hi}
+        for h in (3, 10) for t in (0.02, 0.05) for hi in (None, 60)
+    ]
+
+    table = sweep(closes, buys, combos, rsi, workers=2)
+
+    assert len(table) == len(combos)
+    assert table["expectancy"].is_monotonic_decreasing
+    for combo in combos:
+        keep = rsi <= combo["rsi_max"] if combo["rsi_max"] else np.ones(len(buys), dtype=bool)
+        sim = simulate_trades(closes[keep, :combo["hold_days"]], buys[keep], combo["target_pct"], combo["stop_loss_pct"])
+        row = table[(table.hold_days == combo["hold_days"]) & (table.target_pct == combo["target_pct"])
+                    & (table.rsi_max.isna() if combo["rsi_max"] is None else table.rsi_max == combo["rsi_max"])]
+        assert row["trades"].item() == keep.sum()
+        assert row["expectancy"].item() == pytest.approx(np.nanmean(sim["gain_pct"]))
+        assert row["win_rate"].item() == pytest.approx((sim["result"] == "win").mean())
+
+
+def test_simulate_bars_uses_highs_lows_and_stop_wins_ties():
+    nan = np.nan
+    opens = np.array([[100.0, 101.0], [100.0, 100.0], [100.0, 95.0], [100.0, 101.0], [nan, nan]])
+    highs = np.array([[102.0, 105.5], [106.0, 100.0], [101.0, 96.0], [101.0, 102.0], [nan, nan]])
+    lows = np.array([[99.0, 100.5], [96.0, 99.0], [99.0, 94.0], [99.5, 100.0], [nan, nan]])
+    closes = np.array([[101.0, 101.0], [100.0, 99.0], [100.0, 95.0], [100.0, 101.0], [nan, nan]])
+
+    sim = simulate_bars(opens, highs, lows, closes, np.full(5, 100.0), 0.05, -0.03)
+
+    # 0: target touched intraday though no close reached it; 1: both in one bar -> stop;
+    # 2: gapped below the stop -> filled at the open; 3: neither -> last close; 4: no bars
+    assert sim["result"].tolist() == ["win", "loss", "loss", "neutral", "neutral"]
+    assert sim["exit_index"].tolist() == [1, 0, 1, 1, -1]
+    assert sim["sell_price"][:4].tolist() == pytest.approx([105.0, 97.0, 95.0, 101.0])
+    assert np.isnan(sim["gain_pct"][4])
+
+
+def test_simulate_bars_parallel_matches_single_process():
+    rng = np.random.default_rng(5)
+    paths = []
+    for _ in range(400):
+        closes = 100 * np.cumprod(1 + rng.normal(0, 0.01, int(rng.integers(1, 30))))
+        paths.append(pd.DataFrame({
+            "date": pd.date_range("2024-03-01 14:30", periods=len(closes), freq="15min", tz="UTC"),
+            "open": closes, "high": closes * 1.01, "low": closes * 0.99, "close": closes,
+        }))
+    bars = build_bar_matrices(paths, 26)
+    buys = np.full(len(paths), 100.0)
+
+    single = simulate_bars_parallel(bars, buys, 0.02, -0.01, workers=1)
+    chunked = simulate_bars_parallel(bars, buys, 0.02, -0.01, workers=2, chunk_rows=150)
+
+    for key in single:
+        assert np.array_equal(single[key], chunked[key], equal_nan=key not in ("result", "sell_time"))
+    assert pd.Timestamp(single["sell_time"][0]) >= pd.Timestamp("2024-03-01 14:30")
@@ -1,5 +1,8 @@
 import pytest
 import pandas as pd
+from datetime import date, datetime
+from unittest.mock import patch
+import backtester
 from backtester import simulate_trade
 
 def test_simulate_trade_basic():
@@ -13,3 +16,214 @@ def test_simulate_trade_basic():
 
     assert isinstance(sell_price, (float, int))
     assert result in ("win", "loss", "neutral")
+
+
+def bars(dates, closes):
+    return pd.DataFrame({
+        "date": pd.to_datetime(dates),
+        "open": closes, "high": closes, "low": closes,
+        "close": closes, "volume": [1000] * len(closes),
+    })
+
+
+@patch("backtester.log_pool_metrics")
+@patch("backtester.export_backtest_result_chunks", side_effect=lambda chunks, ts: sum(len(c) for c in chunks))
+@patch("backtester.copy_rows")
+@patch("backtester.load_price_history")
+@patch("backtester.connection")
+def test_run_backtest_reads_stored_prices_only(mock_connection, mock_load, mock_copy, mock_export, mock_metrics):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchall.return_value = [
+        ("AAPL", "Apple Inc.", date(2024, 1, 2), 100.0, datetime(2024, 1, 2, 15, 0)),
+        ("AAPL", "Apple Inc.", date(2024, 1, 4), 100.0, datetime(2024, 1, 4, 15, 0)),
+        ("MSFT", "Microsoft", date(2024, 1, 2), 50.0, datetime(2024, 1, 2, 15, 0)),  # nothing stored
+    ]
+    mock_load.return_value = {
+        "AAPL": bars(["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-08"],
+                     [100.0, 101.0, 106.0, 96.0, 99.0]),
+    }
+
+    with patch("api.fmp_client.http_get") as mock_http:
+        backtester.run_backtest(hold_days=2, workers=1)
+    mock_http.assert_not_called()
+
+    # One load for every symbol, bounded by the signal dates
+    mock_load.assert_called_once()
+    assert mock_load.call_args[0][0] == ["AAPL", "MSFT"]
+
+    results = mock_copy.call_args[0][3]
+    # Paths start the day after each signal: 101, 106 -> win; 96 -> loss
+    assert [(r[0], r[1], r[3], r[7]) for r in results] == [
+        ("AAPL", date(2024, 1, 2), 106.0, "win"),
+        ("AAPL", date(2024, 1, 4), 96.0, "loss"),
+    ]
+
+
+def test_sweep_grid_skips_empty_rsi_bands():
+    grid = backtester.sweep_grid([5, 10], [0.05], [-0.03], [55, 65], [60])
+    assert [(c["hold_days"], c["rsi_min"], c["rsi_max"]) for c in grid] == [(5, 55, 60), (10, 55, 60)]
+
+
+@patch("backtester.export_sweep_results")
+@patch("backtester.load_price_history")
+@patch("backtester.connection")
+def test_run_sweep_loads_once_and_ranks(mock_connection, mock_load, mock_export):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchall.return_value = [
+        ("AAPL", "Apple Inc.", date(2024, 1, 2), 100.0, datetime(2024, 1, 2, 15, 0), 55.0),
+        ("AAPL", "Apple Inc.", date(2024, 1, 4), 100.0, datetime(2024, 1, 4, 15, 0), 68.0),
+    ]
+    mock_load.return_value = {
+        "AAPL": bars(["2024-01-03", "2024-01-04", "2024-01-05", "2024-01-08"], [101.0, 106.0, 96.0, 99.0]),
+    }
+
+    table = backtester.run_sweep(backtester.sweep_grid([1, 2], [0.05], [-0.03], [None], [None, 60]), workers=1)
+
+    mock_load.assert_called_once()
+    mock_cursor.execute.assert_called_once()
+    assert len(table) == 4
+    best = table.iloc[0]
+    # Held 2 days with RSI <= 60: only the first signal, a 6% win
+    assert (best.hold_days, best.rsi_max, best.trades, best.expectancy) == (2, 60, 1, pytest.approx(0.06))
+    mock_export.assert_called_once()
+
+
+def test_stream_signals_keeps_each_symbol_in_one_chunk():
+    with patch("backtester.connection") as mock_connection:
+        mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        fetched = [
+            [("AAPL", 1), ("AAPL", 2), ("MSFT", 3)],
+            [("MSFT", 4), ("NVDA", 5), ("NVDA", 6)],
+            [("NVDA", 7)],
+            [],
+        ]
+        mock_cursor.fetchmany.side_effect = fetched
+
+        chunks = list(backtester.stream_signals(chunk_rows=3))
+
+    mock_connection.return_value.__enter__.return_value.cursor.assert_called_once_with(name="backtest_signals")
+    assert "ORDER BY symbol" in mock_cursor.execute.call_args[0][0]
+    assert [[row[1] for row in chunk] for chunk in chunks] == [[1, 2], [3, 4], [5, 6, 7]]
+
+
+@patch("backtester.log_pool_metrics")
+@patch("backtester.copy_rows")
+@patch("backtester.load_price_history")
+@patch("backtester.stream_signals")
+@patch("backtester.connection")
+def test_streamed_backtest_writes_and_exports_per_chunk(mock_connection, mock_stream, mock_load, mock_copy, mock_metrics, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mock_stream.return_value = iter([
+        [("AAPL", "Apple Inc.", date(2024, 1, 2), 100.0, datetime(2024, 1, 2, 15, 0))],
+        [("MSFT", "Microsoft", date(2024, 1, 2), 100.0, datetime(2024, 1, 2, 15, 0))],
+    ])
+    mock_load.side_effect = [
+        {"AAPL": bars(["2024-01-03", "2024-01-04"], [106.0, 100.0])},
+        {"MSFT": bars(["2024-01-03", "2024-01-04"], [96.0, 100.0])},
+    ]
+
+    backtester.run_backtest(hold_days=2, workers=1, stream=True)
+
+    assert [call[0][0] for call in mock_load.call_args_list] == [["AAPL"], ["MSFT"]]
+    assert mock_copy.call_count == 2
+
+    from openpyxl import load_workbook
+    [exported] = (tmp_path / "output" / "screener_results").glob("backtest_results_*.xlsx")
+    rows = list(load_workbook(exported).active.values)
+    assert rows[0][-1] == "company_name"
+    assert [(r[0], r[7], r[8]) for r in rows[1:]] == [("AAPL", "win", "Apple Inc."), ("MSFT", "loss", "Microsoft")]
+
+
+def test_apply_cooldown_keeps_one_signal_per_window():
+    scans = pd.date_range("2024-01-02 09:45", "2024-01-02 11:45", freq="15min").to_pydatetime()
+    rows = [("AAPL", "Apple Inc.", t.date(), 100.0, t) for t in scans]
+    rows += [("MSFT", "Microsoft", date(2024, 1, 2), 50.0, datetime(2024, 1, 2, 10, 0))]
+
+    kept = backtester.apply_cooldown(rows, cooldown_minutes=60)
+
+    assert [(r[0], r[4].strftime("%H:%M")) for r in kept] == [
+        ("AAPL", "09:45"), ("AAPL", "10:45"), ("AAPL", "11:45"), ("MSFT", "10:00"),
+    ]
+
+
+@patch("backtester.connection")
+def test_load_signals_consolidates_in_sql(mock_connection):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchall.return_value = []
+
+    backtester.load_signals(30, dedup="day")
+    assert "row_number() OVER (PARTITION BY symbol, timestamp::date" in mock_cursor.execute.call_args[0][0]
+
+    backtester.load_signals(30, dedup="episode")
+    sql = mock_cursor.execute.call_args[0][0]
+    assert "lag(is_bullish) OVER (PARTITION BY symbol ORDER BY timestamp)" in sql
+    assert "INTERVAL '31 days'" in sql and "INTERVAL '30 days'" in sql
+
+    backtester.load_signals(dedup="all")
+    assert "OVER" not in mock_cursor.execute.call_args[0][0]
+
+
+@patch("backtester.log_pool_metrics")
+@patch("backtester.export_backtest_result_chunks", side_effect=lambda chunks, ts: sum(len(c) for c in chunks))
+@patch("backtester.copy_rows")
+@patch("backtester.load_price_history")
+@patch("backtester.connection")
+def test_intraday_backtest_starts_after_the_scan(mock_connection, mock_load, mock_copy, mock_export, mock_metrics):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    # Scanned at 10:37 ET
+    mock_cursor.fetchall.return_value = [("AAPL", "Apple Inc.", date(2024, 1, 2), 100.0, datetime(2024, 1, 2, 15, 37))]
+    times = pd.date_range("2024-01-02 15:00", periods=6, freq="15min", tz="UTC")
+    mock_load.return_value = {"AAPL": pd.DataFrame({
+        "date": times,
+        "open":  [90.0, 99.0, 100.0, 100.5, 101.0, 101.0],
+        "high":  [99.0, 100.0, 100.8, 102.5, 101.5, 101.0],  # 15:00 and 15:30 bars open before the scan
+        "low":   [80.0, 98.0, 99.5, 100.0, 100.5, 100.0],
+        "close": [95.0, 99.5, 100.5, 101.0, 101.0, 100.5],
+        "volume": [1000] * 6,
+    })}
+
+    backtester.run_backtest(hold_days=4, target_pct=0.02, stop_loss_pct=-0.01, workers=1, mode="intraday")
+
+    assert mock_load.call_args[0][3] == "15min"
+    [result] = mock_copy.call_args[0][3]
+    # Bars from 15:45: its high reaches 102 before any low reaches 99
+    assert (result[3], result[4], result[6], result[7]) == (pytest.approx(102.0), date(2024, 1, 2), 0, "win")
+
+
+@patch("backtester.log_pool_metrics")
+@patch("backtester.export_backtest_result_chunks", side_effect=lambda chunks, ts: sum(len(c) for c in chunks))
+@patch("backtester.copy_rows")
+@patch("backtester.load_price_history")
+@patch("backtester.connection")
+def test_intraday_backtest_ignores_the_bar_in_progress_at_the_scan(mock_connection, mock_load, mock_copy, mock_export, mock_metrics):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchall.return_value = [("AAPL", "Apple Inc.", date(2024, 1, 2), 100.0, datetime(2024, 1, 2, 15, 37))]
+    times = pd.date_range("2024-01-02 15:30", periods=3, freq="15min", tz="UTC")
+    mock_load.return_value = {"AAPL": pd.DataFrame({
+        "date": times,
+        "open":  [103.0, 100.0, 99.5],
+        "high":  [104.0, 100.5, 100.0],  # the 15:30 high passed the target before the 15:37 scan
+        "low":   [99.5, 99.5, 98.0],
+        "close": [100.0, 99.8, 98.5],
+        "volume": [1000] * 3,
+    })}
+
+    backtester.run_backtest(hold_days=4, target_pct=0.02, stop_loss_pct=-0.01, workers=1, mode="intraday")
+
+    [result] = mock_copy.call_args[0][3]
+    # Neither its high nor its 103 open counts: the first bar after the scan is 15:45, the stop hits at 16:00
+    assert (result[3], result[4], result[7]) == (pytest.approx(99.0), date(2024, 1, 2), "loss")
+
+
+@patch("backtester.connection")
+def test_importing_the_backtester_keeps_live_priority(mock_connection):
+    from api.fmp_client import governor
+    seen = []
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchall.side_effect = lambda: seen.append(governor.limiter.priority) or []
+
+    assert governor.limiter.priority == "live"
+    with patch("backtester.export_backtest_result_chunks", return_value=0), patch("backtester.log_pool_metrics"):
+        backtester.run_backtest(workers=1)
+    assert seen == ["background"]
+    assert governor.limiter.priority == "live"
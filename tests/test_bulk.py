@@ -0,0 +1,36 @@
+import csv
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from db.bulk import copy_rows
+
+COLUMNS = ["symbol", "price", "is_bullish", "created_at"]
+TS = datetime(2025, 7, 7, 14, 0)
+
+
+@patch("db.bulk.execute_values")
+def test_small_batches_fall_back_to_execute_values(mock_execute_values):
+    cur = MagicMock()
+    rows = [("AAPL", 1.0, True, TS)]
+
+    assert copy_rows(cur, "s.t", COLUMNS, rows, min_copy_rows=10) == 1
+
+    sql, values = mock_execute_values.call_args[0][1:]
+    assert sql == "INSERT INTO s.t (symbol, price, is_bullish, created_at) VALUES %s"
+    assert values == rows
+    cur.copy_expert.assert_not_called()
+
+
+def test_large_batches_use_copy_in_chunks():
+    cur = MagicMock()
+    payloads = []
+    cur.copy_expert.side_effect = lambda sql, buf: payloads.append((sql, buf.read()))
+    rows = ((f"S{i}", None if i == 0 else float(i), i % 2 == 0, TS) for i in range(5))
+
+    assert copy_rows(cur, "s.t", COLUMNS, rows, min_copy_rows=2, chunk_rows=3) == 5
+
+    assert len(payloads) == 2
+    assert payloads[0][0].startswith("COPY s.t (symbol, price, is_bullish, created_at) FROM STDIN")
+    first_chunk = list(csv.reader(payloads[0][1].splitlines()))
+    assert first_chunk[0] == ["S0", r"\N", "t", TS.isoformat()]
+    assert len(first_chunk) == 3
+    assert len(payloads[1][1].splitlines()) == 2
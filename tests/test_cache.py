@@ -1,12 +1,11 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from db.cache import upsert_screener_cache, upsert_premarket_cache
+from db.cache import upsert_screener_cache, upsert_premarket_cache, upsert_fundamentals_cache
 
-@patch("db.cache.get_connection")
-def test_upsert_screener_cache_executes_sql(mock_get_conn):
-    mock_conn = MagicMock()
+@patch("db.cache.connection")
+def test_upsert_screener_cache_executes_sql(mock_connection):
+    mock_conn = mock_connection.return_value.__enter__.return_value
     mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
-    mock_get_conn.return_value = mock_conn
 
     data = {
         "symbol": "AAPL",
@@ -27,15 +26,14 @@ def test_upsert_screener_cache_executes_sql(mock_get_conn):
     args, kwargs = mock_cursor.execute.call_args
     assert "INSERT INTO day_trading_screener.screener_cache" in args[0]
     assert args[1]["symbol"] == "AAPL"
-    mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    # Borrowed from the pool and released (the context manager commits)
+    mock_connection.return_value.__exit__.assert_called_once()
 
 
-@patch("db.cache.get_connection")
-def test_upsert_premarket_cache_executes_sql(mock_get_conn):
-    mock_conn = MagicMock()
+@patch("db.cache.connection")
+def test_upsert_premarket_cache_executes_sql(mock_connection):
+    mock_conn = mock_connection.return_value.__enter__.return_value
     mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
-    mock_get_conn.return_value = mock_conn
 
     upsert_premarket_cache("MSFT", 0.042)
 
@@ -44,5 +42,18 @@ def test_upsert_premarket_cache_executes_sql(mock_get_conn):
     assert "INSERT INTO day_trading_screener.premarket_cache" in sql
     assert params[0] == "MSFT"
     assert abs(params[1] - 0.042) < 1e-6
-    mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    # Borrowed from the pool and released (the context manager commits)
+    mock_connection.return_value.__exit__.assert_called_once()
+
+
+@patch("db.cache.execute_values")
+@patch("db.cache.connection")
+def test_upsert_fundamentals_cache_keys_by_trading_day(mock_connection, mock_execute_values):
+
+    upsert_fundamentals_cache({"AAPL": {"beta": 1.2, "market_cap": 3_000_000_000}}, "2025-07-07")
+
+    sql, rows = mock_execute_values.call_args[0][1:]
+    assert "ON CONFLICT (symbol, trading_day)" in sql
+    assert rows == [("AAPL", "2025-07-07", 1.2, 3_000_000_000)]
+    # Borrowed from the pool and released (the context manager commits)
+    mock_connection.return_value.__exit__.assert_called_once()
@@ -1,8 +1,10 @@
+import inspect
 import pytest
-from unittest.mock import patch
-from api.fmp_client import fetch_fundamentals
+import requests
+from unittest.mock import MagicMock, patch
+from api.fmp_client import fetch_fundamentals, fetch_quotes_batch, fetch_historical_prices
 
-@patch("api.fmp_client.requests.get")
+@patch("api.fmp_client.http_get")
 def test_fetch_fundamentals_mocked(mock_get):
     mock_get.return_value.status_code = 200
     mock_get.return_value.json.return_value = [{
@@ -14,3 +16,89 @@ def test_fetch_fundamentals_mocked(mock_get):
     result = fetch_fundamentals("AAPL")
     assert result["beta"] == 1.25
     assert "market_cap" in result
+
+
+@patch("api.fmp_client.http_get")
+def test_fetch_quotes_batch_chunks_symbols(mock_get):
+    mock_get.return_value.status_code = 200
+    mock_get.return_value.json.side_effect = [
+        [{"symbol": "AAPL", "price": 190.1, "changesPercentage": 1.4},
+         {"symbol": "MSFT", "price": 410.0, "changesPercentage": -0.2}],
+        [{"symbol": "NVDA", "price": 120.5, "changesPercentage": 2.8}],
+    ]
+
+    quotes = fetch_quotes_batch(["AAPL", "MSFT", "NVDA", "AAPL"], chunk_size=2)
+
+    assert mock_get.call_count == 2
+    assert "/quote/AAPL,MSFT?" in mock_get.call_args_list[0][0][0]
+    assert "/quote/NVDA?" in mock_get.call_args_list[1][0][0]
+    assert quotes["NVDA"]["changesPercentage"] == 2.8
+    assert set(quotes) == {"AAPL", "MSFT", "NVDA"}
+
+
+@patch("api.fmp_client.governor")
+@patch("api.fmp_client.http_get")
+def test_fetch_historical_prices_raises_on_http_errors(mock_get, mock_governor):
+    # Raised, not swallowed, so retry_on_429 and the rate governor see throttling
+    throttled = MagicMock(status_code=429, headers={})
+    throttled.raise_for_status.side_effect = requests.exceptions.HTTPError(response=throttled)
+    mock_get.return_value = throttled
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        inspect.unwrap(fetch_historical_prices)("AAPL", from_date="2024-01-01", to_date="2024-01-31")
+
+
+@patch("api.fmp_client.governor")
+@patch("api.fmp_client.http_get")
+def test_fetch_historical_prices_sorts_bars(mock_get, mock_governor):
+    mock_get.return_value.json.return_value = {
+        "historical": [{"date": "2024-01-03", "close": 11.0}, {"date": "2024-01-02", "close": 10.0}]
+    }
+
+    prices = inspect.unwrap(fetch_historical_prices)("AAPL", from_date="2024-01-01", to_date="2024-01-31")
+
+    assert prices["close"].tolist() == [10.0, 11.0]
+
+
+@patch("utils.retry.time.sleep")
+@patch("api.fmp_client.http_get")
+def test_fetch_core_screener_429_slows_the_governor(mock_get, mock_sleep):
+    from api.fmp_client import fetch_core_screener, governor
+
+    throttled = MagicMock(status_code=429, headers={"Retry-After": "0"})
+    throttled.raise_for_status.side_effect = requests.exceptions.HTTPError(response=throttled)
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = [{"symbol": "AAPL"}]
+    mock_get.side_effect = [throttled, ok]
+
+    # A private limiter keeps the host-shared rate file out of the test
+    with patch.object(governor, "limiter", MagicMock()), \
+         patch.object(governor, "rpm", governor.max_rpm), \
+         patch.object(governor, "throttled", 0):
+        stocks = fetch_core_screener(limit=1)
+        assert governor.throttled == 1
+        assert governor.requests_per_minute < governor.max_rpm
+
+    assert stocks == [{"symbol": "AAPL"}]
+
+
+@patch("utils.retry.time.sleep")
+@patch("api.fmp_client.governor")
+@patch("api.fmp_client.http_get")
+def test_fetch_profiles_batch_reports_failed_chunks(mock_get, mock_governor, mock_sleep):
+    from api.fmp_client import fetch_profiles_batch
+
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = [{"symbol": "AAPL", "beta": 1.2, "mktCap": 3_000_000_000_000}]
+
+    def get(url, **kwargs):
+        if "AAPL" not in url:
+            raise requests.ConnectionError("connection reset")
+        return ok
+    mock_get.side_effect = get
+
+    failed = []
+    profiles = fetch_profiles_batch(["AAPL", "GONE", "MSFT"], chunk_size=2, failed=failed)
+
+    assert profiles == {"AAPL": {"beta": 1.2, "market_cap": 3_000_000_000_000}}
+    assert failed == ["MSFT"]  # GONE was in a chunk that succeeded
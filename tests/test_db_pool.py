@@ -0,0 +1,82 @@
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+import db
+from db import ConnectionPool
+
+
+class FakeThreadedPool:
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.created = []
+        self.closed = []
+
+    def getconn(self):
+        conn = MagicMock(closed=0)
+        conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+        self.created.append(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        if close:
+            self.closed.append(conn)
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def pool():
+    with patch("db.ThreadedConnectionPool", FakeThreadedPool):
+        yield ConnectionPool(1, 2, timeout=0.1, healthcheck_idle=60)
+
+
+def test_checkout_and_return_tracks_metrics(pool):
+    first, second = pool.getconn(), pool.getconn()
+    assert pool.metrics["in_use"] == 2
+    pool.putconn(first)
+    pool.putconn(second)
+    assert pool.metrics == {
+        "checkouts": 2, "waits": 0, "wait_seconds": 0.0,
+        "in_use": 0, "max_in_use": 2, "discarded": 0,
+    }
+
+
+def test_exhausted_pool_blocks_then_times_out(pool):
+    pool.getconn()
+    pool.getconn()
+    with pytest.raises(PoolError):
+        pool.getconn()
+
+
+def test_waiter_gets_connection_when_one_is_returned(pool):
+    conns = [pool.getconn(), pool.getconn()]
+    pool.timeout = 2
+    threading.Timer(0.05, pool.putconn, args=(conns[0],)).start()
+    assert pool.getconn() is not None
+    assert pool.metrics["waits"] == 1
+
+
+def test_closed_connections_are_discarded_on_checkout(pool):
+    conn = pool.getconn()
+    conn.closed = 1
+    pool.putconn(conn)
+
+    with patch.object(pool._pool, "getconn", side_effect=[conn, MagicMock(closed=0)]):
+        fresh = pool.getconn()
+    assert fresh is not conn
+    assert pool.metrics["discarded"] == 1
+
+
+def test_connection_context_commits_and_rolls_back(pool):
+    with patch("db.get_pool", return_value=pool):
+        with db.connection() as conn:
+            pass
+        conn.commit.assert_called_once()
+
+        with pytest.raises(ValueError):
+            with db.connection() as conn:
+                raise ValueError("boom")
+        conn.rollback.assert_called()
+    assert pool.metrics["in_use"] == 0
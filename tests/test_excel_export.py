@@ -1,6 +1,6 @@
 import pandas as pd
 import os
-from utils.exporter import export_screener_results_to_excel
+from utils.exporter import export_screener_results_to_excel, ET
 import pytest
 from datetime import datetime
 
@@ -12,8 +12,11 @@ def sample_results_df():
         "score": [85, 60]
     })
 
-def test_export_excel_structure(sample_results_df):
+def test_export_excel_structure(sample_results_df, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the exporter writes under ./output
     now = datetime(2025, 7, 7, 12, 0)
     export_screener_results_to_excel(sample_results_df, now)
-    expected_filename = f"output/screener_results/screener_results_{now.strftime('%Y-%m-%d_%H%M')}.xlsx"
+    # Files are named by the run time in US/Eastern
+    stamp = now.astimezone(ET).strftime('%Y-%m-%d_%H%M')
+    expected_filename = f"output/screener_results/screener_results_{stamp}.xlsx"
     assert os.path.exists(expected_filename)
\ No newline at end of file
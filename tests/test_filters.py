@@ -0,0 +1,99 @@
+import random
+import pytest
+from utils.filters import is_bullish, evaluate_bullish, build_scan_frame, prefilter_screener_payload
+from utils.rules import get_ruleset
+
+
+def maybe(rng, value, p_missing=0.05):
+    return None if rng.random() < p_missing else value
+
+def random_rows(n, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        price = rng.uniform(5, 500)
+        # Values straddle every threshold, including exact boundaries
+        indicators = None if rng.random() < 0.03 else {
+            "vwap": maybe(rng, price * rng.choice([0.98, 1.0, 1.02])),
+            "ema20": maybe(rng, rng.choice([100.0, 101.0, 99.0])),
+            "ema50": maybe(rng, 100.0),
+            "rsi14": maybe(rng, rng.choice([45.0, 50.0, 55.0, 69.9, 70.0, 75.0])),
+        }
+        fundamentals = {
+            "beta": maybe(rng, rng.choice([0.8, 1.0, 1.3])),
+            "market_cap": maybe(rng, rng.choice([1_500_000_000, 2_000_000_000, 9_000_000_000])),
+        }
+        pre_market = maybe(rng, rng.choice([0.5, 1.0, 2.5]))
+        rows.append((maybe(rng, price, 0.01), indicators, fundamentals, pre_market))
+    return rows
+
+def reference_is_bullish(price, indicators, fundamentals, pre_market, use_optional_filters):
+    # The thresholds as they were hard-coded before the rule engine
+    if use_optional_filters:
+        beta, market_cap = fundamentals.get("beta"), fundamentals.get("market_cap")
+        if beta is None or market_cap is None or pre_market is None:
+            return False
+        if beta <= 1 or market_cap < 2_000_000_000 or pre_market <= 1:
+            return False
+    indicators = indicators or {}
+    values = [price] + [indicators.get(k) for k in ("vwap", "ema20", "ema50", "rsi14")]
+    if any(v is None for v in values):
+        return False
+    price, vwap, ema20, ema50, rsi = values
+    return price > vwap and ema20 > ema50 and 50 < rsi < 70
+
+def scalar_code(row, use_optional_filters):
+    reasons = []
+    if is_bullish(*row, use_optional_filters, reasons=reasons):
+        return 0
+    labels = get_ruleset(use_optional_filters).labels
+    # Scalar messages look like "<symbol>: <label> (...)"
+    message = reasons[0].split(": ", 1)[1]
+    return max(
+        (i for i, label in enumerate(labels) if i and message.startswith(label)),
+        key=lambda i: len(labels[i]),
+    )
+
+
+@pytest.mark.parametrize("use_optional_filters", [False, True])
+def test_scalar_rules_match_reference_thresholds(use_optional_filters):
+    for row in random_rows(3000):
+        assert is_bullish(*row, use_optional_filters) == reference_is_bullish(*row, use_optional_filters)
+
+
+@pytest.mark.parametrize("use_optional_filters", [False, True])
+def test_evaluate_bullish_matches_scalar(use_optional_filters):
+    rows = random_rows(3000)
+
+    mask, codes = evaluate_bullish(build_scan_frame(rows), use_optional_filters)
+
+    expected = [scalar_code(row, use_optional_filters) for row in rows]
+    assert codes.tolist() == expected
+    assert mask.tolist() == [code == 0 for code in expected]
+    assert mask.any() and not mask.all()
+
+
+def test_evaluate_bullish_accepts_plain_arrays():
+    mask, codes = evaluate_bullish({
+        "price": [10.0, 10.0],
+        "vwap": [9.0, 11.0],
+        "ema20": [5.0, 5.0],
+        "ema50": [4.0, 4.0],
+        "rsi14": [60.0, 60.0],
+    })
+    assert mask.tolist() == [True, False]
+    assert get_ruleset().labels[codes[1]] == "price not above VWAP"
+
+
+def test_prefilter_only_judges_complete_payload_rows():
+    stocks = [
+        {"symbol": "OK", "price": 50.0, "beta": 1.4, "marketCap": 5_000_000_000},
+        {"symbol": "LOW", "price": 50.0, "beta": 0.7, "marketCap": 5_000_000_000},
+        {"symbol": "UNKNOWN", "price": 50.0, "beta": 0.7},  # market cap not in payload
+    ]
+    survivors, rejected = prefilter_screener_payload(stocks, get_ruleset(True))
+
+    assert [s["symbol"] for s in survivors] == ["OK", "UNKNOWN"]
+    assert [(s["symbol"], reasons) for s, reasons in rejected] == [("LOW", ["LOW: beta too low (0.7)"])]
+    # Without optional filters no rule can be decided from the payload
+    assert prefilter_screener_payload(stocks, get_ruleset(False)) == (stocks, [])
@@ -0,0 +1,89 @@
+from datetime import date
+from unittest.mock import ANY, patch
+from api.fundamentals import get_fundamentals_batch, clear_fundamentals_lru, fundamentals_from_screener, seed_fundamentals
+
+DAY = date(2025, 7, 7)
+
+
+@patch("api.fundamentals.upsert_fundamentals_cache")
+@patch("api.fundamentals.fetch_profiles_batch")
+@patch("api.fundamentals.load_fundamentals_cache")
+def test_get_fundamentals_batch_uses_db_then_api_then_lru(mock_load, mock_fetch, mock_upsert):
+    clear_fundamentals_lru()
+    mock_load.return_value = {"AAPL": {"beta": 1.2, "market_cap": 3_000_000_000_000}}
+    mock_fetch.return_value = {"TSLA": {"beta": 2.1, "market_cap": 700_000_000_000}}
+
+    first = get_fundamentals_batch(["AAPL", "TSLA"], trading_day=DAY)
+
+    assert first["AAPL"]["beta"] == 1.2
+    assert first["TSLA"]["beta"] == 2.1
+    mock_load.assert_called_once_with(["AAPL", "TSLA"], DAY)
+    mock_fetch.assert_called_once_with(["TSLA"], failed=ANY)
+    mock_upsert.assert_called_once_with(mock_fetch.return_value, DAY)
+
+    # Rescan on the same day is served entirely in-process
+    second = get_fundamentals_batch(["TSLA", "AAPL"], trading_day=DAY)
+    assert second == first
+    assert mock_load.call_count == 1
+    assert mock_fetch.call_count == 1
+
+
+@patch("api.fundamentals.upsert_fundamentals_cache")
+@patch("api.fundamentals.fetch_profiles_batch", return_value={})
+@patch("api.fundamentals.load_fundamentals_cache", return_value={})
+def test_get_fundamentals_batch_is_day_scoped(mock_load, mock_fetch, mock_upsert):
+    clear_fundamentals_lru()
+    get_fundamentals_batch(["AAPL"], trading_day=DAY)
+    get_fundamentals_batch(["AAPL"], trading_day=date(2025, 7, 8))
+    assert mock_load.call_count == 2
+
+
+@patch("api.fundamentals.upsert_fundamentals_cache")
+@patch("api.fundamentals.fetch_profiles_batch")
+@patch("api.fundamentals.load_fundamentals_cache", return_value={})
+def test_seeded_screener_fundamentals_skip_profile_requests(mock_load, mock_fetch, mock_upsert):
+    clear_fundamentals_lru()
+    stocks = [
+        {"symbol": "AAPL", "beta": 1.2, "marketCap": 3_000_000_000_000},
+        {"symbol": "MSFT", "beta": None, "marketCap": 3_100_000_000_000},
+    ]
+    seed_fundamentals(fundamentals_from_screener(stocks), DAY)
+    mock_fetch.return_value = {"MSFT": {"beta": 0.9, "market_cap": 3_100_000_000_000}}
+
+    result = get_fundamentals_batch(["AAPL", "MSFT"], DAY)
+
+    mock_fetch.assert_called_once_with(["MSFT"], failed=ANY)
+    assert result["AAPL"] == {"beta": 1.2, "market_cap": 3_000_000_000_000}
+
+
+@patch("api.fundamentals.upsert_fundamentals_cache")
+@patch("api.fundamentals.fetch_profiles_batch")
+@patch("api.fundamentals.load_fundamentals_cache", return_value={})
+def test_symbols_without_a_profile_are_cached_for_the_day(mock_load, mock_fetch, mock_upsert):
+    clear_fundamentals_lru()
+    mock_fetch.return_value = {"AAPL": {"beta": 1.2, "market_cap": 3_000_000_000_000}}
+
+    first = get_fundamentals_batch(["AAPL", "GONE"], DAY)
+    second = get_fundamentals_batch(["GONE"], DAY)
+
+    mock_fetch.assert_called_once()
+    assert first["GONE"] == second["GONE"] == {"beta": None, "market_cap": None}
+    assert "GONE" in mock_upsert.call_args[0][0]
+
+
+@patch("api.fundamentals.upsert_fundamentals_cache")
+@patch("api.fundamentals.fetch_profiles_batch")
+@patch("api.fundamentals.load_fundamentals_cache", return_value={})
+def test_symbols_in_failed_profile_requests_are_not_cached(mock_load, mock_fetch, mock_upsert):
+    clear_fundamentals_lru()
+
+    def chunk_failed(symbols, failed):
+        failed.extend(symbols)
+        return {}
+    mock_fetch.side_effect = chunk_failed
+
+    assert get_fundamentals_batch(["AAPL"], DAY) == {}
+    get_fundamentals_batch(["AAPL"], DAY)
+
+    assert mock_fetch.call_count == 2
+    assert mock_upsert.call_args[0][0] == {}
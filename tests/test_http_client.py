@@ -0,0 +1,42 @@
+import threading
+import requests
+from unittest.mock import patch, MagicMock
+from api import http_client
+from api.http_client import http_get, get_session, get_http_stats, reset_http_stats
+
+
+def test_sessions_share_one_connection_pool():
+    sessions = []
+    t = threading.Thread(target=lambda: sessions.append(get_session()))
+    t.start()
+    t.join()
+    sessions.append(get_session())
+
+    assert sessions[0] is not sessions[1]
+    assert sessions[0].get_adapter("https://x") is sessions[1].get_adapter("https://x")
+
+
+@patch.object(requests.Session, "get")
+def test_http_get_records_endpoint_stats(mock_get):
+    reset_http_stats()
+    mock_get.side_effect = [MagicMock(status_code=200), MagicMock(status_code=429)]
+
+    http_get("https://example.com/quote/AAPL", endpoint="quote")
+    http_get("https://example.com/quote/MSFT", endpoint="quote")
+
+    stats = get_http_stats()["quote"]
+    assert stats["requests"] == 2
+    assert stats["errors"] == 1
+    assert stats["throttled"] == 1
+    _, kwargs = mock_get.call_args
+    assert kwargs["timeout"] == (http_client.HTTP_CONNECT_TIMEOUT, http_client.HTTP_READ_TIMEOUT)
+
+
+@patch.object(requests.Session, "get", side_effect=requests.exceptions.ConnectionError("boom"))
+def test_http_get_counts_transport_errors(mock_get):
+    reset_http_stats()
+    try:
+        http_get("https://example.com/profile/AAPL", endpoint="profile")
+    except requests.exceptions.ConnectionError:
+        pass
+    assert get_http_stats()["profile"]["errors"] == 1
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from utils.indicators import ema, rsi, session_vwap, compute_indicators
+
+
+def make_bars(closes, start="2025-07-03 09:30", volume=1000):
+    dates = pd.date_range(start, periods=len(closes), freq="15min")
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({
+        "date": dates,
+        "open": closes,
+        "high": closes + 0.5,
+        "low": closes - 0.5,
+        "close": closes,
+        "volume": volume,
+    })
+
+
+def wilder_rsi(closes, period=14):
+    avg_gain = avg_loss = 0.0
+    for i in range(1, len(closes)):
+        change = closes[i] - closes[i - 1]
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if i == 1:
+            avg_gain, avg_loss = gain, loss
+        else:
+            avg_gain += (gain - avg_gain) / period
+            avg_loss += (loss - avg_loss) / period
+    return 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def test_ema_matches_recurrence():
+    closes = [10, 11, 12, 11, 13, 14, 13.5]
+    expected = closes[0]
+    for c in closes[1:]:
+        expected += (2 / 21) * (c - expected)
+    assert ema(closes, 20).iloc[-1] == pytest.approx(expected)
+
+
+def test_rsi_matches_wilder_recurrence():
+    closes = list(100 + np.cumsum(np.sin(np.arange(60)) * 2))
+    assert rsi(closes).iloc[-1] == pytest.approx(wilder_rsi(closes))
+    assert rsi(list(range(1, 30))).iloc[-1] == 100.0
+
+
+def test_session_vwap_uses_latest_session_only():
+    bars = pd.concat([
+        make_bars([50] * 4, start="2025-07-03 09:30", volume=10_000),
+        make_bars([100, 102], start="2025-07-07 09:30", volume=[100, 300]),
+    ], ignore_index=True)
+    assert session_vwap(bars) == pytest.approx((100 * 100 + 102 * 300) / 400)
+
+
+def test_compute_indicators_shape_and_short_history():
+    indicators = compute_indicators(make_bars(np.linspace(100, 120, 30)))
+    assert set(indicators) == {"rsi14", "ema20", "ema50", "vwap"}
+    assert indicators["ema50"] is None
+    assert indicators["ema20"] is not None
+    assert compute_indicators(pd.DataFrame()) is None
+
+
+@patch("api.fmp_client.http_get")
+def test_fetch_technicals_local_uses_one_request(mock_get):
+    from api.fmp_client import fetch_technicals_local
+
+    bars = make_bars(np.linspace(100, 130, 80))
+    payload = bars.assign(date=bars["date"].dt.strftime("%Y-%m-%d %H:%M:%S")).iloc[::-1].to_dict("records")
+    mock_get.return_value.status_code = 200
+    mock_get.return_value.json.return_value = payload
+
+    indicators = fetch_technicals_local("AAPL")
+
+    assert mock_get.call_count == 1
+    assert indicators["ema20"] > indicators["ema50"]
+    assert indicators["rsi14"] == 100.0
+
+
+def test_advanced_state_matches_full_rebuild():
+    from utils.indicators import build_state, advance_state, state_to_indicators
+
+    closes = 100 + np.cumsum(np.cos(np.arange(90)) * 1.5)
+    bars = pd.concat([
+        make_bars(closes[:60], start="2025-07-03 09:30"),
+        make_bars(closes[60:], start="2025-07-07 09:30"),
+    ], ignore_index=True)
+
+    state = advance_state(build_state(bars.iloc[:70]), bars.iloc[65:])
+    rebuilt = build_state(bars)
+
+    for key in ("ema20", "ema50", "avg_gain", "avg_loss", "cum_pv", "cum_volume"):
+        assert state[key] == pytest.approx(rebuilt[key])
+    assert state["bar_count"] == rebuilt["bar_count"] == 90
+    assert state_to_indicators(state) == pytest.approx(compute_indicators(bars))
+
+
+@patch("api.fmp_client.fetch_intraday_bars")
+def test_fetch_technicals_incremental_requests_only_since_last_bar(mock_bars):
+    from api.fmp_client import fetch_technicals_incremental
+    from utils.indicators import build_state
+
+    bars = make_bars(np.linspace(100, 120, 60), start="2025-07-07 09:30")
+    state = build_state(bars.iloc[:55])
+    state["last_bar_ts"] = state["last_bar_ts"].replace(year=2099)  # never stale in this test
+    mock_bars.return_value = bars.iloc[50:].assign(date=bars["date"].iloc[50:] + pd.DateOffset(years=74))
+
+    indicators, new_state = fetch_technicals_incremental("AAPL", state)
+
+    assert mock_bars.call_args.kwargs["from_date"] == state["last_bar_ts"].date()
+    assert indicators is not None
+    assert new_state["bar_count"] == 55  # future-dated bars are still forming and are not ingested
+
+
+@patch("api.fmp_client.fetch_intraday_bars")
+def test_local_and_incremental_ignore_the_forming_bar(mock_bars):
+    from api.fmp_client import fetch_technicals_local, fetch_technicals_incremental
+
+    closed = make_bars(np.linspace(100, 120, 60), start="2025-07-07 09:30")
+    forming = make_bars([500.0], start=str(pd.Timestamp.now(tz="US/Eastern").tz_localize(None).floor("15min")))
+    mock_bars.return_value = pd.concat([closed, forming], ignore_index=True)
+
+    local = fetch_technicals_local("AAPL")
+    incremental, _ = fetch_technicals_incremental("AAPL", None)
+
+    assert local == pytest.approx(compute_indicators(closed))
+    assert local == pytest.approx(incremental)
+
+
+@patch("api.fmp_client.fetch_intraday_bars")
+def test_fetch_technicals_incremental_fails_without_fresh_bars(mock_bars):
+    from api.fmp_client import fetch_technicals_incremental
+    from utils.indicators import build_state
+
+    state = build_state(make_bars(np.linspace(100, 120, 60), start="2025-07-07 09:30"))
+    state["last_bar_ts"] = state["last_bar_ts"].replace(year=2099)
+
+    for outcome in (None, RuntimeError("boom")):
+        mock_bars.side_effect = outcome if isinstance(outcome, Exception) else None
+        mock_bars.return_value = outcome
+        indicators, kept_state = fetch_technicals_incremental("AAPL", state)
+        assert indicators is None
+        assert kept_state is state
@@ -0,0 +1,49 @@
+from datetime import date
+from unittest.mock import MagicMock
+from db.partitions import (
+    partition_ranges, partition_bounds, expired_partitions,
+    ensure_partitions, drop_expired_partitions,
+)
+
+def test_partition_ranges_daily_and_monthly():
+    daily = partition_ranges("screener_cache", date(2026, 10, 30), date(2026, 11, 1))
+    assert [name for name, _, _ in daily] == [
+        "screener_cache_p20261030", "screener_cache_p20261031", "screener_cache_p20261101",
+    ]
+
+    monthly = partition_ranges("stock_result", date(2026, 11, 15), date(2027, 1, 3))
+    assert monthly[0] == ("stock_result_p202611", date(2026, 11, 1), date(2026, 12, 1))
+    assert monthly[-1] == ("stock_result_p202701", date(2027, 1, 1), date(2027, 2, 1))
+
+def test_partition_bounds_ignores_default():
+    assert partition_bounds("quote_cache", "quote_cache_p20261018") == (date(2026, 10, 18), date(2026, 10, 19))
+    assert partition_bounds("quote_cache", "quote_cache_default") is None
+
+def test_expired_partitions_only_whole_ranges_before_cutoff():
+    names = ["screener_cache_p20261003", "screener_cache_p20261001", "screener_cache_p20261004", "screener_cache_default"]
+    assert expired_partitions("screener_cache", names, date(2026, 10, 4)) == [
+        "screener_cache_p20261001", "screener_cache_p20261003",
+    ]
+
+def test_ensure_partitions_creates_only_missing():
+    cur = MagicMock()
+    cur.fetchall.return_value = [("screener_cache_default",), ("screener_cache_p20261018",)]
+
+    created = ensure_partitions(cur, "screener_cache", ahead_days=2, today=date(2026, 10, 18))
+
+    assert created == ["screener_cache_p20261019", "screener_cache_p20261020"]
+    ddl = cur.execute.call_args_list[-1].args[0]
+    assert "PARTITION OF day_trading_screener.screener_cache" in ddl
+    assert "FROM ('2026-10-20 00:00:00+00') TO ('2026-10-21 00:00:00+00')" in ddl
+
+def test_drop_expired_partitions_detaches_then_drops():
+    cur = MagicMock()
+    cur.fetchall.return_value = [("quote_cache_p20260901",), ("quote_cache_p20261017",)]
+
+    dropped = drop_expired_partitions(cur, "quote_cache", 30, today=date(2026, 10, 18))
+
+    assert dropped == ["quote_cache_p20260901"]
+    statements = [c.args[0] for c in cur.execute.call_args_list]
+    assert "ALTER TABLE day_trading_screener.quote_cache DETACH PARTITION day_trading_screener.quote_cache_p20260901" in statements
+    assert "DROP TABLE day_trading_screener.quote_cache_p20260901" in statements
+    assert not any(s.startswith("DELETE") and "quote_cache_p" in s for s in statements)
@@ -0,0 +1,89 @@
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+import pandas as pd
+
+from db.price_history_import import missing_ranges, sync_price_history
+from db.price_store import save_price_history
+
+
+def bars(dates, closes):
+    return pd.DataFrame({
+        "date": pd.to_datetime(dates),
+        "open": closes, "high": closes, "low": closes,
+        "close": closes, "volume": [1000] * len(closes),
+    })
+
+
+def test_missing_ranges_skips_stored_span():
+    assert missing_ranges(date(2024, 1, 1), date(2024, 1, 31), None) == [(date(2024, 1, 1), date(2024, 1, 31))]
+    assert missing_ranges(date(2024, 1, 1), date(2024, 1, 31), (date(2024, 1, 10), date(2024, 1, 20))) == [
+        (date(2024, 1, 1), date(2024, 1, 9)),
+        (date(2024, 1, 20), date(2024, 1, 31)),
+    ]
+    # The last stored day is fetched again in case it was stored incomplete
+    assert missing_ranges(date(2024, 1, 10), date(2024, 1, 20), (date(2024, 1, 1), date(2024, 1, 20))) == [
+        (date(2024, 1, 20), date(2024, 1, 20)),
+    ]
+    assert missing_ranges(date(2024, 1, 10), date(2024, 1, 20), (date(2024, 1, 1), date(2024, 1, 31))) == []
+
+
+@patch("db.price_history_import.save_price_history", return_value=2)
+@patch("db.price_history_import.fetch_historical_prices")
+@patch("db.price_history_import.stored_date_ranges")
+def test_sync_fetches_only_missing_dates(mock_stored, mock_fetch, mock_save):
+    mock_stored.return_value = {
+        "AAPL": (date(2024, 1, 1), date(2024, 1, 31)),  # up to date
+        "MSFT": (date(2024, 1, 1), date(2024, 1, 29)),  # two days behind
+        "NVDA": (date(2024, 1, 1), date(2024, 2, 1)),   # beyond end_date
+    }
+    mock_fetch.side_effect = lambda symbol, from_date, to_date: bars(
+        pd.date_range(from_date, to_date).strftime("%Y-%m-%d"), [10.0] * ((to_date - from_date).days + 1)
+    )
+
+    fetched, written = sync_price_history(
+        {"AAPL": date(2024, 1, 1), "MSFT": date(2024, 1, 1), "NVDA": date(2024, 1, 1)},
+        end_date=date(2024, 1, 31), workers=1,
+    )
+
+    # The last stored day is refetched so a partial bar gets completed
+    assert sorted((c.args[0], c.kwargs["from_date"], c.kwargs["to_date"]) for c in mock_fetch.call_args_list) == [
+        ("AAPL", date(2024, 1, 31), date(2024, 1, 31)),
+        ("MSFT", date(2024, 1, 29), date(2024, 1, 31)),
+    ]
+    rows = mock_save.call_args[0][0]
+    assert sorted(rows) == [
+        ("AAPL", date(2024, 1, 31), 10.0, 10.0, 10.0, 10.0, 1000),
+        ("MSFT", date(2024, 1, 29), 10.0, 10.0, 10.0, 10.0, 1000),
+        ("MSFT", date(2024, 1, 30), 10.0, 10.0, 10.0, 10.0, 1000),
+        ("MSFT", date(2024, 1, 31), 10.0, 10.0, 10.0, 10.0, 1000),
+    ]
+    assert (fetched, written) == (2, 2)
+
+
+@patch("db.price_history_import.save_price_history", return_value=2)
+@patch("db.price_history_import.fetch_intraday_bars")
+@patch("db.price_history_import.stored_date_ranges", return_value={})
+def test_sync_intraday_splits_ranges_and_stores_utc(mock_stored, mock_fetch, mock_save):
+    mock_fetch.return_value = bars(["2024-01-02 09:30:00", "2024-01-02 09:45:00"], [10.0, 11.0])
+
+    sync_price_history({"AAPL": date(2024, 1, 1)}, end_date=date(2024, 2, 15), workers=1, interval="15min")
+
+    assert [c.kwargs["from_date"] for c in mock_fetch.call_args_list] == [date(2024, 1, 1), date(2024, 1, 31)]
+    rows, interval = mock_save.call_args[0]
+    assert interval == "15min"
+    assert rows[0][1] == datetime(2024, 1, 2, 14, 30, tzinfo=timezone.utc)
+
+
+@patch("db.price_store.copy_rows", return_value=1)
+@patch("db.price_store.connection")
+def test_save_price_history_overwrites_changed_bars(mock_connection, mock_copy):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    mock_cursor.rowcount = 1
+
+    assert save_price_history([("AAPL", date(2024, 1, 31), 10.0, 11.0, 9.0, 10.5, 1000)]) == 1
+
+    sql = mock_cursor.execute.call_args[0][0]
+    assert "ON CONFLICT (symbol, date) DO UPDATE" in sql
+    assert "close = EXCLUDED.close" in sql
+    assert "IS DISTINCT FROM" in sql  # unchanged bars are not rewritten
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from utils.ratelimiter import RateLimiter, RateGovernor
+
+
+def test_rate_limiter_paces_after_burst():
+    limiter = RateLimiter(2, 0.2)  # 10 per second, burst of 2
+    start = time.time()
+    for _ in range(4):
+        limiter.wait()
+    assert time.time() - start >= 0.18
+
+
+def test_try_acquire_respects_burst():
+    limiter = RateLimiter(1, 10, burst=3)
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_waiters_do_not_hold_the_lock_while_sleeping():
+    limiter = RateLimiter(1, 0.5, burst=1)
+    limiter.wait()
+    waiter = threading.Thread(target=limiter.wait)
+    waiter.start()
+    time.sleep(0.05)
+
+    start = time.time()
+    assert limiter.try_acquire() is False
+    assert time.time() - start < 0.05
+    waiter.join()
+
+
+def test_async_acquire_paces_coroutines():
+    limiter = RateLimiter(5, 0.5, burst=1)  # 10 per second
+
+    async def take(n):
+        for _ in range(n):
+            await limiter.acquire()
+
+    start = time.time()
+    asyncio.run(take(3))
+    assert time.time() - start >= 0.18
+
+
+def test_governor_halves_rate_on_throttle_and_recovers():
+    governor = RateGovernor(300, burst=5)
+    assert governor.limiter.period == pytest.approx(1.0)
+
+    governor.on_throttle()
+    assert governor.requests_per_minute == 150
+    assert governor.limiter.period == pytest.approx(2.0)
+
+    for _ in range(60):
+        governor.on_success()
+    assert governor.requests_per_minute == 300
+
+
+def test_governor_never_drops_below_floor():
+    governor = RateGovernor(300, min_fraction=0.25)
+    for _ in range(10):
+        governor.on_throttle()
+    assert governor.requests_per_minute == 75
+
+
+@patch("utils.ratelimiter.time.sleep")
+def test_governor_pauses_callers_for_retry_after(mock_sleep):
+    governor = RateGovernor(6000, burst=100)
+    governor.on_throttle(retry_after=2)
+    governor.wait()
+    assert mock_sleep.call_args[0][0] == pytest.approx(2, abs=0.1)
+
+
+def test_shared_limiter_budget_is_shared_between_instances(tmp_path):
+    from utils.ratelimiter import SharedRateLimiter
+
+    path = str(tmp_path / "rate.bin")
+    scanner = SharedRateLimiter(1, 10, burst=3, path=path)
+    other_scanner = SharedRateLimiter(1, 10, burst=3, path=path)
+
+    assert scanner.try_acquire() and scanner.try_acquire()
+    assert other_scanner.try_acquire() is True
+    assert other_scanner.try_acquire() is False
+
+
+def test_background_yields_to_recent_live_traffic(tmp_path):
+    from utils.ratelimiter import SharedRateLimiter
+
+    path = str(tmp_path / "rate.bin")
+    live = SharedRateLimiter(1, 10, burst=3, path=path)
+    backtest = SharedRateLimiter(1, 10, burst=3, path=path, priority="background", live_window=0.2)
+
+    assert backtest.try_acquire() is True  # no live traffic yet
+    live.wait()
+    assert backtest.try_acquire() is False  # tokens left, but a live scan is active
+    time.sleep(0.25)
+    assert backtest.try_acquire() is True
+
+
+def test_shared_limiter_rate_change_applies_to_all_instances(tmp_path):
+    from utils.ratelimiter import SharedRateLimiter
+
+    path = str(tmp_path / "rate.bin")
+    first = SharedRateLimiter(10, 1, burst=1, path=path)
+    second = SharedRateLimiter(10, 1, burst=1, path=path)
+    first.set_period(100)  # 0.1 per second
+
+    first.wait()
+    start = time.time()
+    assert second._take() == pytest.approx(10, rel=0.05)  # reservation delay at the shared rate
+    assert time.time() - start < 1
+
+
+def test_host_governor_resumes_and_recovers_the_shared_rate(tmp_path):
+    path = str(tmp_path / "rate.bin")
+    first = RateGovernor(300, burst=5, backend="host", state_path=path)
+    first.on_throttle()
+    first.on_throttle()
+    assert first.requests_per_minute == 75
+    del first  # exits before recovering
+
+    second = RateGovernor(300, burst=5, backend="host", state_path=path)
+    assert second.requests_per_minute == 75
+    assert second.limiter.stored_rate() * 60 == pytest.approx(75)
+
+    for _ in range(75):
+        second.on_success()
+    assert second.requests_per_minute == 300
+    assert second.limiter.stored_rate() * 60 == pytest.approx(300)
+
+
+def test_priority_is_scoped_and_restored(tmp_path):
+    governor = RateGovernor(300, backend="host", state_path=str(tmp_path / "rate.bin"))
+
+    with governor.priority("background"):
+        assert governor.limiter.priority == "background"
+    assert governor.limiter.priority == "live"
+
+    @governor.priority("background")
+    def backtest():
+        assert governor.limiter.priority == "background"
+        raise RuntimeError("stops early")
+
+    with pytest.raises(RuntimeError):
+        backtest()
+    assert governor.limiter.priority == "live"
+    # The in-process backend has no priority; the block is a no-op
+    with RateGovernor(300).priority("background"):
+        pass
@@ -25,3 +25,24 @@ def test_retry_backoff_behavior():
         assert duration >= 1.2 + 1.2**2  # Rough minimum backoff time
     else:
         assert False, "Expected an HTTPError but none was raised"
+
+
+def test_retry_on_429_reports_to_governor():
+    from unittest.mock import MagicMock, patch
+    from utils.retry import retry_on_429
+
+    throttled, succeeded = [], []
+    response = MagicMock(status_code=429, headers={"Retry-After": "0"})
+    attempts = iter([requests.exceptions.HTTPError(response=response), None])
+
+    @retry_on_429(logger=MagicMock(), on_throttle=throttled.append, on_success=lambda: succeeded.append(True))
+    def flaky():
+        error = next(attempts)
+        if error:
+            raise error
+        return "ok"
+
+    with patch("utils.retry.time.sleep"):
+        assert flaky() == "ok"
+    assert throttled == [0.0]
+    assert succeeded == [True]
@@ -0,0 +1,61 @@
+import json
+from utils.rules import compile_rules, load_rules, order_sources, DEFAULT_RULES
+
+
+def test_cheap_rules_are_checked_first():
+    rules = compile_rules(DEFAULT_RULES, use_optional_filters=True)
+
+    assert rules.sources == ["quote", "fundamentals", "technicals"]
+    # Pre-market comes with the quote, so it rejects before any technicals are needed
+    reasons = []
+    assert not rules.evaluate({"price": 10.0, "pre_market_change_pct": 0.2}, symbol="X", reasons=reasons)
+    assert reasons == ["X: pre-market change too low (0.2)"]
+
+
+def test_evaluate_limited_to_sources():
+    rules = compile_rules(DEFAULT_RULES, use_optional_filters=True)
+    values = {"price": 10.0, "pre_market_change_pct": 2.0, "vwap": 9.0, "ema20": 5.0, "ema50": 4.0, "rsi14": 60.0}
+
+    assert rules.evaluate(values, sources={"quote", "technicals"})
+    reasons = []
+    assert not rules.evaluate(values, symbol="X", reasons=reasons)
+    assert reasons == ["X: missing beta"]
+
+
+def test_check_single_rule():
+    rules = compile_rules(DEFAULT_RULES)
+    assert rules.check("rsi_in_range", {"rsi14": 60}) is True
+    assert rules.check("rsi_in_range", {"rsi14": 70}) is False  # strict, like is_bullish
+    assert rules.check("price_above_vwap", {"price": 10}) is None
+    assert rules.check("not_configured", {}) is None
+
+
+def test_rules_from_json(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([
+        {"name": "cheap", "field": "price", "op": "<", "value": 20, "message": "price too high ({value})"},
+    ]))
+    rules = compile_rules(load_rules(str(path)))
+
+    mask, codes = rules.evaluate_frame({"price": [10.0, 30.0, None]})
+    assert mask.tolist() == [True, False, False]
+    assert [rules.labels[c] for c in codes] == ["passed", "price too high", "missing price"]
+
+
+def test_stage_stats_reorder_sources_by_conditional_rates():
+    # Last runs went quote -> technicals -> fundamentals, so fundamentals only saw 200 survivors
+    stats = {
+        "screener payload": {"checked": 1000, "rejected": 0},
+        "quote": {"checked": 1000, "rejected": 100},
+        "technicals": {"checked": 900, "rejected": 700},
+        "fundamentals": {"checked": 200, "rejected": 50},
+    }
+    rules = compile_rules(DEFAULT_RULES, use_optional_filters=True)
+
+    rates = rules.reject_rates(stats)
+    assert rates == {"quote": 0.1, "technicals": 700 / 900, "fundamentals": 0.25}
+    assert order_sources(rates) == ["fundamentals", "quote", "technicals"]
+    # Shares of all 1000 screened symbols would have kept quote ahead of fundamentals
+    unconditional = {source: stats[source]["rejected"] / 1000 for source in rates}
+    assert order_sources(unconditional) == ["quote", "fundamentals", "technicals"]
+    assert compile_rules(DEFAULT_RULES, True, stage_stats=stats).sources == ["fundamentals", "quote", "technicals"]
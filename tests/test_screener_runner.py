@@ -0,0 +1,169 @@
+import pytest
+from unittest.mock import patch
+from runner.screener_runner import run_screener
+
+STOCKS = [
+    {"symbol": "AAPL", "companyName": "Apple Inc.", "price": 190.0},
+    {"symbol": "MSFT", "companyName": "Microsoft Corp.", "price": 410.0},
+    {"symbol": "BAD", "companyName": "No Data Inc.", "price": 5.0},
+]
+
+INDICATORS = {
+    "AAPL": {"rsi14": 60.0, "ema20": 185.0, "ema50": 180.0, "vwap": 188.0},
+    "MSFT": {"rsi14": 75.0, "ema20": 400.0, "ema50": 395.0, "vwap": 405.0},
+    "BAD": None,
+}
+
+
+@pytest.fixture
+def mocked_runner():
+    with patch("runner.screener_runner.fetch_core_screener", return_value=STOCKS), \
+         patch("runner.screener_runner.fetch_quotes_batch", return_value={}) as quotes, \
+         patch("runner.screener_runner.load_indicator_states", return_value={}), \
+         patch("runner.screener_runner.upsert_indicator_states"), \
+         patch("runner.screener_runner.fetch_technicals_incremental",
+               side_effect=lambda symbol, state: (INDICATORS[symbol], None)), \
+         patch("runner.screener_runner.WriteBehindBuffer") as buffer, \
+         patch("runner.screener_runner.maintain_partitions"), \
+         patch("runner.screener_runner.seed_fundamentals"), \
+         patch("runner.screener_runner.load_stage_stats", return_value={}), \
+         patch("runner.screener_runner.save_rule_stage_stats"), \
+         patch("runner.screener_runner.export_screener_results_to_excel"), \
+         patch("runner.screener_runner.save_run_and_results") as save, \
+         patch("runner.screener_runner.time.sleep"):
+        yield save, quotes, buffer
+
+
+@pytest.mark.parametrize("execution", ["threads", "async"])
+def test_run_screener_execution_modes_agree(mocked_runner, execution):
+    save, quotes, buffer = mocked_runner
+
+    run_screener(limit=3, execution=execution)
+
+    assert buffer.return_value.add_screener_result.call_count == 2
+    buffer.return_value.close.assert_called_once()
+
+    rows = {row["symbol"]: row for row in save.call_args[0][0]}
+    assert set(rows) == {"AAPL", "MSFT"}  # BAD has no technical data
+    assert rows["AAPL"]["is_bullish"] is True
+    assert rows["MSFT"]["is_bullish"] is False
+    assert "RSI not in range" in rows["MSFT"]["failure_reason"]
+
+
+def test_run_screener_async_fetches_quotes_once(mocked_runner):
+    save, quotes, buffer = mocked_runner
+    run_screener(limit=3, execution="async")
+    quotes.assert_called_once_with(["AAPL", "MSFT", "BAD"])
+
+
+@pytest.mark.parametrize("execution", ["threads", "async"])
+def test_data_fetched_only_for_symbols_still_passing(mocked_runner, execution):
+    save, quotes, buffer = mocked_runner
+    quotes.return_value = {
+        "AAPL": {"price": 190.0, "changesPercentage": 2.0},
+        "MSFT": {"price": 410.0, "changesPercentage": 2.0},
+        "BAD": {"price": 5.0, "changesPercentage": 0.1},
+    }
+    fundamentals = {
+        "AAPL": {"beta": 1.2, "market_cap": 3_000_000_000_000},
+        "MSFT": {"beta": 0.9, "market_cap": 3_000_000_000_000},
+    }
+
+    with patch("runner.screener_runner.get_fundamentals_batch", return_value=fundamentals) as fetch, \
+         patch("runner.screener_runner.fetch_technicals_incremental",
+               side_effect=lambda symbol, state: (INDICATORS[symbol], None)) as technicals:
+        run_screener(limit=3, use_optional_filters=True, execution=execution)
+
+    # Stages run quote -> fundamentals -> technicals: BAD fails pre-market from the
+    # quote, MSFT fails beta, so only AAPL needs a per-symbol bar download
+    fetch.assert_called_once_with(["AAPL", "MSFT"])
+    assert [c.args[0] for c in technicals.call_args_list] == ["AAPL"]
+    rows = {row["symbol"]: row for row in save.call_args[0][0]}
+    assert rows["AAPL"]["is_bullish"] is True
+    assert "beta too low" in rows["MSFT"]["failure_reason"]
+    assert "pre-market change too low" in rows["BAD"]["failure_reason"]
+    assert rows["BAD"]["rsi14"] is None
+
+
+def test_learned_rejection_rates_reorder_stages(mocked_runner):
+    save, quotes, buffer = mocked_runner
+    # Technical rules rejected nearly everything that reached them recently, fundamentals almost nothing
+    stats = {
+        "quote": {"checked": 1000, "rejected": 10},
+        "fundamentals": {"checked": 990, "rejected": 1},
+        "technicals": {"checked": 989, "rejected": 900},
+    }
+
+    with patch("runner.screener_runner.load_stage_stats", return_value=stats), \
+         patch("runner.screener_runner.get_fundamentals_batch", return_value={}) as fetch:
+        quotes.return_value = {s: {"changesPercentage": 2.0} for s in ("AAPL", "MSFT", "BAD")}
+        run_screener(limit=3, use_optional_filters=True)
+
+    # Technicals now run before fundamentals, so MSFT (RSI 75) never reaches them
+    fetch.assert_called_once_with(["AAPL"])
+
+
+def test_stage_counts_saved_for_the_next_run(mocked_runner):
+    save, quotes, buffer = mocked_runner
+    with patch("runner.screener_runner.save_rule_stage_stats") as save_stats:
+        run_screener(limit=3)
+
+    run_timestamp, stage_stats, run_kind = save_stats.call_args[0]
+    assert run_timestamp == save.call_args[0][1]
+    assert run_kind == "scan"
+    assert stage_stats["technicals"] == {"checked": 3, "rejected": 2}  # MSFT on RSI, BAD without bars
+
+
+def test_watchlist_runs_do_not_learn_from_scan_stats(mocked_runner):
+    save, quotes, buffer = mocked_runner
+    stored = {}  # run kind -> stage stats, standing in for rule_stage_stats
+    stocks = [
+        {"symbol": "AAPL", "companyName": "Apple Inc.", "price": 190.0, "beta": 1.2, "marketCap": 3_000_000_000_000},
+        {"symbol": "MSFT", "companyName": "Microsoft Corp.", "price": 410.0, "beta": 0.9, "marketCap": 3_000_000_000_000},
+        {"symbol": "NVDA", "companyName": "NVIDIA Corp.", "price": 120.0, "beta": 1.5, "marketCap": 3_000_000_000_000},
+    ]
+    fundamentals = {s["symbol"]: {"beta": s["beta"], "market_cap": s["marketCap"]} for s in stocks}
+    indicators = dict(INDICATORS, NVDA={"rsi14": 75.0, "ema20": 118.0, "ema50": 115.0, "vwap": 119.0})
+    quotes.return_value = {s["symbol"]: {"price": s["price"], "changesPercentage": 2.0} for s in stocks}
+
+    with patch("runner.screener_runner.load_stage_stats", side_effect=lambda days, kind: stored.get(kind, {})) as load, \
+         patch("runner.screener_runner.save_rule_stage_stats",
+               side_effect=lambda ts, stats, kind: stored.setdefault(kind, stats)), \
+         patch("runner.screener_runner.fetch_core_screener", return_value=stocks), \
+         patch("runner.screener_runner.get_fundamentals_batch",
+               side_effect=lambda symbols: {s: fundamentals[s] for s in symbols}), \
+         patch("db.reader.load_watchlist_metadata", return_value={}), \
+         patch("runner.screener_runner.fetch_technicals_incremental",
+               side_effect=lambda symbol, state: (indicators[symbol], None)) as technicals:
+        # The payload pre-filter takes MSFT's low beta, so the scan's fundamentals stage rejects nothing
+        run_screener(limit=3, use_optional_filters=True)
+        assert stored["scan"]["screener payload"]["rejected"] == 1
+        assert stored["scan"]["fundamentals"]["rejected"] == 0
+        technicals.reset_mock()
+
+        run_screener(use_optional_filters=True, watchlist_symbols=["MSFT", "NVDA"])
+
+    # Without the pre-filter the batched fundamentals stage still runs before per-symbol bars
+    assert [c.args[0] for c in technicals.call_args_list] == ["NVDA"]
+    assert [c.args[1] for c in load.call_args_list] == ["scan", "watchlist"]
+    assert "watchlist" in stored
+
+
+def test_screener_payload_prefilter_skips_enrichment(mocked_runner):
+    save, quotes, buffer = mocked_runner
+    stocks = [
+        {"symbol": "AAPL", "companyName": "Apple Inc.", "price": 190.0, "beta": 1.2, "marketCap": 3_000_000_000_000},
+        {"symbol": "TINY", "companyName": "Tiny Co.", "price": 3.0, "beta": 1.5, "marketCap": 50_000_000},
+        {"symbol": "MSFT", "companyName": "Microsoft Corp.", "price": 410.0},  # no beta in payload
+    ]
+    quotes.return_value = {"AAPL": {"changesPercentage": 2.0}, "MSFT": {"changesPercentage": 2.0}}
+
+    with patch("runner.screener_runner.fetch_core_screener", return_value=stocks), \
+         patch("runner.screener_runner.get_fundamentals_batch", return_value={}):
+        run_screener(limit=3, use_optional_filters=True)
+
+    # TINY is decided by its payload alone: no quote, fundamentals or bars fetched for it
+    quotes.assert_called_once_with(["AAPL", "MSFT"])
+    rows = {row["symbol"]: row for row in save.call_args[0][0]}
+    assert rows["TINY"]["is_bullish"] is False
+    assert rows["TINY"]["failure_reason"] == "TINY: market cap too small (50000000)"
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+from db.setup_schema import apply_migrations, check_query_plans, seq_scans
+
+MIGRATIONS = [
+    (1, "first", "CREATE TABLE a ();"),
+    (2, "second", "CREATE TABLE b ();"),
+]
+
+@patch("db.setup_schema.connection")
+def test_apply_migrations_skips_applied_versions(mock_connection):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchall.return_value = [(1,)]
+
+    applied = apply_migrations(MIGRATIONS)
+
+    assert applied == [2]
+    statements = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    assert "CREATE TABLE b ();" in statements
+    assert "CREATE TABLE a ();" not in statements
+    assert any("pg_advisory_xact_lock" in s for s in statements)
+
+def test_seq_scans_walks_nested_plans():
+    plan = {
+        "Node Type": "Limit",
+        "Plans": [{
+            "Node Type": "Nested Loop",
+            "Plans": [
+                {"Node Type": "Index Only Scan", "Relation Name": "screener_run"},
+                {"Node Type": "Seq Scan", "Relation Name": "stock_result"},
+            ],
+        }],
+    }
+    assert seq_scans(plan) == ["stock_result"]
+
+@patch("db.setup_schema.connection")
+def test_check_query_plans_reports_offenders(mock_connection):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchone.side_effect = [
+        ([{"Plan": {"Node Type": "Index Scan", "Relation Name": "screener_run"}}],),
+        ('[{"Plan": {"Node Type": "Seq Scan", "Relation Name": "watchlist_cache"}}]',),
+    ]
+
+    offenders = check_query_plans([("fast", "SELECT 1", None), ("slow", "SELECT 2;", None)])
+
+    assert offenders == {"slow": ["watchlist_cache"]}
+    assert mock_cursor.execute.call_args_list[0].args[0] == "SET LOCAL enable_seqscan = off"
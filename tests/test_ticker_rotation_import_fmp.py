@@ -28,3 +28,23 @@ def test_import_tickers_from_fmp(mock_fetch_core, mock_get_conn):
     mock_conn.commit.assert_called_once()
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
+
+
+@patch("db.ticker_rotation_import_fmp.connection")
+@patch("db.ticker_rotation_import_fmp.fetch_core_screener")
+def test_bulk_import_tickers_from_fmp(mock_fetch_core, mock_connection):
+    mock_cursor = mock_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    staged = []
+    mock_cursor.copy_expert.side_effect = lambda sql, buf: staged.extend(buf.read().split())
+    mock_cursor.rowcount = 2  # rows added by the merge statement
+
+    mock_fetch_core.return_value = [
+        {"symbol": "AAPL"}, {"symbol": "msft "}, {"symbol": "AAPL"}, {"symbol": ""}, {},
+    ]
+
+    inserted, skipped = import_tickers_from_fmp(limit=5, bulk=True)
+
+    assert staged == ["AAPL", "MSFT", "AAPL"]
+    merge_sql = mock_cursor.execute.call_args_list[-1][0][0]
+    assert "SELECT DISTINCT symbol FROM tmp_symbol_import" in merge_sql
+    assert (inserted, skipped) == (2, 1)
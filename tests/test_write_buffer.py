@@ -0,0 +1,51 @@
+import time
+from datetime import datetime
+from unittest.mock import patch
+from db.write_buffer import WriteBehindBuffer
+
+TS = datetime(2025, 7, 7, 14, 0)
+
+
+def row(symbol, price):
+    return {"symbol": symbol, "price": price, "timestamp": TS}
+
+
+@patch("db.write_buffer.bulk_upsert_premarket_cache")
+@patch("db.write_buffer.bulk_upsert_screener_cache")
+def test_flushes_when_size_reached(mock_screener, mock_premarket):
+    buffer = WriteBehindBuffer(flush_size=3, flush_interval=60)
+    for i in range(3):
+        buffer.add_screener_result(row(f"S{i}", i))
+
+    deadline = time.time() + 2
+    while not mock_screener.called and time.time() < deadline:
+        time.sleep(0.01)
+    buffer.close()
+
+    assert len(mock_screener.call_args_list[0][0][0]) == 3
+    assert buffer.stats["flushes"] == 1
+
+
+@patch("db.write_buffer.bulk_upsert_premarket_cache")
+@patch("db.write_buffer.bulk_upsert_screener_cache")
+def test_close_flushes_remaining_and_dedupes_by_key(mock_screener, mock_premarket):
+    buffer = WriteBehindBuffer(flush_size=100, flush_interval=60)
+    buffer.add_screener_result(row("AAPL", 1.0))
+    buffer.add_screener_result(row("AAPL", 2.0))
+    buffer.add_premarket_change("AAPL", 1.5)
+    buffer.close()
+
+    rows = mock_screener.call_args[0][0]
+    assert [r["price"] for r in rows] == [2.0]
+    mock_premarket.assert_called_once_with({"AAPL": 1.5})
+
+
+@patch("db.write_buffer.bulk_upsert_premarket_cache")
+@patch("db.write_buffer.bulk_upsert_screener_cache")
+def test_flushes_on_interval(mock_screener, mock_premarket):
+    buffer = WriteBehindBuffer(flush_size=100, flush_interval=0.05)
+    buffer.add_screener_result(row("MSFT", 1.0))
+    time.sleep(0.3)
+    assert mock_screener.called
+    buffer.close()
+    assert buffer.stats["rows"] == 1
@@ -3,12 +3,11 @@ from unittest.mock import patch, MagicMock
 from db.writer import save_run_and_results
 from datetime import datetime
 
-@patch("db.writer.get_connection")
-@patch("db.writer.execute_values")
-def test_save_run_and_results(mock_execute_values, mock_get_conn):
-    mock_conn = MagicMock()
+@patch("db.writer.connection")
+@patch("db.bulk.execute_values")
+def test_save_run_and_results(mock_execute_values, mock_connection):
+    mock_conn = mock_connection.return_value.__enter__.return_value
     mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
-    mock_get_conn.return_value = mock_conn
     mock_cursor.fetchone.return_value = [123]  # Simulate RETURNING run_id
 
     rows = [
@@ -38,4 +37,4 @@ def test_save_run_and_results(mock_execute_values, mock_get_conn):
     assert len(args[2]) == 1  # One row
     assert args[2][0][1] == "AAPL"
 
-    mock_conn.close.assert_called_once()
+    mock_connection.return_value.__exit__.assert_called_once()
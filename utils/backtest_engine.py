@@ -0,0 +1,296 @@
+# utils/backtest_engine.py
+"""
+Vectorized trade simulation: one row per signal, one column per bar after entry.
+
+Given a close matrix (NaN-padded past each path's end) and the entry prices,
+every signal's exit is found at once: the first bar where the return crosses
+the target or the stop, else the last available bar. Same rules as
+backtester.simulate_trade(), which stays as the per-signal reference.
+Intraday runs use simulate_bars(), which checks each 15-minute bar's high and
+low instead of its close.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config.settings import BACKTEST_CHUNK_ROWS
+
+WIN, LOSS, NEUTRAL = "win", "loss", "neutral"
+
+
+def build_price_matrix(paths, max_bars):
+    """
+    Stack per-signal price paths into (n, max_bars) arrays.
+
+    Args:
+        paths (list[pd.DataFrame]): date/close frames, oldest first, one per signal.
+
+    Returns:
+        (closes, dates): float64 closes padded with NaN and datetime64[s] dates padded with NaT.
+    """
+    closes = np.full((len(paths), max_bars), np.nan)
+    dates = np.full((len(paths), max_bars), np.datetime64("NaT"), dtype="datetime64[s]")
+    for i, path in enumerate(paths):
+        n = min(len(path), max_bars)
+        closes[i, :n] = path["close"].to_numpy(dtype="float64")[:n]
+        dates[i, :n] = pd.to_datetime(path["date"]).to_numpy(dtype="datetime64[s]")[:n]
+    return closes, dates
+
+
+def cooldown_mask(symbols, times, cooldown):
+    """
+    Keep a symbol's signal only if it comes at least `cooldown` (np.timedelta64)
+    after that symbol's previous kept signal. One searchsorted jump per kept
+    signal, so a symbol bullish on every scan costs a handful of steps.
+    """
+    symbols = np.asarray(symbols, dtype=object)
+    times = pd.to_datetime(pd.Series(times), utc=True).to_numpy()
+    keep = np.zeros(len(symbols), dtype=bool)
+    for idx in pd.Series(symbols).groupby(symbols, sort=False).indices.values():
+        order = idx[np.argsort(times[idx], kind="stable")]
+        symbol_times = times[order]
+        i = 0
+        while i < len(order):
+            keep[order[i]] = True
+            i = max(i + 1, np.searchsorted(symbol_times, symbol_times[i] + cooldown, side="left"))
+    return keep
+
+
+def simulate_trades(closes, buy_prices, target_pct=0.05, stop_loss_pct=-0.03, dates=None):
+    """
+    Exit every signal on its first target/stop crossing, or on its last bar.
+
+    Args:
+        closes (np.ndarray): (n, bars) closes after entry, NaN-padded.
+        buy_prices (np.ndarray): (n,) entry prices.
+        dates (np.ndarray): Optional (n, bars) datetime64 matrix for exit dates
+            and calendar holding days.
+
+    Returns:
+        dict of (n,) arrays: exit_index, sell_price, gain_pct, result, plus
+        sell_date and holding_days when `dates` is given. Rows without a
+        single bar get exit_index -1 and a NaN gain.
+    """
+    closes = np.asarray(closes, dtype="float64")
+    buy_prices = np.asarray(buy_prices, dtype="float64")
+    n = len(closes)
+    rows = np.arange(n)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change = closes / buy_prices[:, None] - 1
+        hit_target = change >= target_pct
+        hit = hit_target | (change <= stop_loss_pct)  # NaN padding never hits
+
+    any_hit = hit.any(axis=1)
+    first_hit = hit.argmax(axis=1)
+    valid = ~np.isnan(closes)
+    last_bar = valid.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+    has_bars = valid.any(axis=1)
+
+    exit_index = np.where(any_hit, first_hit, np.where(has_bars, last_bar, -1))
+    safe_index = np.maximum(exit_index, 0)
+    result = np.where(any_hit, np.where(hit_target[rows, safe_index], WIN, LOSS), NEUTRAL)
+
+    out = {
+        "exit_index": exit_index,
+        "sell_price": np.where(has_bars, closes[rows, safe_index], np.nan),
+        "gain_pct": np.where(has_bars, change[rows, safe_index], np.nan),
+        "result": result.astype(object),
+    }
+    if dates is not None:
+        sell_date = np.where(has_bars, dates[rows, safe_index], np.datetime64("NaT"))
+        out["sell_date"] = sell_date
+        out["holding_days"] = (sell_date.astype("datetime64[D]") - dates[:, 0].astype("datetime64[D]")).astype("int64")
+    return out
+
+
+def _simulate_chunk(args):
+    func, arrays, params = args
+    return func(**arrays, **params)
+
+
+def _run_chunked(func, arrays, params, workers, chunk_rows):
+    """func(**arrays, **params) over row chunks of `arrays` in a process pool, concatenated in order."""
+    n = len(next(iter(arrays.values())))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or n <= chunk_rows:
+        return func(**arrays, **params)
+
+    chunks = [
+        (func, {key: None if value is None else value[i:i + chunk_rows] for key, value in arrays.items()}, params)
+        for i in range(0, n, chunk_rows)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(_simulate_chunk, chunks))
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+def simulate_trades_parallel(closes, buy_prices, target_pct=0.05, stop_loss_pct=-0.03, dates=None, workers=None, chunk_rows=BACKTEST_CHUNK_ROWS):
+    """
+    simulate_trades() split into row chunks over a process pool; for signal sets
+    large enough that one core is the bottleneck. Results are concatenated in order.
+    """
+    return _run_chunked(
+        simulate_trades,
+        {"closes": closes, "buy_prices": buy_prices, "dates": dates},
+        {"target_pct": target_pct, "stop_loss_pct": stop_loss_pct},
+        workers, chunk_rows,
+    )
+
+
+# --- Intraday bars ------------------------------------------------------------
+
+def build_bar_matrices(paths, max_bars):
+    """
+    Stack per-signal OHLC paths into (n, max_bars) arrays.
+
+    Args:
+        paths (list[pd.DataFrame]): date/open/high/low/close frames, oldest first.
+
+    Returns:
+        dict: open, high, low, close (NaN-padded) and times (datetime64[s] UTC, NaT-padded).
+    """
+    bars = {field: np.full((len(paths), max_bars), np.nan) for field in ("open", "high", "low", "close")}
+    times = np.full((len(paths), max_bars), np.datetime64("NaT"), dtype="datetime64[s]")
+    for i, path in enumerate(paths):
+        n = min(len(path), max_bars)
+        for field, matrix in bars.items():
+            matrix[i, :n] = path[field].to_numpy(dtype="float64")[:n]
+        times[i, :n] = pd.to_datetime(path["date"], utc=True).dt.tz_localize(None).to_numpy(dtype="datetime64[s]")[:n]
+    return {**bars, "times": times}
+
+
+def simulate_bars(opens, highs, lows, closes, buy_prices, target_pct=0.05, stop_loss_pct=-0.03, times=None):
+    """
+    Exit every signal on the first bar whose high reaches the target or whose
+    low reaches the stop, else on the last bar's close.
+
+    The target fills at the target price and the stop at the stop price, or at
+    the bar's open when it gaps through the level. When one bar reaches both,
+    the order inside the bar is unknown and the stop is assumed to come first.
+
+    Returns:
+        dict of (n,) arrays like simulate_trades(): exit_index, sell_price,
+        gain_pct, result, plus sell_time when `times` is given.
+    """
+    buy_prices = np.asarray(buy_prices, dtype="float64")
+    n = len(closes)
+    rows = np.arange(n)
+    target_price = (buy_prices * (1 + target_pct))[:, None]
+    stop_price = (buy_prices * (1 + stop_loss_pct))[:, None]
+
+    with np.errstate(invalid="ignore"):
+        hit_stop = lows <= stop_price
+        hit = hit_stop | (highs >= target_price)  # NaN padding never hits
+
+    any_hit = hit.any(axis=1)
+    first_hit = hit.argmax(axis=1)
+    valid = ~np.isnan(closes)
+    last_bar = valid.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+    has_bars = valid.any(axis=1)
+
+    exit_index = np.where(any_hit, first_hit, np.where(has_bars, last_bar, -1))
+    safe_index = np.maximum(exit_index, 0)
+    stopped = any_hit & hit_stop[rows, safe_index]
+    exit_open = opens[rows, safe_index]
+    # A gap through the level fills at the open; fmin/fmax ignore a missing open
+    stop_fill = np.fmin(stop_price[:, 0], exit_open)
+    target_fill = np.fmax(target_price[:, 0], exit_open)
+
+    sell_price = np.where(stopped, stop_fill, np.where(any_hit, target_fill, closes[rows, safe_index]))
+    sell_price = np.where(has_bars, sell_price, np.nan)
+    result = np.where(stopped, LOSS, np.where(any_hit, WIN, NEUTRAL))
+
+    out = {
+        "exit_index": exit_index,
+        "sell_price": sell_price,
+        "gain_pct": sell_price / buy_prices - 1,
+        "result": result.astype(object),
+    }
+    if times is not None:
+        out["sell_time"] = np.where(has_bars, times[rows, safe_index], np.datetime64("NaT"))
+    return out
+
+
+def simulate_bars_parallel(bars, buy_prices, target_pct=0.05, stop_loss_pct=-0.03, workers=None, chunk_rows=BACKTEST_CHUNK_ROWS):
+    """simulate_bars() on build_bar_matrices() output, chunked over a process pool like simulate_trades_parallel()."""
+    return _run_chunked(
+        simulate_bars,
+        {"opens": bars["open"], "highs": bars["high"], "lows": bars["low"], "closes": bars["close"],
+         "buy_prices": buy_prices, "times": bars.get("times")},
+        {"target_pct": target_pct, "stop_loss_pct": stop_loss_pct},
+        workers, chunk_rows,
+    )
+
+
+# --- Parameter sweeps ---------------------------------------------------------
+
+SWEEP_COLUMNS = [
+    "hold_days", "target_pct", "stop_loss_pct", "rsi_min", "rsi_max",
+    "trades", "win_rate", "loss_rate", "avg_win", "avg_loss", "expectancy", "total_gain",
+]
+
+# Set once per sweep process so the matrices are not pickled with every combination
+_sweep_data = None
+
+
+def _init_sweep(closes, buy_prices, rsi):
+    global _sweep_data
+    _sweep_data = (closes, buy_prices, rsi)
+
+
+def summarize_trades(sim):
+    """Win/loss rates, average win/loss and expectancy (mean gain per trade) of one simulation."""
+    gains = sim["gain_pct"][sim["exit_index"] >= 0]
+    results = sim["result"][sim["exit_index"] >= 0]
+    trades = len(gains)
+    wins, losses = gains[results == WIN], gains[results == LOSS]
+    return {
+        "trades": trades,
+        "win_rate": len(wins) / trades if trades else np.nan,
+        "loss_rate": len(losses) / trades if trades else np.nan,
+        "avg_win": wins.mean() if len(wins) else np.nan,
+        "avg_loss": losses.mean() if len(losses) else np.nan,
+        "expectancy": gains.mean() if trades else np.nan,
+        "total_gain": gains.sum(),
+    }
+
+
+def _sweep_one(combo):
+    closes, buy_prices, rsi = _sweep_data
+    keep = np.ones(len(closes), dtype=bool)
+    if combo.get("rsi_min") is not None:
+        keep &= rsi >= combo["rsi_min"]
+    if combo.get("rsi_max") is not None:
+        keep &= rsi <= combo["rsi_max"]
+    sim = simulate_trades(closes[keep, :combo["hold_days"]], buy_prices[keep], combo["target_pct"], combo["stop_loss_pct"])
+    return {**combo, **summarize_trades(sim)}
+
+
+def sweep(closes, buy_prices, combos, rsi=None, workers=None):
+    """
+    Evaluate every parameter combination on the same signals.
+
+    Args:
+        closes (np.ndarray): (n, bars) closes after entry, at least max(hold_days) bars wide.
+        buy_prices (np.ndarray): (n,) entry prices.
+        combos (list[dict]): hold_days, target_pct, stop_loss_pct and optional
+            rsi_min/rsi_max bounds on the signal's RSI.
+        rsi (np.ndarray): (n,) RSI at signal time; required for RSI bounds.
+
+    Returns:
+        pd.DataFrame: One row per combination (SWEEP_COLUMNS), best expectancy first.
+    """
+    rsi = np.full(len(closes), np.nan) if rsi is None else np.asarray(rsi, dtype="float64")
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(combos) <= 1:
+        _init_sweep(closes, buy_prices, rsi)
+        rows = [_sweep_one(combo) for combo in combos]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep, initargs=(closes, buy_prices, rsi)) as executor:
+            rows = list(executor.map(_sweep_one, combos, chunksize=max(1, len(combos) // (workers * 4))))
+
+    table = pd.DataFrame(rows).reindex(columns=SWEEP_COLUMNS)
+    return table.sort_values("expectancy", ascending=False, na_position="last").reset_index(drop=True)
@@ -3,6 +3,7 @@ import pandas as pd
 from openpyxl.styles import PatternFill, Font
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from utils.logger import setup_logger
 from emailer.notify import send_email_with_attachment
 from datetime import datetime
@@ -86,38 +87,75 @@ def export_screener_results_to_excel(rows, run_timestamp):
     except Exception as e:
         logger.error(f"Failed to send email notification: {e}")
 
-def export_backtest_results_to_excel(results, run_timestamp):
-    os.makedirs("output/backtest_results", exist_ok=True)
+BACKTEST_EXPORT_COLUMNS = [
+    "symbol", "signal_date", "buy_price", "sell_price",
+    "sell_date", "gain_pct", "holding_days", "result", "company_name"
+]
 
-    df = pd.DataFrame(results, columns=[
-        "symbol", "signal_date", "buy_price", "sell_price",
-        "sell_date", "gain_pct", "holding_days", "result"
-    ])
+def export_backtest_results_to_excel(results, run_timestamp):
+    return export_backtest_result_chunks([results], run_timestamp)
+
+def export_backtest_result_chunks(chunks, run_timestamp):
+    """
+    Write backtest result tuples (BACKTEST_EXPORT_COLUMNS) as they arrive, one
+    list per chunk, with a write-only workbook so memory stays flat however
+    many results there are. Returns the number of rows written.
+    """
+    os.makedirs("output/screener_results", exist_ok=True)
 
     # run_timestamp_naive = run_timestamp.replace(tzinfo=None) if run_timestamp.tzinfo else run_timestamp
     # filename = f"output/backtest_results/backtest_results_{run_timestamp_naive.strftime('%Y-%m-%d_%H%M')}.xlsx"
     run_timestamp_et = run_timestamp.astimezone(ET).replace(tzinfo=None)
     filename = f"output/screener_results/backtest_results_{run_timestamp_et.strftime('%Y-%m-%d_%H%M')}.xlsx"
 
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Backtest Results")
+    fills = {
+        "win": PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid"),
+        "loss": PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"),
+    }
+
+    def styled(value, font=None, fill=None):
+        cell = WriteOnlyCell(ws, value=value)
+        if font:
+            cell.font = font
+        if fill:
+            cell.fill = fill
+        return cell
+
+    ws.append([styled(name, font=Font(bold=True)) for name in BACKTEST_EXPORT_COLUMNS])
+    written = 0
+    for results in chunks:
+        for row in results:
+            fill = fills.get(row[7])
+            ws.append([styled(value, fill=fill) for value in row] if fill else list(row))
+        written += len(results)
+
+    try:
+        wb.save(filename)
+        logger.info(f"Exported {written} backtest results to Excel: {filename}")
+    except Exception as e:
+        logger.error(f"Failed to save backtest Excel file: {e}")
+    return written
+
+def export_sweep_results(table, run_timestamp):
+    """Parameter-sweep table (backtester.run_sweep), already ranked by expectancy."""
+    os.makedirs("output/screener_results", exist_ok=True)
+    run_timestamp_et = run_timestamp.astimezone(ET).replace(tzinfo=None)
+    filename = f"output/screener_results/backtest_sweep_{run_timestamp_et.strftime('%Y-%m-%d_%H%M')}.xlsx"
 
     wb = Workbook()
     ws = wb.active
-    ws.title = "Backtest Results"
-
-    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), start=1):
+    ws.title = "Backtest Sweep"
+    table = table.round(4).astype(object).where(table.notna(), None)  # empty cells, not NaN
+    for r_idx, row in enumerate(dataframe_to_rows(table, index=False, header=True), start=1):
         ws.append(row)
         if r_idx == 1:
             for cell in ws[r_idx]:
                 cell.font = Font(bold=True)
-            continue
-        result = df.loc[r_idx - 2, "result"]
-        fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid") if result == 'win' else                PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid") if result == 'loss' else None
-        if fill:
-            for cell in ws[r_idx]:
-                cell.fill = fill
 
     try:
         wb.save(filename)
-        logger.info(f"Exported backtest results to Excel: {filename}")
+        logger.info(f"Exported backtest sweep to Excel: {filename}")
     except Exception as e:
-        logger.error(f"Failed to save backtest Excel file: {e}")
\ No newline at end of file
+        logger.error(f"Failed to save backtest sweep Excel file: {e}")
@@ -1,99 +1,99 @@
+import pandas as pd
+
 from utils.logger import setup_logger
+from utils.rules import SCAN_FIELDS, compile_rules, get_ruleset, load_rules
 
 logger = setup_logger()
 
+_optional_rules = None
+
+def scan_values(price, indicators=None, fundamentals=None, pre_market_change_pct=None):
+    """Flat field -> value dict the screening rules read (see utils/rules.FIELD_SOURCES)."""
+    indicators = indicators or {}
+    fundamentals = fundamentals or {}
+    return {
+        "price": price,
+        "vwap": indicators.get("vwap"),
+        "ema20": indicators.get("ema20"),
+        "ema50": indicators.get("ema50"),
+        "rsi14": indicators.get("rsi14"),
+        "beta": fundamentals.get("beta"),
+        "market_cap": fundamentals.get("market_cap"),
+        "pre_market_change_pct": pre_market_change_pct,
+    }
+
 def apply_optional_filters(price, fundamentals, pre_market_change_pct, logger=None, symbol=None, reasons=None):
-    try:
-        if fundamentals.get("beta") is None:
-            msg = f"{symbol}: missing beta"
-            if logger: logger.info(msg)
-            if reasons is not None: reasons.append(msg)
-            return False
-        if fundamentals.get("market_cap") is None:
-            msg = f"{symbol}: missing market cap"
-            if logger: logger.info(msg)
-            if reasons is not None: reasons.append(msg)
-            return False
-        if pre_market_change_pct is None:
-            msg = f"{symbol}: missing pre-market change %"
-            if logger: logger.info(msg)
-            if reasons is not None: reasons.append(msg)
-            return False
-
-        if fundamentals["beta"] <= 1:
-            msg = f"{symbol}: beta too low ({fundamentals['beta']})"
-            if logger: logger.info(msg)
-            if reasons is not None: reasons.append(msg)
-            return False
-        if fundamentals["market_cap"] < 2_000_000_000:
-            msg = f"{symbol}: market cap too small ({fundamentals['market_cap']})"
-            if logger: logger.info(msg)
-            if reasons is not None: reasons.append(msg)
-            return False
-        if pre_market_change_pct <= 1:
-            msg = f"{symbol}: pre-market change too low ({pre_market_change_pct})"
-            if logger: logger.info(msg)
-            if reasons is not None: reasons.append(msg)
-            return False
-
-        return True
-    except Exception as e:
-        msg = f"Optional filter error for {symbol}: {e}"
-        if logger: logger.error(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-    
+    global _optional_rules
+    if _optional_rules is None:
+        _optional_rules = compile_rules([r for r in load_rules() if r.get("optional")], use_optional_filters=True)
+    values = scan_values(price, None, fundamentals, pre_market_change_pct)
+    return _optional_rules.evaluate(values, symbol=symbol, reasons=reasons, logger=logger)
+
 def is_bullish(price, indicators, fundamentals=None, pre_market_change_pct=None, use_optional_filters=False, logger=None, symbol=None, reasons=None):
-    if use_optional_filters:
-        if not apply_optional_filters(price, fundamentals or {}, pre_market_change_pct, logger, symbol, reasons):
-            return False
-
-    if indicators is None:
-        msg = f"{symbol}: missing indicators"
-        if logger: logger.info(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-
-    vwap = indicators.get("vwap")
-    ema20 = indicators.get("ema20")
-    ema50 = indicators.get("ema50")
-    rsi = indicators.get("rsi14")
-
-    if vwap is None:
-        msg = f"{symbol}: missing VWAP"
-        if logger: logger.info(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-    if ema20 is None:
-        msg = f"{symbol}: missing EMA20"
-        if logger: logger.info(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-    if ema50 is None:
-        msg = f"{symbol}: missing EMA50"
-        if logger: logger.info(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-    if rsi is None:
-        msg = f"{symbol}: missing RSI"
-        if logger: logger.info(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-
-    if not (price > vwap):
-        msg = f"{symbol}: price not above VWAP"
-        if logger: logger.info(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-    if not (ema20 > ema50):
-        msg = f"{symbol}: EMA20 not above EMA50"
-        if logger: logger.info(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-    if not (50 < rsi < 70):
-        msg = f"{symbol}: RSI not in range (50,70), actual: {rsi}"
-        if logger: logger.info(msg)
-        if reasons is not None: reasons.append(msg)
-        return False
-
-    return True
\ No newline at end of file
+    values = scan_values(price, indicators, fundamentals, pre_market_change_pct)
+    return get_ruleset(use_optional_filters).evaluate(values, symbol=symbol, reasons=reasons, logger=logger)
+
+
+# --- Vectorized evaluation ----------------------------------------------------
+
+def build_scan_frame(rows):
+    """
+    DataFrame for evaluate_bullish() from (price, indicators, fundamentals,
+    pre_market_change_pct) tuples, i.e. the arguments is_bullish() takes.
+    """
+    return pd.DataFrame.from_records([scan_values(*row) for row in rows], columns=SCAN_FIELDS)
+
+def evaluate_bullish(frame, use_optional_filters=False):
+    """
+    Vectorized is_bullish() over a whole scan.
+
+    Args:
+        frame (pd.DataFrame | dict): Columns named as in scan_values(); only the
+            ones the active rules read are required. None and NaN both count as missing.
+
+    Returns:
+        (mask, codes): Boolean array of bullish rows, and an int8 array with the
+        first failed check per row as an index into
+        get_ruleset(use_optional_filters).labels (0 = passed).
+    """
+    return get_ruleset(use_optional_filters).evaluate_frame(frame)
+
+
+# Fields the FMP /stock-screener payload already carries for every candidate
+SCREENER_PAYLOAD_FIELDS = ["price", "beta", "market_cap"]
+
+def screener_payload_values(stock):
+    """scan_values() from one /stock-screener row (price, beta, marketCap)."""
+    return scan_values(stock.get("price"), None, {"beta": stock.get("beta"), "market_cap": stock.get("marketCap")})
+
+def prefilter_screener_payload(stocks, ruleset):
+    """
+    Reject candidates on the rules the screener payload alone can decide, in one
+    vectorized pass, before any per-symbol data is fetched.
+
+    Only rows carrying every field those rules read are judged; the rest pass
+    through to the normal stages, which fetch what is missing.
+
+    Returns:
+        (survivors, rejected): The passing stock dicts, and (stock, reasons)
+        pairs with failure messages in is_bullish()'s format.
+    """
+    rules = ruleset.subset(SCREENER_PAYLOAD_FIELDS)
+    if not stocks or not rules.checks:
+        return list(stocks), []
+
+    values = [screener_payload_values(stock) for stock in stocks]
+    frame = pd.DataFrame.from_records(values, columns=SCAN_FIELDS)
+    mask, _ = rules.evaluate_frame(frame)
+    judged = frame[rules.fields()].notna().all(axis=1).to_numpy()
+
+    survivors, rejected = [], []
+    for stock, row_values, passed, complete in zip(stocks, values, mask, judged):
+        if passed or not complete:
+            survivors.append(stock)
+        else:
+            reasons = []
+            rules.evaluate(row_values, symbol=stock["symbol"], reasons=reasons)
+            rejected.append((stock, reasons))
+    return survivors, rejected
+
@@ -0,0 +1,162 @@
+# utils/indicators.py
+import numpy as np
+import pandas as pd
+
+RSI_PERIOD = 14
+EMA_FAST = 20
+EMA_SLOW = 50
+
+BAR_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+
+def ema(closes, span):
+    """Exponential moving average seeded with the first close (alpha = 2 / (span + 1))."""
+    return pd.Series(closes, dtype="float64").ewm(span=span, adjust=False).mean()
+
+
+def wilder_averages(closes, period=RSI_PERIOD):
+    """Average gain and average loss series, smoothed with alpha = 1 / period."""
+    delta = pd.Series(closes, dtype="float64").diff().iloc[1:]
+    avg_gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False).mean()
+    avg_loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, adjust=False).mean()
+    return avg_gain, avg_loss
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+    return (100 - 100 / (1 + rs)).where(avg_loss != 0, 100.0)
+
+
+def rsi(closes, period=RSI_PERIOD):
+    """Wilder RSI: gains and losses smoothed with alpha = 1 / period."""
+    return rsi_from_averages(*wilder_averages(closes, period))
+
+
+def session_vwap(bars):
+    """Volume-weighted typical price over the bars of the latest session in `bars`."""
+    dates = pd.to_datetime(bars["date"])
+    session = bars[dates.dt.date == dates.iloc[-1].date()]
+    volume = session["volume"].to_numpy(dtype="float64")
+    total_volume = volume.sum()
+    if total_volume <= 0:
+        return None
+    typical = (session[["high", "low", "close"]].to_numpy(dtype="float64")).mean(axis=1)
+    return float((typical * volume).sum() / total_volume)
+
+
+def compute_indicators(bars):
+    """
+    Compute the indicator dict `is_bullish` expects from intraday OHLCV bars.
+
+    Args:
+        bars (pd.DataFrame): Columns date/open/high/low/close/volume, oldest first.
+
+    Returns:
+        dict | None: {"rsi14", "ema20", "ema50", "vwap"}; an indicator is None when
+        there are not enough bars for it, and the whole result is None if all are.
+    """
+    if bars is None or bars.empty:
+        return None
+
+    closes = bars["close"].to_numpy(dtype="float64")
+    indicators = {
+        "rsi14": float(rsi(closes).iloc[-1]) if len(closes) > RSI_PERIOD else None,
+        "ema20": float(ema(closes, EMA_FAST).iloc[-1]) if len(closes) >= EMA_FAST else None,
+        "ema50": float(ema(closes, EMA_SLOW).iloc[-1]) if len(closes) >= EMA_SLOW else None,
+        "vwap": session_vwap(bars),
+    }
+    return None if all(v is None for v in indicators.values()) else indicators
+
+
+# --- Incremental state -------------------------------------------------------
+# A state dict carries everything needed to extend the indicators by new bars:
+#   ema20, ema50, avg_gain, avg_loss, last_close, session_date, cum_pv,
+#   cum_volume, last_bar_ts, bar_count
+
+
+def build_state(bars):
+    """Indicator state after ingesting all of `bars` (oldest first)."""
+    if bars is None or bars.empty:
+        return None
+
+    closes = bars["close"].to_numpy(dtype="float64")
+    dates = pd.to_datetime(bars["date"])
+    session_date = dates.iloc[-1].date()
+    session = bars[dates.dt.date == session_date]
+    volume = session["volume"].to_numpy(dtype="float64")
+    typical = session[["high", "low", "close"]].to_numpy(dtype="float64").mean(axis=1)
+
+    avg_gain, avg_loss = wilder_averages(closes)
+    return {
+        "ema20": float(ema(closes, EMA_FAST).iloc[-1]),
+        "ema50": float(ema(closes, EMA_SLOW).iloc[-1]),
+        "avg_gain": float(avg_gain.iloc[-1]) if len(closes) > 1 else None,
+        "avg_loss": float(avg_loss.iloc[-1]) if len(closes) > 1 else None,
+        "last_close": float(closes[-1]),
+        "session_date": session_date,
+        "cum_pv": float((typical * volume).sum()),
+        "cum_volume": float(volume.sum()),
+        "last_bar_ts": dates.iloc[-1].to_pydatetime(),
+        "bar_count": len(closes),
+    }
+
+
+def advance_state(state, bars):
+    """
+    Extend `state` with the bars newer than state["last_bar_ts"].
+
+    Runs the same recurrences as build_state(), so advancing a state built
+    from a prefix gives the same values as rebuilding from the full series,
+    at O(new bars) cost.
+    """
+    if state is None:
+        return build_state(bars)
+    if bars is None or bars.empty:
+        return state
+
+    state = dict(state)
+    fast, slow = 2 / (EMA_FAST + 1), 2 / (EMA_SLOW + 1)
+    for bar in bars[pd.to_datetime(bars["date"]) > state["last_bar_ts"]].itertuples(index=False):
+        ts = pd.Timestamp(bar.date).to_pydatetime()
+        close = float(bar.close)
+
+        change = close - state["last_close"]
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if state["avg_gain"] is None:
+            state["avg_gain"], state["avg_loss"] = gain, loss
+        else:
+            state["avg_gain"] += (gain - state["avg_gain"]) / RSI_PERIOD
+            state["avg_loss"] += (loss - state["avg_loss"]) / RSI_PERIOD
+        state["ema20"] += fast * (close - state["ema20"])
+        state["ema50"] += slow * (close - state["ema50"])
+
+        if ts.date() != state["session_date"]:
+            state["session_date"] = ts.date()
+            state["cum_pv"] = state["cum_volume"] = 0.0
+        volume = float(bar.volume)
+        state["cum_pv"] += (float(bar.high) + float(bar.low) + close) / 3 * volume
+        state["cum_volume"] += volume
+
+        state["last_close"] = close
+        state["last_bar_ts"] = ts
+        state["bar_count"] += 1
+    return state
+
+
+def state_to_indicators(state):
+    """Indicator dict (same shape as compute_indicators) from a state."""
+    if state is None:
+        return None
+    count = state["bar_count"]
+    if count > RSI_PERIOD:
+        rsi14 = 100.0 if state["avg_loss"] == 0 else 100 - 100 / (1 + state["avg_gain"] / state["avg_loss"])
+    else:
+        rsi14 = None
+    indicators = {
+        "rsi14": rsi14,
+        "ema20": state["ema20"] if count >= EMA_FAST else None,
+        "ema50": state["ema50"] if count >= EMA_SLOW else None,
+        "vwap": state["cum_pv"] / state["cum_volume"] if state["cum_volume"] > 0 else None,
+    }
+    return None if all(v is None for v in indicators.values()) else indicators
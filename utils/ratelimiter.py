@@ -1,22 +1,294 @@
 # utils/ratelimiter.py
+import asyncio
+import logging
+import os
+import struct
+import tempfile
 import threading
 import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("screener")
 
 class RateLimiter:
-    def __init__(self, max_calls, period):
+    """
+    Token bucket: `max_calls` per `period` on average, up to `burst` back-to-back.
+
+    State is a token count and a timestamp, so every operation is O(1). wait()
+    reserves a token under the lock (letting the count go negative) and sleeps
+    for the computed delay *after* releasing it, so waiting threads never queue
+    behind a sleeper and are served in reservation order.
+    """
+    def __init__(self, max_calls, period, burst=None):
+        self.max_calls = max_calls
+        self.period = period
+        self.burst = burst if burst is not None else max_calls
+        self.lock = threading.Lock()
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self):
+        return self.max_calls / self.period
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _reserve(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def try_acquire(self):
+        """Take a token if one is available right now; never blocks."""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def set_period(self, period):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.period = period
+
+
+# Cross-process backend --------------------------------------------------------
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class SharedRateLimiter:
+    """
+    Token bucket shared by every process on the host through a small state file.
+
+    The file holds (tokens, updated, rate, live_seen) and is only read and
+    written under an exclusive file lock, so scheduler, manual scans and
+    backtests draw from one budget. Drop-in for RateLimiter.
+
+    Priority: "live" callers reserve tokens like RateLimiter does and stamp
+    live_seen. "background" callers (backtests, bulk downloads) never go into
+    debt, and while a live caller was active within `live_window` seconds
+    they only take a token when the bucket is full. Live scans pre-empt them.
+    """
+    _STATE = struct.Struct("<dddd")
+
+    def __init__(self, max_calls, period, burst=None, path=None, priority="live", live_window=5.0):
         self.max_calls = max_calls
         self.period = period
+        self.burst = burst if burst is not None else max_calls
+        self.path = path or os.path.join(tempfile.gettempdir(), "day_trading_screener_rate.bin")
+        self.priority = priority
+        self.live_window = live_window
         self.lock = threading.Lock()
-        self.calls = []
-    
+
+    @property
+    def rate(self):
+        return self.max_calls / self.period
+
+    def _update(self, func):
+        # Run func(state, now) -> (new_state, result) atomically across processes
+        with self.lock, open(self.path, "a+b") as f:
+            _lock_file(f)
+            try:
+                f.seek(0)
+                raw = f.read(self._STATE.size)
+                now = time.time()
+                if len(raw) == self._STATE.size:
+                    tokens, updated, rate, live_seen = self._STATE.unpack(raw)
+                else:
+                    tokens, updated, rate, live_seen = float(self.burst), now, self.rate, 0.0
+                tokens = min(self.burst, tokens + max(0.0, now - updated) * rate)
+                state, result = func([tokens, now, rate, live_seen], now)
+                f.seek(0)
+                f.truncate()
+                f.write(self._STATE.pack(*state))
+                f.flush()
+                return result
+            finally:
+                _unlock_file(f)
+
+    def _reserve(self, state, now):
+        tokens, _, rate, _ = state
+        if self.priority == "live":
+            state[0] = tokens - 1
+            state[3] = now
+            return state, (0.0 if state[0] >= 0 else -state[0] / rate)
+
+        live_active = now - state[3] < self.live_window
+        needed = self.burst if live_active else 1
+        if tokens >= needed:
+            state[0] = tokens - 1
+            return state, 0.0
+        # Not granted: report how long until enough tokens could be there
+        return state, max((needed - tokens) / rate, 0.01)
+
+    def _take(self):
+        """Returns 0.0 when a token was taken, otherwise seconds to wait (background only)."""
+        return self._update(self._reserve)
+
     def wait(self):
+        while True:
+            delay = self._take()
+            if self.priority == "live":
+                if delay > 0:
+                    time.sleep(delay)
+                return
+            if delay == 0:
+                return
+            time.sleep(delay)
+
+    async def acquire(self):
+        while True:
+            delay = self._take()
+            if self.priority == "live":
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                return
+            if delay == 0:
+                return
+            await asyncio.sleep(delay)
+
+    def try_acquire(self):
+        def take_if_available(state, now):
+            live_active = self.priority != "live" and now - state[3] < self.live_window
+            if state[0] >= (self.burst if live_active else 1):
+                state[0] -= 1
+                if self.priority == "live":
+                    state[3] = now
+                return state, True
+            return state, False
+        return self._update(take_if_available)
+
+    def stored_rate(self):
+        """Refill rate (tokens per second) currently in the shared state."""
+        return self._update(lambda state, now: (state, state[2]))
+
+    def set_period(self, period):
+        self.period = period
+
+        def store_rate(state, now):
+            state[2] = self.rate
+            return state, None
+        self._update(store_rate)
+
+
+class RateGovernor:
+    """
+    One request budget shared by every FMP endpoint.
+
+    Starts at the plan's requests-per-minute and adapts AIMD-style: each 429
+    halves the rate (never below `min_fraction` of the plan) and pauses all
+    callers for the server's Retry-After, each success wins back 1% of the plan.
+
+    Args:
+        requests_per_minute (int): Plan limit, e.g. 300 for FMP Starter.
+        burst (int): Requests that may go out back-to-back within the window.
+        min_fraction (float): Lower bound on the adapted rate, as a fraction of the plan.
+        backend (str): "process" for an in-process bucket, "host" to share the
+            budget with other processes through SharedRateLimiter.
+        state_path (str): State file for the "host" backend.
+        priority (str): "live" or "background" for the "host" backend.
+    """
+    def __init__(self, requests_per_minute, burst=5, min_fraction=0.25, backend="process", state_path=None, priority="live"):
+        self.max_rpm = float(requests_per_minute)
+        self.min_rpm = self.max_rpm * min_fraction
+        self.rpm = self.max_rpm
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.paused_until = 0.0
+        self.throttled = 0
+        if backend == "host":
+            self.limiter = SharedRateLimiter(burst, self._period(), burst=burst, path=state_path, priority=priority)
+            # Resume from the host's current rate: a process that backed off and
+            # exited leaves it reduced, and only this governor's successes restore it
+            self.rpm = min(self.max_rpm, max(self.min_rpm, self.limiter.stored_rate() * 60))
+            self.limiter.set_period(self._period())
+        else:
+            self.limiter = RateLimiter(burst, self._period(), burst=burst)
+
+    def _period(self):
+        return self.burst * 60.0 / self.rpm
+
+    def wait(self):
+        delay = self.paused_until - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self.limiter.wait()
+
+    async def acquire(self):
+        delay = self.paused_until - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.limiter.acquire()
+
+    def try_acquire(self):
+        return time.time() >= self.paused_until and self.limiter.try_acquire()
+
+    def on_throttle(self, retry_after=None):
         with self.lock:
-            now = time.time()
-            # Remove old timestamps
-            self.calls = [t for t in self.calls if now - t < self.period]
+            self.throttled += 1
+            self.rpm = max(self.min_rpm, self.rpm / 2)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.time() + retry_after)
+            period = self._period()
+        self.limiter.set_period(period)
+        logger.warning(f"Rate governor: 429 received, slowing to {self.rpm:.0f} req/min")
+
+    def on_success(self):
+        if self.rpm >= self.max_rpm:
+            return
+        with self.lock:
+            self.rpm = min(self.max_rpm, self.rpm + self.max_rpm * 0.01)
+            period = self._period()
+        self.limiter.set_period(period)
+
+    def set_priority(self, priority):
+        """Switch a host-shared governor between "live" and "background"."""
+        if hasattr(self.limiter, "priority"):
+            self.limiter.priority = priority
 
-            if len(self.calls) >= self.max_calls:
-                sleep_time = self.period - (now - self.calls[0])
-                time.sleep(max(0, sleep_time))
+    @contextmanager
+    def priority(self, priority):
+        """set_priority() for the duration of a block (or a decorated call), then restore."""
+        previous = getattr(self.limiter, "priority", None)
+        self.set_priority(priority)
+        try:
+            yield self
+        finally:
+            if previous is not None:
+                self.set_priority(previous)
 
-            self.calls.append(time.time())
+    @property
+    def requests_per_minute(self):
+        return self.rpm
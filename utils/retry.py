@@ -12,22 +12,32 @@ def retry_on_429(
     base_delay=1.0,
     backoff_factor=1.5,
     jitter=0.3,
-    logger=None
+    logger=None,
+    on_throttle=None,
+    on_success=None
 ):
     """
     Retry decorator to handle HTTP 429 Too Many Requests errors
     with exponential backoff and optional jitter.
+
+    on_throttle(retry_after) and on_success() let a shared rate governor
+    react to the server's limits; retry_after is None without the header.
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             for attempt in range(1, max_retries + 1):
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
+                    if on_success:
+                        on_success()
+                    return result
                 except requests.exceptions.HTTPError as e:
                     response = getattr(e, "response", None)
                     if response is not None and response.status_code == 429:
                         retry_after = response.headers.get("Retry-After")
+                        if on_throttle:
+                            on_throttle(float(retry_after) if retry_after is not None else None)
                         if retry_after is not None:
                             delay = float(retry_after)
                             logger.warning(f"[{func.__name__}] 429 Too Many Requests. Retrying in {delay:.1f}s (from Retry-After header)...")
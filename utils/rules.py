@@ -0,0 +1,264 @@
+"""
+Declarative screening rules.
+
+A rule is a dict:
+
+    {"name": "rsi_in_range", "field": "rsi14", "op": "between", "low": 50, "high": 70,
+     "message": "RSI not in range ({low},{high}), actual: {value}"}
+
+    field    value being tested (see FIELD_SOURCES)
+    op       ">", ">=", "<", "<=" against "value" (a constant) or "ref" (another
+             field), or "between" (exclusive "low"/"high")
+    message  failure text; may use {value}, {ref_value}, {low}, {high}, {threshold}
+    label    short fixed name of the failure (default: message up to " (")
+    optional True for rules applied only with use_optional_filters
+
+The same list can be kept in a JSON file (SCREENING_RULES_FILE). compile_rules()
+turns it into a RuleSet once. Rules are grouped by the data source they need
+(FIELD_SOURCES) and sources are ordered by cost per rejection: estimated API
+requests per symbol (SOURCE_COSTS) over the share of the symbols reaching that
+stage that it rejected in recent runs (rule_stage_stats). A missing input
+fails its rule with "missing <field>" the first time it is needed.
+"""
+import json
+import operator
+
+import numpy as np
+
+from config.settings import SCREENING_RULES_FILE, QUOTE_BATCH_SIZE, PROFILE_BATCH_SIZE, INDICATOR_SOURCE
+
+# Where each field comes from, and what it costs to get per symbol
+FIELD_SOURCES = {
+    "price": "quote",
+    "pre_market_change_pct": "quote",
+    "vwap": "technicals",
+    "ema20": "technicals",
+    "ema50": "technicals",
+    "rsi14": "technicals",
+    "beta": "fundamentals",
+    "market_cap": "fundamentals",
+}
+
+# Estimated FMP requests per symbol. quote and fundamentals come from batched
+# /quote and /profile calls (fundamentals are also cached per day); technicals
+# are one bar download per symbol, or four indicator calls with the API source.
+SOURCE_COSTS = {
+    "quote": 1 / QUOTE_BATCH_SIZE,
+    "fundamentals": 1 / PROFILE_BATCH_SIZE,
+    "technicals": 1 if INDICATOR_SOURCE == "local" else 4,
+}
+# Rejection share assumed for a source with no history, and the floor that
+# keeps a source that never rejects from ranking as infinitely expensive
+DEFAULT_REJECT_RATE = 0.5
+MIN_REJECT_RATE = 0.001
+
+SCAN_FIELDS = list(FIELD_SOURCES)
+
+FIELD_LABELS = {
+    "price": "price",
+    "pre_market_change_pct": "pre-market change %",
+    "vwap": "VWAP",
+    "ema20": "EMA20",
+    "ema50": "EMA50",
+    "rsi14": "RSI",
+    "beta": "beta",
+    "market_cap": "market cap",
+}
+
+DEFAULT_RULES = [
+    {"name": "price_above_vwap", "field": "price", "op": ">", "ref": "vwap",
+     "message": "price not above VWAP"},
+    {"name": "ema20_above_ema50", "field": "ema20", "op": ">", "ref": "ema50",
+     "message": "EMA20 not above EMA50"},
+    {"name": "rsi_in_range", "field": "rsi14", "op": "between", "low": 50, "high": 70,
+     "message": "RSI not in range ({low},{high}), actual: {value}"},
+    {"name": "beta_above_one", "field": "beta", "op": ">", "value": 1, "optional": True,
+     "message": "beta too low ({value})"},
+    {"name": "market_cap_min", "field": "market_cap", "op": ">=", "value": 2_000_000_000, "optional": True,
+     "message": "market cap too small ({value})"},
+    {"name": "pre_market_gain", "field": "pre_market_change_pct", "op": ">", "value": 1, "optional": True,
+     "message": "pre-market change too low ({value})"},
+]
+
+_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+
+def load_rules(path=None):
+    """Rules from a JSON file (a list of rule dicts), or DEFAULT_RULES."""
+    path = path or SCREENING_RULES_FILE
+    if not path:
+        return DEFAULT_RULES
+    with open(path) as f:
+        return json.load(f)
+
+
+def _rule_fields(rule):
+    return [rule["field"]] + ([rule["ref"]] if "ref" in rule else [])
+
+def order_sources(reject_rates=None, costs=SOURCE_COSTS):
+    """Sources by expected cost per rejected symbol, cheapest first."""
+    reject_rates = reject_rates or {}
+    return sorted(costs, key=lambda source: costs[source] / max(reject_rates.get(source, DEFAULT_REJECT_RATE), MIN_REJECT_RATE))
+
+
+class RuleSet:
+    """
+    Rules compiled into one ordered list of checks shared by the scalar and
+    vectorized paths, so both report the same first failure.
+
+    Each check is ("missing", field) or ("rule", rule); `labels[i + 1]` names
+    check i and code 0 means every check passed.
+    """
+    def __init__(self, rules, source_order=None):
+        self.source_order = source_order or order_sources()
+        rank = {source: i for i, source in enumerate(self.source_order)}
+        def rule_source(rule):
+            # A rule runs once all of its inputs are available
+            return max((FIELD_SOURCES[field] for field in _rule_fields(rule)), key=rank.get)
+
+        self.rules = sorted(rules, key=lambda r: rank[rule_source(r)])  # stable: keeps file order
+        self.by_name = {rule["name"]: rule for rule in self.rules}
+        self.checks = []
+        self.check_sources = []
+        seen = set()
+        for rule in self.rules:
+            for field in _rule_fields(rule):
+                if field not in seen:
+                    seen.add(field)
+                    self.checks.append(("missing", field))
+                    self.check_sources.append(FIELD_SOURCES[field])
+            self.checks.append(("rule", rule))
+            self.check_sources.append(rule_source(rule))
+        # Group checks by source (stable), so evaluating source by source gives
+        # the same first failure as evaluating everything at once
+        order = sorted(range(len(self.checks)), key=lambda i: rank[self.check_sources[i]])
+        self.checks = [self.checks[i] for i in order]
+        self.check_sources = [self.check_sources[i] for i in order]
+        self.labels = ["passed"] + [
+            f"missing {FIELD_LABELS[arg]}" if kind == "missing" else arg.get("label", arg["message"].split(" (")[0])
+            for kind, arg in self.checks
+        ]
+        # Data sources in the order they are needed
+        self.sources = list(dict.fromkeys(self.check_sources))
+
+    @staticmethod
+    def _passes(rule, values):
+        value = values.get(rule["field"])
+        if rule["op"] == "between":
+            return rule["low"] < value < rule["high"]
+        other = values.get(rule["ref"]) if "ref" in rule else rule["value"]
+        return _OPS[rule["op"]](value, other)
+
+    @staticmethod
+    def _message(rule, values):
+        return rule["message"].format(
+            value=values.get(rule["field"]),
+            ref_value=values.get(rule.get("ref")),
+            threshold=rule.get("value"),
+            low=rule.get("low"),
+            high=rule.get("high"),
+        )
+
+    def evaluate(self, values, sources=None, symbol=None, reasons=None, logger=None):
+        """
+        Scalar path: True if `values` passes every check (only checks on
+        `sources` when given). The first failure is appended to `reasons`.
+        """
+        for (kind, arg), source in zip(self.checks, self.check_sources):
+            if sources is not None and source not in sources:
+                continue
+            if kind == "missing":
+                if values.get(arg) is not None:
+                    continue
+                msg = f"{symbol}: missing {FIELD_LABELS[arg]}"
+            else:
+                if self._passes(arg, values):
+                    continue
+                msg = f"{symbol}: {self._message(arg, values)}"
+            if logger: logger.info(msg)
+            if reasons is not None: reasons.append(msg)
+            return False
+        return True
+
+    def check(self, name, values):
+        """One rule by name: True/False, or None when it is not configured or an input is missing."""
+        rule = self.by_name.get(name)
+        if rule is None or any(values.get(field) is None for field in _rule_fields(rule)):
+            return None
+        return self._passes(rule, values)
+
+    def evaluate_frame(self, frame):
+        """
+        Vectorized path over a DataFrame or dict of arrays (None/NaN = missing).
+
+        Returns:
+            (mask, codes): Boolean array of passing rows and int8 indexes into `labels`.
+        """
+        columns = {}
+        def col(name):
+            if name not in columns:
+                columns[name] = np.asarray(frame[name], dtype="float64")
+            return columns[name]
+
+        conditions = []
+        if not self.checks:
+            return np.ones(len(col("price")), dtype=bool), np.zeros(len(col("price")), dtype=np.int8)
+        with np.errstate(invalid="ignore"):
+            for kind, arg in self.checks:
+                if kind == "missing":
+                    conditions.append(np.isnan(col(arg)))
+                elif arg["op"] == "between":
+                    value = col(arg["field"])
+                    conditions.append(~((value > arg["low"]) & (value < arg["high"])))
+                else:
+                    other = col(arg["ref"]) if "ref" in arg else arg["value"]
+                    conditions.append(~_OPS[arg["op"]](col(arg["field"]), other))
+            # np.select takes the first true condition per row: first-failure semantics
+            codes = np.select(conditions, np.arange(1, len(conditions) + 1), default=0).astype(np.int8)
+        return codes == 0, codes
+
+
+    def subset(self, fields):
+        """RuleSet of just the rules whose inputs are all in `fields`, in the same order."""
+        return RuleSet([r for r in self.rules if set(_rule_fields(r)) <= set(fields)], self.source_order)
+
+    def fields(self):
+        """Every input field the rules read."""
+        return list(dict.fromkeys(field for rule in self.rules for field in _rule_fields(rule)))
+
+    def reject_rates(self, stage_stats):
+        """
+        Share of the symbols reaching each source's stage that it removed, from
+        {source: {"checked": n, "rejected": m}} as returned by load_stage_stats().
+
+        Conditional on reaching the stage: later stages only see survivors, so
+        dividing by every screened symbol would understate them and keep
+        confirming whatever order produced the stats.
+        """
+        return {
+            source: counts["rejected"] / counts["checked"]
+            for source, counts in stage_stats.items()
+            if source in self.sources and counts.get("checked")
+        }
+
+
+_compiled = {}
+
+def compile_rules(rules=None, use_optional_filters=False, stage_stats=None):
+    """
+    RuleSet for `rules` (default: load_rules()), dropping optional rules unless
+    requested. With `stage_stats`, sources are ordered by learned rejection
+    rates as well as cost.
+    """
+    rules = load_rules() if rules is None else rules
+    rules = [r for r in rules if use_optional_filters or not r.get("optional")]
+    ruleset = RuleSet(rules)
+    if stage_stats:
+        ruleset = RuleSet(rules, order_sources(ruleset.reject_rates(stage_stats)))
+    return ruleset
+
+def get_ruleset(use_optional_filters=False):
+    """The configured rules, compiled once per process."""
+    if use_optional_filters not in _compiled:
+        _compiled[use_optional_filters] = compile_rules(use_optional_filters=use_optional_filters)
+    return _compiled[use_optional_filters]
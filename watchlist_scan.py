@@ -3,8 +3,9 @@ import logging
 from runner.screener_runner import run_screener
 from db.reader import load_watchlist_symbols
 from utils.logger import setup_logger
+from config.settings import EXECUTION_MODE
 
-def run_watchlist_scan(tighten=False, log_level=logging.INFO):
+def run_watchlist_scan(tighten=False, log_level=logging.INFO, execution=EXECUTION_MODE):
     logger = setup_logger(level=log_level)
 
     watchlist = load_watchlist_symbols()
@@ -18,19 +19,22 @@ def run_watchlist_scan(tighten=False, log_level=logging.INFO):
         limit=len(watchlist),
         use_optional_filters=tighten,
         log_level=log_level,        
-        watchlist_symbols=watchlist
+        watchlist_symbols=watchlist,
+        execution=execution
     )
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--debug", action="store_true")
     parser.add_argument("--tighten", action="store_true")   
+    parser.add_argument("--execution", choices=["threads", "async"], default=EXECUTION_MODE)
     args = parser.parse_args()
 
     log_level = logging.DEBUG if args.debug else logging.INFO
     run_watchlist_scan(
         tighten=args.tighten,        
-        log_level=log_level
+        log_level=log_level,
+        execution=args.execution
     )
 
 if __name__ == "__main__":